@@ -0,0 +1,643 @@
+###########################################################################################
+#
+#   Title: Bench Tools
+#
+#   Descritpion: Build-time benchmarks for Constraint, BlendColor, Rivet, Ribbon and
+#       FKIK. Each builder is run across a range of sizes against the headless maya.cmds
+#       stand-in, recording wall time, cmds calls, nodes created, connections made and
+#       the estimated evaluation cost of what was built (paralleltools costs), so the
+#       scaling of every builder can be tracked and regressions caught
+#
+#    Instructions: run from a regular python interpreter (not inside Maya):
+#           python benchtools.py             run every sweep and check the baseline
+#           python benchtools.py --quick     smaller sizes only
+#           python benchtools.py --update    store the results as the new baseline
+#
+#       - the process exits with 1 when a metric grows past the baseline by more than
+#           --tolerance (counts) or --time-tolerance (wall time), or when a case's own
+#           check of what it built fails (the bake case compares the baked curves with
+#           the networks they replace frame by frame, the analytic IK case that its
+#           limbs are solved without an IK solver node)
+#       - the ik_handle case is there to compare the build side by side with
+#           ik_analytic. The cost column is a static estimate per node type, not a
+#           measured evaluation time, so it isn't a claim about which one runs faster
+#       - --no-time skips the wall time check (for machines other than the baseline's)
+#       - --json writes the full results, including calls per command
+#       - --profile writes the cmds calls per builder method as folded flame graph stacks
+#       - --imports only checks how long a cold import of the matrixtools package and its
+#           submodules takes against IMPORT_BUDGETS, and that importing the package
+#           loads none of the submodules or the Maya API (exits with 1 otherwise)
+#
+###########################################################################################
+
+import argparse
+import importlib
+import json
+import math
+import os
+import subprocess
+import sys
+from timeit import default_timer
+
+import headlesstools
+import profiletools
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+METRICS = ["wall", "calls", "nodes", "connections", "cost"]
+# Wall times under this many seconds are too noisy to compare
+TIME_FLOOR = 0.01
+SWEEPS = {"jointNum": [3, 10, 25, 50, 100, 200],
+          "rivets": [10, 100, 500, 1000, 2000],
+          "drivers": [1, 2, 4, 8, 16],
+          "limbs": [1, 2, 4, 8, 16],
+          "objects": [1, 4, 16, 64]}
+QUICK_SWEEPS = {"jointNum": [3, 25],
+                "rivets": [10, 100],
+                "drivers": [1, 4],
+                "limbs": [1, 4],
+                "objects": [1, 4]}
+# Nodes the analytic IK case must not have built
+SOLVER_TYPES = ["ikHandle", "ikEffector", "ikRPsolver", "ikSCsolver"]
+# Frames the bake case samples, and how far a baked matrix may be from the network's
+BAKE_FRAMES = list(range(1, 25))
+BAKE_TOLERANCE = 1e-6
+# Seconds a cold import may take, and the modules it must leave unloaded
+IMPORT_BUDGETS = {"matrixtools": (0.005, ["matrixtools.matrixconstrainttools",
+                                          "matrixtools.ribbontools",
+                                          "matrixtools.fkiktools",
+                                          "matrixtools.buildtools",
+                                          "matrixtools.sessiontools",
+                                          "matrixtools.spatialtools",
+                                          "matrixtools.spectools",
+                                          "matrixtools.baketools",
+                                          "matrixtools.evaltools",
+                                          "maya.api.OpenMaya",
+                                          "numpy"]),
+                  "matrixtools.matrixconstrainttools": (0.02, ["matrixtools.spatialtools",
+                                                               "maya.api.OpenMaya"]),
+                  "matrixtools.ribbontools": (0.02, ["maya.api.OpenMaya",
+                                                     "maya.api.OpenMayaAnim"]),
+                  "matrixtools.fkiktools": (0.02, ["maya.api.OpenMaya"])}
+# Run in a fresh interpreter: install the stand-in, time one import and list what it
+# loaded
+IMPORT_SCRIPT = """
+import json, sys
+from timeit import default_timer
+import headlesstools
+headlesstools.install()
+# The stand-in borrows the package's math, the import measured has to start cold
+for name in [name for name in sys.modules if name.split(".")[0] == "matrixtools"]:
+    del sys.modules[name]
+before = set(sys.modules)
+start = default_timer()
+__import__(sys.argv[1])
+wall = default_timer() - start
+print(json.dumps({"wall": wall, "loaded": sorted(set(sys.modules) - before)}))
+"""
+
+
+def load_tools():
+    """
+    Install the stand-in and (re)import the tools so they bind to it
+    """
+    headlesstools.install()
+    modules = []
+    for name in ["matrixtools.sessiontools", "matrixtools.spatialtools",
+                 "matrixtools.matrixconstrainttools", "matrixtools.ribbontools"]:
+        cmds = getattr(sys.modules.get(name), "mc", None)
+        # Look through a profiler's proxy
+        cmds = getattr(cmds, "cmds", cmds)
+        if cmds not in [None, sys.modules["maya.cmds"]]:
+            # Imported against another maya.cmds
+            importlib.reload(sys.modules[name])
+        modules.append(importlib.import_module(name))
+    return modules[2:]
+
+
+def setup_ribbon(size, pin=False, session=False):
+    """
+    Nothing to prepare, the ribbon builds its own proxies
+    """
+    mt, rt = load_tools()
+    from matrixtools import spatialtools
+    # Start from no length tables, whichever case ran before
+    spatialtools.clear_cache()
+    if not session:
+        return lambda: rt.Ribbon("bench", jointNum=size, pin=pin).build_ribbon_rig()
+
+    def build():
+        with mt.ss.BuildSession():
+            rt.Ribbon("bench", jointNum=size, pin=pin).build_ribbon_rig()
+    return build
+
+
+def setup_rivet(size, pin=False, arcLen=False):
+    """
+    Create and select a surface to rivet to
+    """
+    mt, rt = load_tools()
+    from matrixtools import spatialtools
+    mc = sys.modules["maya.cmds"]
+    # Every run measures the surface, the cache is what repeated calls save
+    spatialtools.clear_cache()
+    surface = mc.nurbsPlane(name="bench_surface", w=10, u=8, v=1)[0]
+    mc.select(surface, r=True)
+    return lambda: mt.Rivet(pin=pin, arcLen=arcLen).set_rivets(size)
+
+
+def setup_rivet_objects(size):
+    """
+    Create a surface and scatter objects over it to rivet where they are
+    """
+    mt, rt = load_tools()
+    from matrixtools import spatialtools
+    mc = sys.modules["maya.cmds"]
+    # Every run samples the surface, the cache is what repeated calls save
+    spatialtools.clear_cache()
+    surface = mc.nurbsPlane(name="bench_surface", w=10, u=8, v=1)[0]
+    objs = []
+    for i in range(size):
+        obj = mc.createNode("transform", n="bench{:04d}_prop".format(i))
+        mc.setAttr("{}.translate".format(obj), (i * 7919 % 1000) / 100.0 - 5.0, 0.5,
+                   (i * 104729 % 1000) / 1000.0 - 0.5)
+        objs.append(obj)
+    return lambda: mt.Rivet().rivet_objects(objs, surface)
+
+
+def setup_constraint(size, mo=True, opm=False, blendMtrx=False):
+    """
+    Create the drivers and the object they constrain
+    """
+    mt, rt = load_tools()
+    mc = sys.modules["maya.cmds"]
+    drivers = [mc.createNode("transform", n="bench_driver{}".format(i))
+               for i in range(size)]
+    driven = mc.createNode("transform", n="bench_driven")
+    return lambda: mt.Constraint(mo, opm=opm, blendMtrx=blendMtrx).parent(drivers, driven)
+
+
+def setup_rebuild(size):
+    """
+    Build a ribbon, capture its networks and delete them so only the rebuild is measured
+    """
+    mt, rt = load_tools()
+    from matrixtools import buildtools
+    from matrixtools import networktools
+    mc = sys.modules["maya.cmds"]
+    rt.Ribbon("bench", jointNum=size).build_ribbon_rig()
+    spec = networktools.capture()
+    mc.delete([node for node, nodeType in spec["nodes"]])
+    scene = headlesstools.SCENE
+    return lambda: networktools.rebuild(spec, buildtools.BuildPlan(scene))
+
+
+def setup_reconcile(size):
+    """
+    Build a constraint so only an unchanged rerun through a reconciling plan is measured
+    """
+    build = setup_constraint(size)
+    build()
+    from matrixtools import buildtools
+    mt = sys.modules["matrixtools.matrixconstrainttools"]
+    driven = "bench_driven"
+    drivers = ["bench_driver{}".format(i) for i in range(size)]
+    scene = headlesstools.SCENE
+
+    def rerun():
+        con = mt.Constraint(True)
+        con.plan = buildtools.BuildPlan(scene, reconcile=True)
+        con.parent(drivers, driven)
+        con.plan.flush()
+    return rerun
+
+
+def setup_fkik(size):
+    """
+    Create a bind chain of jointNum joints to blend
+    """
+    load_tools()
+    from matrixtools import fkiktools
+    mc = sys.modules["maya.cmds"]
+    parent = mc.createNode("transform", n="bench_grp")
+    for i in range(size):
+        parent = mc.createNode("joint", n="bench{:02d}_bind".format(i), p=parent)
+        mc.setAttr("{}.translate".format(parent), 1, 0, 0)
+    return lambda: fkiktools.FKIK().mk_fkik("bench00_bind")
+
+
+def setup_bc_chain(size):
+    """
+    Create two drivers and a chain of jointNum joints blended between them
+    """
+    mt, rt = load_tools()
+    mc = sys.modules["maya.cmds"]
+    drivers = [mc.createNode("transform", n="bench_fk"), mc.createNode("transform", n="bench_ik")]
+    chain = [mc.createNode("joint", n="bench{:02d}_jnt".format(i)) for i in range(size)]
+    return lambda: mt.BlendColor().parent(drivers, chain)
+
+
+def setup_ik(size, handle=False):
+    """
+    Create limbs of three joints with an IK controller and a pole each, solved by the
+    analytic two-bone network or by an ikHandle
+    """
+    load_tools()
+    from matrixtools import fkiktools
+    mc = sys.modules["maya.cmds"]
+    grp = mc.createNode("transform", n="bench_grp")
+    limbs = []
+    for i in range(size):
+        parent = grp
+        for j in range(3):
+            parent = mc.createNode("joint", n="bench{:02d}_{:02d}_bind".format(i, j),
+                                   p=parent)
+            mc.setAttr("{}.translate".format(parent), 1 if j else 0, 0, 0)
+        ctrl = mc.createNode("transform", n="bench{:02d}_ctrl".format(i))
+        pole = mc.createNode("transform", n="bench{:02d}_pole".format(i))
+        limbs.append(("bench{:02d}_00_bind".format(i), None, ctrl, pole))
+
+    def check():
+        """
+        The analytic limbs have to be solved by plain utility nodes
+        """
+        return ["{} is an IK solver node".format(node)
+                for node in mc.ls(type=SOLVER_TYPES) or []]
+
+    def build():
+        fkik = fkiktools.FKIK()
+        if not handle:
+            return fkik.build(limbs)
+        for result, (start, end, ctrl, pole) in zip(fkik.build([limb[0] for limb in limbs]),
+                                                   limbs):
+            ik = mc.ikHandle(sj=result["ik"][-3], ee=result["ik"][-1], sol="ikRPsolver",
+                             n="{}_ikHandle".format(ctrl))[0]
+            mc.poleVectorConstraint(pole, ik)
+            mc.parent(ik, ctrl)
+    if handle:
+        return build
+    return build, check
+
+
+def get_world_matrices(objs, frames):
+    """
+    Get the world matrix of every object at every frame
+    """
+    mc = sys.modules["maya.cmds"]
+    matrices = []
+    for frame in frames:
+        mc.currentTime(frame)
+        matrices.append([mc.xform(obj, q=True, ws=True, m=True) for obj in objs])
+    return matrices
+
+
+def get_baked_matrices(objs, frames):
+    """
+    Get the world matrix every object's baked curves give at every frame, worked out
+    from the keys themselves instead of evaluating the baked scene
+    """
+    mc = sys.modules["maya.cmds"]
+    scene = headlesstools.SCENE
+    matrices = []
+    for frame in frames:
+        row = []
+        for obj in objs:
+            values = {}
+            for channel in ["translate", "rotate", "scale"]:
+                values[channel] = []
+                for axis in "XYZ":
+                    plug = "{}.{}{}".format(obj, channel, axis)
+                    src = mc.connectionInfo(plug, sfd=True)
+                    if not src:
+                        values[channel].append(mc.getAttr(plug))
+                        continue
+                    value = scene.eval_key(scene.nodes[src.partition(".")[0]], frame)
+                    # Angle curves store radians
+                    values[channel].append(math.degrees(value) if channel == "rotate"
+                                           else value)
+            rot = headlesstools.euler_to_rotation(
+                values["rotate"], mc.getAttr("{}.rotateOrder".format(obj)))
+            if mc.nodeType(obj) == "joint":
+                rot = headlesstools.mul_rotation(rot, headlesstools.euler_to_rotation(
+                    mc.getAttr("{}.jointOrient".format(obj))[0]))
+            local = headlesstools.compose_matrix(values["translate"], rot, values["scale"])
+            row.append(list(local * scene.get_parent_matrix(obj)))
+        matrices.append(row)
+    return matrices
+
+
+def setup_bake(size):
+    """
+    Animate two drivers and constrain objects joints to them. The check compares the
+    world matrices the baked curves give with the ones the live network gave
+    """
+    mt, rt = load_tools()
+    from matrixtools import baketools
+    mc = sys.modules["maya.cmds"]
+    drivers = [mc.createNode("transform", n="bench_driver{}".format(i)) for i in range(2)]
+    for i, driver in enumerate(drivers):
+        for frame, weight in [(BAKE_FRAMES[0], 0.0), (BAKE_FRAMES[-1], i + 1.0)]:
+            mc.setKeyframe(driver, attribute="translateX", t=frame, v=10 * weight)
+            mc.setKeyframe(driver, attribute="rotateY", t=frame, v=90 * weight)
+            mc.setKeyframe(driver, attribute="rotateZ", t=frame, v=-30 * weight)
+    joints = []
+    for i in range(size):
+        jnt = mc.createNode("joint", n="bench{:02d}_jnt".format(i))
+        mc.setAttr("{}.translate".format(jnt), 0, i, 0)
+        mc.setAttr("{}.jointOrient".format(jnt), 0, 0, 45)
+        mt.Constraint(True).parent(drivers, jnt)
+        joints.append(jnt)
+    expected = get_world_matrices(joints, BAKE_FRAMES)
+
+    def check():
+        errors = []
+        matrices = get_baked_matrices(joints, BAKE_FRAMES)
+        for frame, before, after in zip(BAKE_FRAMES, expected, matrices):
+            for jnt, a, b in zip(joints, before, after):
+                diff = max([abs(x - y) for x, y in zip(a, b)])
+                if diff > BAKE_TOLERANCE:
+                    errors.append("{} is {:.2g} off the network at frame {}".format(
+                        jnt, diff, frame))
+        return errors
+    build = lambda: baketools.Baker(joints, BAKE_FRAMES[0], BAKE_FRAMES[-1]).bake()
+    return build, check
+
+
+# name: (sweep, setup function, setup keyword arguments)
+CASES = [("ribbon", "jointNum", setup_ribbon, {}),
+         ("ribbon_pin", "jointNum", setup_ribbon, {"pin": True}),
+         ("ribbon_session", "jointNum", setup_ribbon, {"session": True}),
+         ("rivet", "rivets", setup_rivet, {}),
+         ("rivet_pin", "rivets", setup_rivet, {"pin": True}),
+         ("rivet_arcLen", "rivets", setup_rivet, {"arcLen": True}),
+         ("rivet_objects", "rivets", setup_rivet_objects, {}),
+         ("parent", "drivers", setup_constraint, {}),
+         ("parent_noOffset", "drivers", setup_constraint, {"mo": False}),
+         ("parent_opm", "drivers", setup_constraint, {"opm": True}),
+         ("parent_blendMtrx", "drivers", setup_constraint, {"blendMtrx": True}),
+         ("rebuild", "jointNum", setup_rebuild, {}),
+         ("parent_reconcile", "drivers", setup_reconcile, {}),
+         ("fkik", "jointNum", setup_fkik, {}),
+         ("bc_chain", "jointNum", setup_bc_chain, {}),
+         ("ik_analytic", "limbs", setup_ik, {}),
+         ("ik_handle", "limbs", setup_ik, {"handle": True}),
+         ("bake", "objects", setup_bake, {})]
+
+
+def get_cost(scene, nodes):
+    """
+    Estimate the evaluation cost of the given nodes of the stand-in scene
+    """
+    from matrixtools import paralleltools
+    inputs = dict([(node, set()) for node in nodes])
+    for dst, src in scene.conns.items():
+        node = scene.split(dst)[0]
+        if node in inputs and not src.endswith(".message"):
+            inputs[node].add(scene.split(src)[0])
+    return sum([paralleltools.get_cost(scene.nodes[node].type, len(inputs[node]))
+                for node in nodes])
+
+
+def measure(setup, size, kwargs, repeat=1):
+    """
+    Build one case in a fresh scene and measure the build only (not the setup). Counts
+    are the same every run so repeats only refine the wall time. A setup can return a
+    check with its build, the problems it finds in the first run are kept as "errors"
+    """
+    result = None
+    for i in range(repeat):
+        scene = headlesstools.new_scene()
+        build = setup(size, **kwargs)
+        check = None
+        if isinstance(build, tuple):
+            build, check = build
+        calls = dict(scene.calls)
+        nodes = set(scene.nodes)
+        conns = len(scene.conns)
+
+        start = default_timer()
+        build()
+        wall = default_timer() - start
+
+        if result is not None:
+            result["wall"] = min(result["wall"], wall)
+            continue
+        cmds = {}
+        for cmd, count in scene.calls.items():
+            if count - calls.get(cmd, 0):
+                cmds[cmd] = count - calls.get(cmd, 0)
+        built = [node for node in scene.nodes if node not in nodes]
+        result = {"wall": wall, "calls": sum(cmds.values()),
+                  "nodes": len(scene.nodes) - len(nodes),
+                  "connections": len(scene.conns) - conns,
+                  "cost": round(get_cost(scene, built), 6), "cmds": cmds}
+        if check is not None:
+            result["errors"] = check()
+    return result
+
+
+def run(sweeps=None, cases=None, repeat=1):
+    """
+    Run every case across its sweep and return {case: {size: metrics}}
+    """
+    sweeps = sweeps or SWEEPS
+    results = {}
+    for name, sweep, setup, kwargs in CASES:
+        if cases and name not in cases:
+            continue
+        results[name] = {}
+        for size in sweeps[sweep]:
+            results[name][str(size)] = measure(setup, size, kwargs, repeat)
+    return results
+
+
+def get_exponent(curve, metric):
+    """
+    Estimate how a metric scales with size (1.0 is linear, 2.0 quadratic) from the
+    smallest and largest sizes of a sweep
+    """
+    sizes = sorted([int(size) for size in curve])
+    if len(sizes) < 2:
+        return None
+    first = curve[str(sizes[0])][metric]
+    last = curve[str(sizes[-1])][metric]
+    if first <= 0 or last <= 0:
+        return None
+    return math.log(float(last) / first) / math.log(float(sizes[-1]) / sizes[0])
+
+
+def report(results):
+    """
+    Format the scaling curves as a table per case
+    """
+    lines = []
+    for name, sweep, setup, kwargs in CASES:
+        if name not in results:
+            continue
+        curve = results[name]
+        lines.append("{} ({})".format(name, sweep))
+        lines.append("    {:>6} {:>10} {:>8} {:>8} {:>8} {:>8} {:>10}".format(
+            "size", "wall (ms)", "calls", "nodes", "conns", "cost", "calls/size"))
+        for size in sorted(curve, key=int):
+            m = curve[size]
+            lines.append("    {:>6} {:>10.2f} {:>8} {:>8} {:>8} {:>8.1f} {:>10.1f}".format(
+                size, m["wall"] * 1000, m["calls"], m["nodes"], m["connections"],
+                m["cost"], float(m["calls"]) / int(size)))
+        exponents = []
+        for metric in METRICS:
+            exp = get_exponent(curve, metric)
+            if exp is not None:
+                exponents.append("{} n^{:.2f}".format(metric, exp))
+        lines.append("    scaling: {}".format(", ".join(exponents)))
+    return "\n".join(lines)
+
+
+def compare(results, baseline, tolerance=0.0, timeTolerance=0.5, checkTime=True):
+    """
+    List every metric that grew past the baseline and every failed check. Cases, sizes
+    and metrics missing from either side are skipped
+    """
+    regressions = []
+    for name, curve in sorted(results.items()):
+        for size, metrics in sorted(curve.items(), key=lambda item: int(item[0])):
+            for msg in metrics.get("errors", []):
+                # A failed check fails whatever the baseline says
+                regressions.append("{}[{}] {}".format(name, size, msg))
+            base = baseline.get(name, {}).get(size)
+            if base is None:
+                continue
+            for metric in METRICS:
+                if metric not in base:
+                    continue
+                if metric == "wall":
+                    if not checkTime or max(base[metric], metrics[metric]) < TIME_FLOOR:
+                        continue
+                    limit = base[metric] * (1 + timeTolerance)
+                else:
+                    limit = base[metric] * (1 + tolerance)
+                if metrics[metric] > limit:
+                    regressions.append("{}[{}] {}: {} > baseline {}".format(
+                        name, size, metric, round(metrics[metric], 4),
+                        round(base[metric], 4)))
+
+    return regressions
+
+
+def load_baseline(path=BASELINE):
+    """
+    Read the stored baseline, or an empty one if there isn't any yet
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE):
+    """
+    Store results as the baseline, merging them into what is already stored so a
+    quick run doesn't drop the larger sizes
+    """
+    baseline = load_baseline(path)
+    for name, curve in results.items():
+        baseline.setdefault(name, {})
+        for size, metrics in curve.items():
+            baseline[name][size] = dict([(m, metrics[m]) for m in METRICS])
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+
+
+def measure_import(name, repeat=5):
+    """
+    Time a cold import of a module in a fresh interpreter, keeping the fastest of repeat
+    runs. Returns the seconds and the modules the import loaded
+    """
+    best = None
+    for i in range(repeat):
+        out = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT, name],
+                                      cwd=os.path.dirname(os.path.abspath(__file__)))
+        result = json.loads(out.decode().strip().splitlines()[-1])
+        if best is None or result["wall"] < best["wall"]:
+            best = result
+    return best
+
+
+def check_imports(budgets=None, repeat=5):
+    """
+    Measure every import in the budgets, print them and list the ones that took too long
+    or loaded a module they should have left alone
+    """
+    budgets = budgets or IMPORT_BUDGETS
+    failures = []
+    for name in sorted(budgets):
+        budget, unloaded = budgets[name]
+        result = measure_import(name, repeat)
+        print("import {:<36} {:>8.2f} ms (budget {:.0f} ms)".format(
+            name, result["wall"] * 1000, budget * 1000))
+        if result["wall"] > budget:
+            failures.append("import {}: {:.4f}s > budget {}s".format(
+                name, result["wall"], budget))
+        for module in unloaded:
+            if module in result["loaded"]:
+                failures.append("import {} loaded {}".format(name, module))
+        for module in result["loaded"]:
+            if module.endswith("tools") and not module.startswith("matrixtools"):
+                # The package has to work when it's copied on its own
+                failures.append("import {} needs {} from outside the package".format(
+                    name, module))
+    return failures
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Build-time benchmarks")
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("--update", action="store_true", help="store a new baseline")
+    parser.add_argument("--case", action="append", help="only run these cases")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.0)
+    parser.add_argument("--time-tolerance", type=float, default=0.5)
+    parser.add_argument("--no-time", action="store_true", help="skip wall time checks")
+    parser.add_argument("--json", help="write the full results to this file")
+    parser.add_argument("--profile", help="write folded flame graph stacks to this file")
+    parser.add_argument("--imports", action="store_true", help="only check import times")
+    opts = parser.parse_args(args)
+
+    if opts.imports:
+        failures = check_imports()
+        for msg in failures:
+            print("REGRESSION {}".format(msg))
+        return 1 if failures else 0
+
+    load_tools()
+    prof = profiletools.Profiler()
+    if opts.profile:
+        prof.start()
+    try:
+        results = run(QUICK_SWEEPS if opts.quick else SWEEPS, opts.case, opts.repeat)
+    finally:
+        prof.stop()
+    if opts.profile:
+        prof.save_folded(opts.profile)
+    print(report(results))
+    if opts.json:
+        with open(opts.json, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if opts.update:
+        save_baseline(results, opts.baseline)
+        print("Baseline stored in {}".format(opts.baseline))
+        return 0
+
+    baseline = load_baseline(opts.baseline)
+    if not baseline:
+        print("No baseline found, run with --update to store one")
+        return 0
+    regressions = compare(results, baseline, opts.tolerance, opts.time_tolerance,
+                          not opts.no_time)
+    for msg in regressions:
+        print("REGRESSION {}".format(msg))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
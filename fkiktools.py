@@ -1,20 +1,19 @@
-import maya.cmds as mc
-import matrixconstrainttools as mt
-reload(mt)
+###########################################################################################
+#
+#   Title: FKIK Tools (deprecated)
+#
+#   Descritpion: The tools moved into the matrixtools package. This module only forwards
+#       to matrixtools.fkiktools so older scripts and shelves keep working
+#
+#    Instructions: import the package module instead:
+#           from matrixtools import fkiktools
+#
+###########################################################################################
 
+import importlib
+import sys
+import warnings
 
-class FKIK(mt.BlendColor):
-    """docstring for FKIK"""
-
-    def __init__(self, arg):
-        super(FKIK, self).__init__()
-        self.arg = arg
-
-    def get_root():
-        pass
-
-    def mk_joint_chains():
-        pass
-
-    def mk_blend():
-        pass
+warnings.warn("{0} moved to matrixtools.{0}, import it from there".format(__name__),
+              DeprecationWarning, stacklevel=2)
+sys.modules[__name__] = importlib.import_module("matrixtools.fkiktools")
@@ -0,0 +1,2031 @@
+###########################################################################################
+#
+#   Title: Headless Tools
+#
+#   Descritpion: An in-memory stand-in for the parts of maya.cmds and maya.api.OpenMaya
+#       the matrix, ribbon and fkik tools use, so they can be imported, run and measured
+#       outside of Maya. Every command call is recorded. Nodes, plugs and connections form
+#       a real graph and DAG nodes compute their matrices (worldMatrix, parentMatrix...)
+#       from their transforms, offsetParentMatrix and parents, so xform, matchTransform
+#       and parent behave like they do in Maya
+#
+#    Instructions: install the stand-in before importing any of the tools:
+#           import headlesstools
+#           scene = headlesstools.install()
+#           from matrixtools import ribbontools
+#
+#       or run a script with the stand-in selected before anything imports maya:
+#           python headlesstools.py build_rig.py [args]
+#
+#       - headlesstools.new_scene() clears the scene and the call counters
+#       - scene.calls holds the number of calls per command, scene.nodes every node and
+#           scene.conns every connection (destination plug: source plug)
+#       - a Scene can also be handed to BuildPlan.flush() as a backend
+#       - connected plugs read their source: DAG nodes, set values, animation curves
+#           (at the current time, linear between keys) and the matrix utility nodes
+#           of the constraint networks (EVAL_TYPES) are evaluated, other utility node
+#           outputs aren't (evaltools does that)
+#       - MDGContext, MDGModifier, MFnAnimCurve and the transform math types cover
+#           what baketools needs, so bakes can be run and checked outside Maya
+#       - pivots, rotateAxis and shear are ignored in the transform math, the matrix
+#           nodes decompose and compose like matrixtools.mathtools does (like Maya's,
+#           shear included)
+#       - maya.api.OpenMaya and OpenMayaAnim are only put in sys.modules once something
+#           imports them, like Maya's, so lazy imports can be checked
+#
+###########################################################################################
+
+import bisect
+import importlib.util
+import math
+import os
+import re
+import runpy
+import sys
+import types
+from collections import OrderedDict
+
+from matrixtools import mathtools
+
+MATRIX_ATTRS = ["worldMatrix", "worldInverseMatrix", "matrix", "inverseMatrix",
+                "parentMatrix", "parentInverseMatrix", "offsetParentMatrix",
+                "xformMatrix", "outputMatrix", "matrixSum", "output", "outMatrix"]
+IDENTITY = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+# Defaults that differ from 0 per node type
+NODE_DEFAULTS = {"multDoubleLinear": {"input2": 1.0},
+                 "blendColors": {"blender": 0.5, "color1": [(1.0, 0.0, 0.0)],
+                                 "color2": [(0.0, 0.0, 1.0)]},
+                 "fourByFourMatrix": {"in00": 1.0, "in11": 1.0, "in22": 1.0, "in33": 1.0},
+                 "pickMatrix": {"useTranslate": 1, "useRotate": 1, "useScale": 1,
+                                "useShear": 1},
+                 "blendMatrix": {"envelope": 1.0},
+                 "multiplyDivide": {"operation": 1, "input2X": 1.0, "input2Y": 1.0,
+                                    "input2Z": 1.0},
+                 "plusMinusAverage": {"operation": 1},
+                 "condition": {"colorIfFalseR": 1.0, "colorIfFalseG": 1.0,
+                               "colorIfFalseB": 1.0},
+                 "aimMatrix": {"primaryInputAxisX": 1.0, "secondaryInputAxisY": 1.0,
+                               "primaryMode": 1}}
+DAG_TYPES = ["transform", "joint", "locator", "nurbsCurve", "nurbsSurface", "mesh",
+             "clusterHandle", "deformTwist", "deformSine", "deformBend", "ikHandle",
+             "ikEffector"]
+# Matrices every DAG node computes from its transform and its parents
+DAG_MATRICES = ["worldMatrix", "worldInverseMatrix", "matrix", "inverseMatrix",
+                "parentMatrix", "parentInverseMatrix", "xformMatrix"]
+ROTATE_ORDERS = ["xyz", "yzx", "zxy", "xzy", "yxz", "zyx"]
+ANIM_CURVES = ["animCurveTL", "animCurveTA", "animCurveTU", "animCurveUU"]
+# Nodes whose outputs the stand-in computes from their inputs (Scene.eval_<type>)
+EVAL_TYPES = dict([(nodeType, nodeType) for nodeType in
+                   ["multMatrix", "wtAddMatrix", "decomposeMatrix", "quatToEuler",
+                    "multDoubleLinear", "blendColors", "pickMatrix", "blendMatrix"]] +
+                  [(nodeType, "animCurve") for nodeType in ANIM_CURVES])
+# Index of each single channel of a compound (outputTranslateX, colorR, outputQuatW...)
+CHANNELS = {"X": 0, "Y": 1, "Z": 2, "W": 3, "R": 0, "G": 1, "B": 2}
+# Commands that only read the scene, any other command drops the evaluated values
+READ_COMMANDS = ["getAttr", "ls", "objExists", "listConnections", "listRelatives",
+                 "listAttr", "attributeQuery", "connectionInfo", "nodeType", "objectType"]
+# Attributes a DAG node's world matrix depends on. A node with any of them connected
+# isn't cached since the stand-in doesn't track what its sources depend on
+XFORM_PLUGS = ["{}{}".format(attr, axis) for attr in ["translate", "rotate", "scale",
+                                                     "jointOrient"]
+               for axis in ["", "X", "Y", "Z"]] + ["rotateOrder", "offsetParentMatrix",
+                                                   "inheritsTransform"]
+
+
+class MMatrix:
+    """
+    Stand-in for OpenMaya's MMatrix (row-major 4x4, row vectors like Maya)
+    """
+
+    def __init__(self, values=None):
+        if values is None:
+            values = IDENTITY
+        elif len(values) == 4:
+            # Nested rows
+            values = [v for row in values for v in row]
+        self.values = [float(v) for v in values]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return 16
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __mul__(self, other):
+        a = self.values
+        b = list(other)
+        out = []
+        for r in range(4):
+            for c in range(4):
+                out.append(sum([a[r * 4 + k] * b[k * 4 + c] for k in range(4)]))
+        return MMatrix(out)
+
+    def __eq__(self, other):
+        return self.isEquivalent(other, 0.0)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "MMatrix({})".format(self.values)
+
+    def getElement(self, row, col):
+        return self.values[row * 4 + col]
+
+    def setElement(self, row, col, value):
+        self.values[row * 4 + col] = float(value)
+
+    def isEquivalent(self, other, tolerance=1e-10):
+        return all([abs(a - b) <= tolerance for a, b in zip(self.values, list(other))])
+
+    def transpose(self):
+        return MMatrix([self.values[c * 4 + r] for r in range(4) for c in range(4)])
+
+    def inverse(self):
+        """
+        Gauss-Jordan inverse
+        """
+        m = [self.values[r * 4:r * 4 + 4] + [float(r == c) for c in range(4)]
+             for r in range(4)]
+        for col in range(4):
+            pivot = max(range(col, 4), key=lambda r: abs(m[r][col]))
+            if abs(m[pivot][col]) < 1e-12:
+                raise RuntimeError("(kFailure): Matrix is singular")
+            m[col], m[pivot] = m[pivot], m[col]
+            div = m[col][col]
+            m[col] = [v / div for v in m[col]]
+            for r in range(4):
+                if r != col:
+                    factor = m[r][col]
+                    m[r] = [a - factor * b for a, b in zip(m[r], m[col])]
+        return MMatrix([v for row in m for v in row[4:]])
+
+
+def axis_rotation(axis, angle):
+    """
+    Rotation about one axis (radians) as 3x3 rows (row vectors, like Maya)
+    """
+    c = math.cos(angle)
+    s = math.sin(angle)
+    if axis == 0:
+        return [[1.0, 0.0, 0.0], [0.0, c, s], [0.0, -s, c]]
+    if axis == 1:
+        return [[c, 0.0, -s], [0.0, 1.0, 0.0], [s, 0.0, c]]
+    return [[c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0]]
+
+
+def mul_rotation(a, b):
+    """
+    Multiply two 3x3 rotations
+    """
+    return [[sum([a[r][k] * b[k][c] for k in range(3)]) for c in range(3)] for r in range(3)]
+
+
+def euler_to_rotation(rotate, order=0):
+    """
+    Euler rotation in degrees to 3x3 rows, the first axis of the order applied first
+    """
+    rot = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    for letter in ROTATE_ORDERS[int(order)]:
+        i = "xyz".index(letter)
+        if rotate[i]:
+            rot = mul_rotation(rot, axis_rotation(i, math.radians(rotate[i])))
+    return rot
+
+
+def rotation_to_euler(rot, order=0):
+    """
+    3x3 rotation rows to an euler rotation in degrees
+    """
+    i, j, k = ["xyz".index(letter) for letter in ROTATE_ORDERS[int(order)]]
+    parity = 1.0 if (i, j, k) in [(0, 1, 2), (1, 2, 0), (2, 0, 1)] else -1.0
+    result = [0.0, 0.0, 0.0]
+    # rot[c][r] reads the column vector form of the matrix
+    result[i] = math.atan2(parity * rot[j][k], rot[k][k])
+    result[j] = math.asin(min(max(-parity * rot[i][k], -1.0), 1.0))
+    result[k] = math.atan2(parity * rot[i][j], rot[i][i])
+    return tuple([math.degrees(a) for a in result])
+
+
+def compose_matrix(translate, rot, scale, shear=(0.0, 0.0, 0.0)):
+    """
+    Build a matrix from a translate, 3x3 rotation rows, a scale and a shear
+    """
+    rows = mathtools.compose(translate, rot, scale, shear)
+    return MMatrix([v for row in rows for v in row])
+
+
+def decompose_matrix(mtrx):
+    """
+    Split a matrix into its translate, 3x3 rotation rows, scale and shear the way
+    decomposeMatrix does
+    """
+    values = list(mtrx)
+    translate, rot, scale, shear = mathtools.decompose(
+        [values[r * 4:r * 4 + 4] for r in range(4)])
+    return tuple(translate), rot, tuple(scale), tuple(shear)
+
+
+def rotation_to_quat(rot):
+    """
+    3x3 rotation rows to a quaternion (x, y, z, w)
+    """
+    # The textbook formula reads the column vector form of the matrix
+    m = [list(col) for col in zip(*rot)]
+    trace = m[0][0] + m[1][1] + m[2][2]
+    if trace > 0:
+        s = math.sqrt(trace + 1.0) * 2
+        return ((m[2][1] - m[1][2]) / s, (m[0][2] - m[2][0]) / s,
+                (m[1][0] - m[0][1]) / s, s / 4)
+    if m[0][0] > m[1][1] and m[0][0] > m[2][2]:
+        s = math.sqrt(1.0 + m[0][0] - m[1][1] - m[2][2]) * 2
+        return (s / 4, (m[0][1] + m[1][0]) / s, (m[0][2] + m[2][0]) / s,
+                (m[2][1] - m[1][2]) / s)
+    if m[1][1] > m[2][2]:
+        s = math.sqrt(1.0 + m[1][1] - m[0][0] - m[2][2]) * 2
+        return ((m[0][1] + m[1][0]) / s, s / 4, (m[1][2] + m[2][1]) / s,
+                (m[0][2] - m[2][0]) / s)
+    s = math.sqrt(1.0 + m[2][2] - m[0][0] - m[1][1]) * 2
+    return ((m[0][2] + m[2][0]) / s, (m[1][2] + m[2][1]) / s, s / 4,
+            (m[1][0] - m[0][1]) / s)
+
+
+def quat_to_rotation(quat):
+    """
+    Quaternion (x, y, z, w) to 3x3 rotation rows
+    """
+    x, y, z, w = quat
+    return [[1 - 2 * (y * y + z * z), 2 * (x * y + z * w), 2 * (x * z - y * w)],
+            [2 * (x * y - z * w), 1 - 2 * (x * x + z * z), 2 * (y * z + x * w)],
+            [2 * (x * z + y * w), 2 * (y * z - x * w), 1 - 2 * (x * x + y * y)]]
+
+
+def slerp_quat(a, b, t):
+    """
+    Blend between two quaternions along the shortest arc
+    """
+    dot = sum([p * q for p, q in zip(a, b)])
+    if dot < 0:
+        b = [-q for q in b]
+        dot = -dot
+    if dot > 0.9995:
+        # Close enough to blend linearly
+        quat = [p + (q - p) * t for p, q in zip(a, b)]
+    else:
+        angle = math.acos(dot)
+        wa = math.sin((1 - t) * angle) / math.sin(angle)
+        wb = math.sin(t * angle) / math.sin(angle)
+        quat = [p * wa + q * wb for p, q in zip(a, b)]
+    length = math.sqrt(sum([q * q for q in quat]))
+    return tuple([q / length for q in quat])
+
+
+class MFn:
+    """
+    Stand-in for the OpenMaya MFn type constants the tools check
+    """
+    kTransform = 110
+    kJoint = 121
+    kNurbsCurve = 267
+    kNurbsSurface = 294
+    kCurveCVComponent = 529
+    kSurfaceCVComponent = 536
+
+    TYPES = {"transform": kTransform, "joint": kJoint, "nurbsCurve": kNurbsCurve,
+             "nurbsSurface": kNurbsSurface}
+
+
+class MIntArray(list):
+    pass
+
+
+class MDoubleArray(list):
+    pass
+
+
+class MObject:
+    """
+    Stand-in for an MObject, referencing a scene node by name or holding component
+    indices
+    """
+
+    def __init__(self, name=None, apiType=None):
+        self.name = name
+        self.type = apiType
+        self.elements = []
+
+
+class MDagPath:
+    """
+    Stand-in for an MDagPath to a scene node
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def partialPathName(self):
+        return self.name
+
+    def apiType(self):
+        return MFn.TYPES.get(SCENE.get_node(self.name).type, 0)
+
+
+class MSelectionList:
+    """
+    Stand-in for an MSelectionList of scene nodes
+    """
+
+    def __init__(self):
+        self.items = []
+
+    def add(self, name):
+        self.items.append(SCENE.get_node(name).name)
+        return self
+
+    def length(self):
+        return len(self.items)
+
+    def getDependNode(self, i):
+        return MObject(self.items[i])
+
+    def getDagPath(self, i):
+        return MDagPath(self.items[i])
+
+
+class MFnSingleIndexedComponent:
+    """
+    Stand-in for building a component of single indices (curve CVs)
+    """
+
+    def create(self, apiType):
+        self.comp = MObject(apiType=apiType)
+        return self.comp
+
+    def setCompleteData(self, num):
+        self.comp.elements = list(range(num))
+
+
+class MFnDoubleIndexedComponent:
+    """
+    Stand-in for building a component of index pairs (surface CVs), stored as the
+    flat indices skinClusters use (u * number of CVs in v + v)
+    """
+
+    def create(self, apiType):
+        self.comp = MObject(apiType=apiType)
+        return self.comp
+
+    def setCompleteData(self, numU, numV):
+        self.comp.elements = [u * numV + v for u in range(numU) for v in range(numV)]
+
+
+class MSpace:
+    """
+    Stand-in for the OpenMaya MSpace constants
+    """
+    kTransform = 1
+    kObject = 2
+    kWorld = 4
+
+
+class MFnNurbsSurface:
+    """
+    Stand-in for an MFnNurbsSurface of a nurbsPlane. The surface is the bilinear patch
+    through a grid of CVs (flat in XZ unless the "cvs" data was edited), offset by its
+    transform's translate in world space
+    """
+
+    def __init__(self, path):
+        self.node = SCENE.get_node(SCENE.get_shape(path.name))
+        data = self.node.data
+        self.numSpansInU = data.get("spansU", 1)
+        self.numSpansInV = data.get("spansV", 1)
+        self.numCVsInU = self.numSpansInU + 1
+        self.numCVsInV = self.numSpansInV + 1
+        self.knotDomainInU = (0.0, 1.0)
+        self.knotDomainInV = (0.0, 1.0)
+        if "cvs" not in data:
+            width = data.get("width", 1.0)
+            length = data.get("length", width)
+            data["cvs"] = [(width * (float(u) / self.numSpansInU - .5), 0.0,
+                            length * (float(v) / self.numSpansInV - .5))
+                           for u in range(self.numCVsInU) for v in range(self.numCVsInV)]
+
+    def get_offset(self, space):
+        if space != MSpace.kWorld:
+            return (0.0, 0.0, 0.0)
+        return SCENE.cmd_getAttr("{}.translate".format(self.node.parent))[0]
+
+    def cvPositions(self, space=MSpace.kObject):
+        offset = self.get_offset(space)
+        return [tuple([a + b for a, b in zip(cv, offset)]) for cv in self.node.data["cvs"]]
+
+    def getDerivativesAtParam(self, u, v, space=MSpace.kObject, secondOrder=False):
+        SCENE.count("MFnNurbsSurface.getDerivativesAtParam")
+        cvs = self.node.data["cvs"]
+        fu = min(max(u, 0.0), 1.0) * self.numSpansInU
+        fv = min(max(v, 0.0), 1.0) * self.numSpansInV
+        i = min(int(fu), self.numSpansInU - 1)
+        j = min(int(fv), self.numSpansInV - 1)
+        fu -= i
+        fv -= j
+        p00, p01, p10, p11 = [cvs[(i + a) * self.numCVsInV + j + b]
+                              for a, b in [(0, 0), (0, 1), (1, 0), (1, 1)]]
+        offset = self.get_offset(space)
+        point = tuple([(1 - fu) * (1 - fv) * a + (1 - fu) * fv * b + fu * (1 - fv) * c +
+                       fu * fv * d + o for a, b, c, d, o in zip(p00, p01, p10, p11, offset)])
+        dU = tuple([((1 - fv) * (c - a) + fv * (d - b)) * self.numSpansInU
+                    for a, b, c, d in zip(p00, p01, p10, p11)])
+        dV = tuple([((1 - fu) * (b - a) + fu * (d - c)) * self.numSpansInV
+                    for a, b, c, d in zip(p00, p01, p10, p11)])
+        return point, dU, dV
+
+    def getPointAtParam(self, u, v, space=MSpace.kObject):
+        return self.getDerivativesAtParam(u, v, space)[0]
+
+
+class MFnSkinCluster:
+    """
+    Stand-in for OpenMayaAnim's MFnSkinCluster, reading and writing the weight table of
+    a scene skinCluster
+    """
+
+    def __init__(self, obj):
+        self.node = SCENE.get_node(obj.name)
+
+    def getPathAtIndex(self, i):
+        return MDagPath(SCENE.get_shape(self.node.data["geometry"]))
+
+    def influenceObjects(self):
+        return [MDagPath(jnt) for jnt in self.node.data["influences"]]
+
+    def setWeights(self, shape, comp, influences, values, normalize=True):
+        SCENE.count("MFnSkinCluster.setWeights")
+        joints = [self.node.data["influences"][i] for i in influences]
+        weights = self.node.data["weights"]
+        for i, index in enumerate(comp.elements):
+            row = values[i * len(joints):(i + 1) * len(joints)]
+            weights[index] = dict(zip(joints, [float(wt) for wt in row]))
+
+
+class MPlug:
+    """
+    Stand-in for an MPlug, a scene plug by name
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+
+    @property
+    def isNull(self):
+        return self.name is None
+
+    @property
+    def isDestination(self):
+        return SCENE.get_source(self.name) is not None
+
+    def partialName(self):
+        return SCENE.split(self.name)[1]
+
+    def elementByLogicalIndex(self, i):
+        return MPlug("{}[{}]".format(self.name, i))
+
+    def source(self):
+        return MPlug(SCENE.conns.get(self.name))
+
+    def asMObject(self):
+        SCENE.count("MPlug.asMObject")
+        obj = MObject()
+        obj.value = SCENE.cmd_getAttr(self.name)
+        return obj
+
+
+class MFnDependencyNode:
+    """
+    Stand-in for an MFnDependencyNode of a scene node
+    """
+
+    def __init__(self, obj):
+        self.node = SCENE.get_node(obj.name)
+
+    def name(self):
+        return self.node.name
+
+    def typeName(self):
+        return self.node.type
+
+    def findPlug(self, attr, wantNetworkedPlug=False):
+        return MPlug("{}.{}".format(self.node.name, attr))
+
+
+class MFnMatrixData:
+    """
+    Stand-in for an MFnMatrixData reading or creating matrix data
+    """
+
+    def __init__(self, obj=None):
+        self.obj = obj
+
+    def matrix(self):
+        return MMatrix(self.obj.value)
+
+    def create(self, mtrx):
+        self.obj = MObject()
+        self.obj.value = list(mtrx)
+        return self.obj
+
+
+class MQuaternion:
+    """
+    Stand-in for an MQuaternion. Multiplying applies the left rotation first, like
+    multiplying their matrices
+    """
+
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=1.0):
+        self.x, self.y, self.z, self.w = x, y, z, w
+
+    def __iter__(self):
+        return iter([self.x, self.y, self.z, self.w])
+
+    def __mul__(self, other):
+        return MQuaternion(*rotation_to_quat(mul_rotation(quat_to_rotation(self),
+                                                          quat_to_rotation(other))))
+
+    def inverse(self):
+        return MQuaternion(-self.x, -self.y, -self.z, self.w)
+
+    def asEulerRotation(self):
+        return MEulerRotation([math.radians(a) for a in
+                               rotation_to_euler(quat_to_rotation(self))])
+
+
+class MEulerRotation:
+    """
+    Stand-in for an MEulerRotation in radians. The order constants match rotateOrder
+    """
+    kXYZ, kYZX, kZXY, kXZY, kYXZ, kZYX = range(6)
+
+    def __init__(self, x=0.0, y=0.0, z=0.0, order=0):
+        if isinstance(x, (list, tuple)):
+            x, y, z = x
+        self.x, self.y, self.z = x, y, z
+        self.order = order
+
+    def get_rotation(self):
+        return euler_to_rotation([math.degrees(a) for a in [self.x, self.y, self.z]],
+                                 self.order)
+
+    def asQuaternion(self):
+        return MQuaternion(*rotation_to_quat(self.get_rotation()))
+
+    def reorderIt(self, order):
+        rotate = rotation_to_euler(self.get_rotation(), order)
+        self.x, self.y, self.z = [math.radians(a) for a in rotate]
+        self.order = order
+        return self
+
+
+class MTransformationMatrix:
+    """
+    Stand-in for an MTransformationMatrix split into translate, rotation and scale
+    """
+
+    def __init__(self, mtrx=None):
+        self.translate, self.rot, self.scl, self.shr = decompose_matrix(mtrx or MMatrix())
+
+    def translation(self, space):
+        return list(self.translate)
+
+    def rotation(self, asQuaternion=False):
+        quat = MQuaternion(*rotation_to_quat(self.rot))
+        return quat if asQuaternion else quat.asEulerRotation()
+
+    def scale(self, space):
+        return list(self.scl)
+
+
+class MAngle:
+    """
+    Stand-in for an MAngle, the UI unit is degrees
+    """
+    kRadians = 1
+    kDegrees = 2
+
+    def __init__(self, value=0.0, unit=kRadians):
+        self.value = value
+        self.unit = unit
+
+    @staticmethod
+    def uiUnit():
+        return MAngle.kDegrees
+
+    def asRadians(self):
+        return math.radians(self.value) if self.unit == MAngle.kDegrees else self.value
+
+
+class MTime:
+    """
+    Stand-in for an MTime in frames
+    """
+    kFilm = 6
+
+    def __init__(self, value=0.0, unit=kFilm):
+        self.value = float(value)
+        self.unit = unit
+
+    @staticmethod
+    def uiUnit():
+        return MTime.kFilm
+
+
+class MTimeArray(list):
+    pass
+
+
+class MDGContext:
+    """
+    Stand-in for an MDGContext, evaluating the scene at another time
+    """
+
+    def __init__(self, time=None):
+        self.time = time.value if time is not None else None
+
+    def makeCurrent(self):
+        prev = MDGContext()
+        prev.time = SCENE.time
+        SCENE.set_time(SCENE.time if self.time is None else self.time)
+        return prev
+
+
+class MDGModifier:
+    """
+    Stand-in for an MDGModifier. Edits are queued and applied by doIt, undoIt reverts
+    everything the modifier did
+    """
+
+    def __init__(self):
+        self.queue = []
+        self.done = []
+
+    def connect(self, src, dst):
+        self.queue.append(("connect", src.name, dst.name))
+
+    def disconnect(self, src, dst):
+        self.queue.append(("disconnect", src.name, dst.name))
+
+    def newPlugValue(self, plug, data):
+        self.queue.append(("set", plug.name, data.value))
+
+    def deleteNode(self, obj):
+        self.queue.append(("delete", obj.name, None))
+
+    def doIt(self):
+        SCENE.count("MDGModifier.doIt")
+        for op in self.queue:
+            self.done.append(SCENE.apply_edit(*op))
+        self.queue = []
+
+    def undoIt(self):
+        while self.done:
+            self.done.pop()()
+
+
+class MFnAnimCurve:
+    """
+    Stand-in for OpenMayaAnim's MFnAnimCurve. Keys are (frame, value) pairs in internal
+    units (radians for angles)
+    """
+    kAnimCurveTA = 0
+    kAnimCurveTL = 1
+    kAnimCurveTT = 2
+    kAnimCurveTU = 3
+    TYPES = {kAnimCurveTA: "animCurveTA", kAnimCurveTL: "animCurveTL",
+             kAnimCurveTU: "animCurveTU"}
+
+    def __init__(self, obj=None):
+        self.node = SCENE.get_node(obj.name) if obj is not None else None
+
+    def create(self, plug, animCurveType, modifier=None):
+        """
+        Create a curve for a plug. The node exists right away, it drives the plug once
+        the modifier is done
+        """
+        node, attr = SCENE.split(plug.name)
+        # Like Maya, a plug that stays connected (itself or through its compound, the
+        # translate of a translateX) can't get a curve
+        dsts = [plug.name]
+        if attr[:-1] in ["translate", "rotate", "scale"] and attr[-1:] in "XYZ":
+            dsts.append("{}.{}".format(node, attr[:-1]))
+        queued = [op[2] for op in modifier.queue if op[0] == "disconnect"] if modifier else []
+        if [dst for dst in dsts if dst in SCENE.conns and dst not in queued]:
+            raise RuntimeError("(kInvalidParameter): {} is already connected".format(
+                plug.name))
+        name = SCENE.add_node(self.TYPES[animCurveType], "{}_{}".format(node, attr))
+        self.node = SCENE.get_node(name)
+        self.node.data["keys"] = []
+        src = MPlug("{}.output".format(name))
+        if modifier is None:
+            SCENE.cmd_connectAttr(src.name, plug.name, f=True)
+        else:
+            modifier.queue.append(("create", name, None))
+            modifier.connect(src, plug)
+        return MObject(name)
+
+    def addKeys(self, times, values, *args, **kwargs):
+        SCENE.count("MFnAnimCurve.addKeys")
+        SCENE.values = {}
+        keys = dict(self.node.data["keys"])
+        keys.update(zip([time.value for time in times], [float(v) for v in values]))
+        self.node.data["keys"] = sorted(keys.items())
+
+    def evaluate(self, time):
+        return SCENE.eval_key(self.node, time.value)
+
+
+class Node:
+    """
+    A node in the stand-in scene
+    """
+
+    def __init__(self, name, nodeType):
+        self.name = name
+        self.type = nodeType
+        self.parent = None
+        self.attrs = {}
+        self.dynamic = {}
+        self.locked = set()
+        self.data = {}
+
+
+class Scene:
+    """
+    In-memory scene that implements the command subset used by the tools and records
+    every call
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Clear every node, connection and counter
+        """
+        self.nodes = OrderedDict()
+        self.kids = {}
+        self.conns = OrderedDict()
+        # Cached world matrices, every cached node's parents are cached too
+        self.worlds = {}
+        self.selection = []
+        self.calls = {}
+        self.log = []
+        self.warnings = []
+        self.commits = 0
+        self.undoState = True
+        # Names of the undo chunks currently open
+        self.chunks = []
+        self.suspended = False
+        self.evalMode = "parallel"
+        self.time = 1.0
+        self.playback = [1.0, 120.0]
+        # Nodes being evaluated, a node reached again is part of a cycle
+        self.evaluating = set()
+        # Evaluated outputs per node, kept until the scene or the time changes
+        self.values = {}
+
+    def call(self, cmd, args, kwargs):
+        """
+        Count a command call and run it
+        """
+        self.count(cmd)
+        if cmd not in READ_COMMANDS and not (kwargs.get("q") or kwargs.get("query")):
+            self.values = {}
+        for flag, value in kwargs.items():
+            if value is None:
+                # Maya has no value for None and refuses the flag
+                raise TypeError("Invalid flag '{}' for {}: None".format(flag, cmd))
+        return getattr(self, "cmd_{}".format(cmd))(*args, **kwargs)
+
+    def count(self, cmd):
+        """
+        Count a command or API call
+        """
+        self.calls[cmd] = self.calls.get(cmd, 0) + 1
+
+    # --- Scene helpers ---------------------------------------------------------------
+
+    def unique_name(self, name):
+        """
+        Rename the way Maya does when a name is already taken
+        """
+        if name not in self.nodes:
+            return name
+        base = name.rstrip("0123456789")
+        i = 1
+        while "{}{}".format(base, i) in self.nodes:
+            i += 1
+        return "{}{}".format(base, i)
+
+    def add_node(self, nodeType, name=None, parent=None):
+        """
+        Create a node and return its name
+        """
+        name = self.unique_name(name or "{}1".format(nodeType))
+        node = Node(name, nodeType)
+        self.nodes[name] = node
+        if parent is not None:
+            self.set_parent(name, self.get_node(parent).name)
+        return name
+
+    def set_parent(self, name, parent):
+        """
+        Reparent a node and keep the children index up to date
+        """
+        node = self.nodes[name]
+        if node.parent is not None:
+            self.kids[node.parent].remove(name)
+        node.parent = parent
+        if parent is not None:
+            self.kids.setdefault(parent, []).append(name)
+
+    def add_shape(self, transform, nodeType):
+        """
+        Create a shape under a transform
+        """
+        return self.add_node(nodeType, "{}Shape".format(transform), transform)
+
+    def get_node(self, name):
+        """
+        Get a node by name or raise like Maya does
+        """
+        name = self.split(name)[0]
+        if name not in self.nodes:
+            raise RuntimeError("No object matches name: {}".format(name))
+        return self.nodes[name]
+
+    def split(self, plug):
+        """
+        Split a plug into its node and attribute path
+        """
+        name, sep, attr = str(plug).partition(".")
+        return name.split("|")[-1], attr
+
+    def attr_root(self, attr):
+        """
+        Get the top level attribute name of an attribute path
+        """
+        return re.split(r"[\[.]", attr)[0]
+
+    def children(self, name):
+        """
+        Get the direct children of a node
+        """
+        return list(self.kids.get(name, []))
+
+    def descendants(self, name):
+        """
+        Get every node below a node
+        """
+        result = []
+        for child in self.children(name):
+            result.append(child)
+            result.extend(self.descendants(child))
+        return result
+
+    def shapes(self, name):
+        """
+        Get the shapes of a transform
+        """
+        return [c for c in self.children(name) if self.nodes[c].type not in
+                ["transform", "joint"]]
+
+    def get_shape(self, name):
+        """
+        Get a node's shape, or the node itself if it's a shape
+        """
+        shapes = self.shapes(self.split(name)[0])
+        return shapes[0] if shapes else self.split(name)[0]
+
+    def get_cv_count(self, name):
+        """
+        Get the number of CVs of a curve, or in u and v of a surface (degree 3 unless
+        built from points)
+        """
+        data = self.get_node(self.get_shape(name)).data
+        if "spansU" in data:
+            return data["spansU"] + 3, data["spansV"] + 3
+        if "spans" in data:
+            return data["spans"] + 3, 1
+        return len(data.get("points", [])), 1
+
+    def get_cv_indices(self, component):
+        """
+        Get the flat CV indices of a component string (geo.cv[2][0:3], geo.cv[4])
+        """
+        numU, numV = self.get_cv_count(component)
+        ranges = []
+        for item in re.findall(r"\[([^\]]+)\]", component.partition(".")[2]):
+            if item == "*":
+                ranges.append(None)
+                continue
+            first, sep, last = item.partition(":")
+            ranges.append(list(range(int(first), int(last or first) + 1)))
+        us = ranges[0] if ranges and ranges[0] is not None else list(range(numU))
+        vs = ranges[1] if len(ranges) > 1 and ranges[1] is not None else list(range(numV))
+        if numV == 1:
+            return us
+        return [u * numV + v for u in us for v in vs]
+
+    def default_value(self, node, attr):
+        """
+        Value of an attribute that was never set
+        """
+        root = self.attr_root(attr)
+        if attr in NODE_DEFAULTS.get(node.type, {}):
+            return NODE_DEFAULTS[node.type][attr]
+        if root in MATRIX_ATTRS:
+            return list(IDENTITY)
+        if root in ["translate", "rotate", "jointOrient"]:
+            return [(0.0, 0.0, 0.0)]
+        if root == "scale":
+            return [(1.0, 1.0, 1.0)]
+        if root.startswith("scale") or root in ["visibility", "inheritsTransform"]:
+            return 1.0
+        if root == "arcLength":
+            return self.cmd_arclen(self.get_shape(node.name))
+        return 0.0
+
+    def get_vector(self, name, attr):
+        """
+        Get a compound value (translate, rotate...) of a node as a tuple
+        """
+        return tuple(self.cmd_getAttr("{}.{}".format(name, attr))[0])
+
+    def is_transform(self, node):
+        """
+        Check if a node has a transform of its own (shapes follow their parent's)
+        """
+        return node.type in ["transform", "joint"] or node.parent is None
+
+    def get_local_matrix(self, name):
+        """
+        Matrix of a transform's translate, rotate (rotateOrder and jointOrient included)
+        and scale. Pivots and rotateAxis are ignored
+        """
+        node = self.get_node(name)
+        if not self.is_transform(node):
+            return MMatrix()
+        rot = euler_to_rotation(self.get_vector(node.name, "rotate"),
+                                self.cmd_getAttr("{}.rotateOrder".format(node.name)))
+        if node.type == "joint":
+            rot = mul_rotation(rot, euler_to_rotation(
+                self.get_vector(node.name, "jointOrient")))
+        return compose_matrix(self.get_vector(node.name, "translate"), rot,
+                              self.get_vector(node.name, "scale"))
+
+    def get_parent_matrix(self, name):
+        """
+        Matrix a transform's own matrix is multiplied by: its offsetParentMatrix and,
+        unless it doesn't inherit transforms, its parent's world matrix
+        """
+        node = self.get_node(name)
+        if not self.is_transform(node):
+            return self.get_world_matrix(node.parent)
+        mtrx = MMatrix(self.cmd_getAttr("{}.offsetParentMatrix".format(node.name)))
+        if node.parent is not None and self.cmd_getAttr(
+                "{}.inheritsTransform".format(node.name)):
+            parent = self.get_world_matrix(node.parent)
+            mtrx = parent if mtrx.values == IDENTITY else mtrx * parent
+        return mtrx
+
+    def get_world_matrix(self, name):
+        """
+        World matrix of a DAG node, cached until it or one of its parents changes
+        """
+        name = self.split(name)[0]
+        if name in self.worlds:
+            return self.worlds[name]
+        mtrx = self.get_local_matrix(name) * self.get_parent_matrix(name)
+        parent = self.get_node(name).parent
+        if (parent is None or parent in self.worlds) and not any(
+                ["{}.{}".format(name, attr) in self.conns for attr in XFORM_PLUGS]):
+            self.worlds[name] = mtrx
+        return mtrx
+
+    def dirty(self, name):
+        """
+        Drop the cached world matrix of a node and everything below it, and every
+        evaluated value
+        """
+        self.values = {}
+        name = self.split(name)[0]
+        if name not in self.worlds:
+            # Nothing below an uncached node is cached
+            return
+        del self.worlds[name]
+        for child in self.kids.get(name, []):
+            self.dirty(child)
+
+    def get_dag_matrix(self, name, attr):
+        """
+        Compute one of a DAG node's matrix attributes
+        """
+        if attr in ["matrix", "xformMatrix"]:
+            return self.get_local_matrix(name)
+        if attr == "inverseMatrix":
+            return self.get_local_matrix(name).inverse()
+        if attr == "parentMatrix":
+            node = self.get_node(name)
+            # The parent's world matrix, or identity for a world space node
+            if node.parent is None:
+                return MMatrix()
+            return self.get_world_matrix(node.parent)
+        if attr == "parentInverseMatrix":
+            return self.get_dag_matrix(name, "parentMatrix").inverse()
+        if attr == "worldInverseMatrix":
+            return self.get_world_matrix(name).inverse()
+        return self.get_world_matrix(name)
+
+    def set_world_matrix(self, name, mtrx):
+        """
+        Set a transform's translate, rotate and scale so its world matrix matches
+        """
+        node = self.get_node(name)
+        local = MMatrix(mtrx) * self.get_parent_matrix(node.name).inverse()
+        translate, rot, scale, shear = decompose_matrix(local)
+        if node.type == "joint":
+            # Take the joint orient back out of the rotation
+            orient = euler_to_rotation(self.get_vector(node.name, "jointOrient"))
+            rot = mul_rotation(rot, [list(row) for row in zip(*orient)])
+        rotate = rotation_to_euler(rot, self.cmd_getAttr("{}.rotateOrder".format(node.name)))
+        self.dirty(node.name)
+        node.attrs["translate"] = [translate]
+        node.attrs["rotate"] = [rotate]
+        node.attrs["scale"] = [scale]
+
+    def get_connected_value(self, plug):
+        """
+        Read the source of a connected plug when the stand-in knows its value (any
+        attribute of a DAG node, one that was set or an output it evaluates). Other
+        utility node outputs aren't evaluated so their destinations keep their own value
+        """
+        src = self.conns.get(plug)
+        if src is None:
+            return None
+        node, attr = self.split(src)
+        n = self.nodes.get(node)
+        if n is None:
+            return None
+        if n.type in EVAL_TYPES:
+            value = self.evaluate(n, attr)
+            if value is not None:
+                return value
+        if n.type not in DAG_TYPES and attr not in n.attrs:
+            return None
+        return self.cmd_getAttr(src)
+
+    def get_channel_value(self, node, attr):
+        """
+        Read a transform channel through the connection of its compound (translateX of a
+        driven translate) or a compound through the connections of its channels
+        """
+        if attr in ["translate", "rotate", "scale"]:
+            plugs = ["{}.{}{}".format(node.name, attr, axis) for axis in "XYZ"]
+            if [plug for plug in plugs if plug in self.conns]:
+                return [tuple([self.cmd_getAttr(plug) for plug in plugs])]
+        elif attr[:-1] in ["translate", "rotate", "scale"] and attr[-1:] in "XYZ":
+            value = self.get_connected_value("{}.{}".format(node.name, attr[:-1]))
+            if value is not None:
+                return value[0][CHANNELS[attr[-1]]]
+        return None
+
+    # --- Evaluation ----------------------------------------------------------------------
+
+    def set_time(self, time):
+        """
+        Move to another frame, everything animated has to be read again
+        """
+        self.time = float(time)
+        self.worlds = {}
+        self.values = {}
+
+    def evaluate(self, node, attr):
+        """
+        Compute an output of a node the stand-in evaluates (EVAL_TYPES), None for any
+        other attribute or when the node is part of a cycle
+        """
+        outputs = self.values.get(node.name)
+        if outputs is None:
+            if node.name in self.evaluating:
+                return None
+            self.evaluating.add(node.name)
+            try:
+                outputs = getattr(self, "eval_{}".format(EVAL_TYPES[node.type]))(node)
+            finally:
+                self.evaluating.discard(node.name)
+            self.values[node.name] = outputs
+        if attr in outputs:
+            return outputs[attr]
+        base, axis = attr[:-1], attr[-1:]
+        if base in outputs and axis in CHANNELS:
+            return outputs[base][0][CHANNELS[axis]]
+        return None
+
+    def get_indices(self, node, attr):
+        """
+        Get the indices of a multi attribute that are set or connected
+        """
+        prefix = "{}[".format(attr)
+        start = "{}.{}".format(node.name, prefix)
+        plugs = list(node.attrs) + [dst[len(node.name) + 1:] for dst in self.conns
+                                    if dst.startswith(start)]
+        return sorted(set([int(plug[len(prefix):].split("]")[0]) for plug in plugs
+                           if plug.startswith(prefix)]))
+
+    def get_input(self, node, attr):
+        return self.cmd_getAttr("{}.{}".format(node.name, attr))
+
+    def get_input_matrix(self, node, attr):
+        value = self.get_input(node, attr)
+        if isinstance(value, list) and len(value) == 16:
+            return MMatrix(value)
+        return MMatrix()
+
+    def get_input_vector(self, node, attr, axes="XYZ"):
+        value = self.get_input(node, attr)
+        if isinstance(value, list) and value and isinstance(value[0], tuple):
+            return value[0]
+        return tuple([self.get_input(node, "{}{}".format(attr, axis)) for axis in axes])
+
+    def get_weight(self, node, attr):
+        """
+        Read a weight that defaults to 1
+        """
+        if "{}.{}".format(node.name, attr) in self.conns or attr in node.attrs:
+            return self.get_input(node, attr)
+        return 1.0
+
+    def eval_key(self, node, time):
+        """
+        Value of an animation curve at a frame, linear between keys and flat outside
+        """
+        keys = node.data.get("keys") or []
+        if not keys:
+            return 0.0
+        if time <= keys[0][0]:
+            return keys[0][1]
+        if time >= keys[-1][0]:
+            return keys[-1][1]
+        i = bisect.bisect_right([key[0] for key in keys], time)
+        (t0, v0), (t1, v1) = keys[i - 1], keys[i]
+        return v0 + (v1 - v0) * (time - t0) / (t1 - t0)
+
+    def eval_animCurve(self, node):
+        value = self.eval_key(node, self.time)
+        if node.type == "animCurveTA":
+            # Stored in radians, read in degrees
+            value = math.degrees(value)
+        return {"output": value}
+
+    def eval_multMatrix(self, node):
+        mtrx = MMatrix()
+        for i in self.get_indices(node, "matrixIn"):
+            mtrx = mtrx * self.get_input_matrix(node, "matrixIn[{}]".format(i))
+        return {"matrixSum": list(mtrx)}
+
+    def eval_wtAddMatrix(self, node):
+        values = [0.0] * 16
+        for i in self.get_indices(node, "wtMatrix"):
+            weight = self.get_input(node, "wtMatrix[{}].weightIn".format(i))
+            mtrx = self.get_input_matrix(node, "wtMatrix[{}].matrixIn".format(i))
+            values = [v + weight * m for v, m in zip(values, mtrx)]
+        return {"matrixSum": values}
+
+    def eval_decomposeMatrix(self, node):
+        translate, rot, scale, shear = decompose_matrix(
+            self.get_input_matrix(node, "inputMatrix"))
+        order = int(self.get_input(node, "inputRotateOrder"))
+        return {"outputTranslate": [translate],
+                "outputRotate": [rotation_to_euler(rot, order)],
+                "outputScale": [scale],
+                "outputShear": [shear],
+                "outputQuat": [rotation_to_quat(rot)]}
+
+    def eval_quatToEuler(self, node):
+        quat = self.get_input_vector(node, "inputQuat", "XYZW")
+        order = int(self.get_input(node, "inputRotateOrder"))
+        return {"outputRotate": [rotation_to_euler(quat_to_rotation(quat), order)]}
+
+    def eval_multDoubleLinear(self, node):
+        return {"output": self.get_input(node, "input1") * self.get_input(node, "input2")}
+
+    def eval_blendColors(self, node):
+        blender = self.get_input(node, "blender")
+        color1 = self.get_input_vector(node, "color1", "RGB")
+        color2 = self.get_input_vector(node, "color2", "RGB")
+        return {"output": [tuple([a * blender + b * (1 - blender)
+                                  for a, b in zip(color1, color2)])]}
+
+    def eval_pickMatrix(self, node):
+        mtrx = self.get_input_matrix(node, "inputMatrix")
+        use = [self.get_input(node, attr) for attr in ["useTranslate", "useRotate",
+                                                       "useScale", "useShear"]]
+        if all(use):
+            return {"outputMatrix": list(mtrx)}
+        translate, rot, scale, shear = decompose_matrix(mtrx)
+        if not use[0]:
+            translate = (0.0, 0.0, 0.0)
+        if not use[1]:
+            rot = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        if not use[2]:
+            scale = (1.0, 1.0, 1.0)
+        if not use[3]:
+            shear = (0.0, 0.0, 0.0)
+        return {"outputMatrix": list(compose_matrix(translate, rot, scale, shear))}
+
+    def eval_blendMatrix(self, node):
+        mtrx = self.get_input_matrix(node, "inputMatrix")
+        envelope = self.get_input(node, "envelope")
+        translate, rot, scale, shear = decompose_matrix(mtrx)
+        quat = rotation_to_quat(rot)
+        for i in self.get_indices(node, "target"):
+            target = "target[{}]".format(i)
+            weight = envelope * self.get_weight(node, "{}.weight".format(target))
+            wts = [weight * self.get_weight(node, "{}.{}Weight".format(target, channel))
+                   for channel in ["translate", "rotate", "scale", "shear"]]
+            t2, r2, s2, sh2 = decompose_matrix(
+                self.get_input_matrix(node, "{}.targetMatrix".format(target)))
+            # Each target layers over the result of the ones before it
+            translate = [a + (b - a) * wts[0] for a, b in zip(translate, t2)]
+            quat = slerp_quat(quat, rotation_to_quat(r2), wts[1])
+            scale = [a + (b - a) * wts[2] for a, b in zip(scale, s2)]
+            shear = [a + (b - a) * wts[3] for a, b in zip(shear, sh2)]
+        return {"outputMatrix": list(compose_matrix(translate, quat_to_rotation(quat), scale,
+                                                    shear))}
+
+    def apply_edit(self, op, plug, value):
+        """
+        Apply one queued MDGModifier edit and return what undoes it
+        """
+        if op == "connect":
+            prev = self.conns.get(value)
+            self.cmd_connectAttr(plug, value, f=True)
+            if prev is None:
+                return lambda: self.cmd_disconnectAttr(plug, value)
+            return lambda: self.cmd_connectAttr(prev, value, f=True)
+        if op == "disconnect":
+            self.cmd_disconnectAttr(plug, value)
+            return lambda: self.cmd_connectAttr(plug, value, f=True)
+        if op == "set":
+            node, attr = self.split(plug)
+            n = self.get_node(node)
+            prev = n.attrs.get(attr)
+            self.dirty(node)
+            n.attrs[attr] = value
+
+            def undo():
+                self.dirty(node)
+                if prev is None:
+                    n.attrs.pop(attr, None)
+                else:
+                    n.attrs[attr] = prev
+            return undo
+        if op == "create":
+            return lambda: self.cmd_delete(plug) if plug in self.nodes else None
+        # Deleting can take children and connections along, undo puts the whole scene
+        # back the way it was
+        nodes = OrderedDict(self.nodes)
+        conns = OrderedDict(self.conns)
+        kids = dict([(name, list(items)) for name, items in self.kids.items()])
+        self.cmd_delete(plug)
+
+        def restore():
+            self.nodes, self.conns, self.kids = nodes, conns, kids
+            self.worlds = {}
+            self.values = {}
+        return restore
+
+    def get_attr_type(self, node, attr):
+        """
+        Data type of an attribute, the way getAttr(type=True) reports it
+        """
+        if attr in node.dynamic:
+            return "matrix" if node.dynamic[attr] == "matrix" else "double"
+        value = node.attrs.get(attr)
+        if self.attr_root(attr) in MATRIX_ATTRS or "atrix" in attr or (
+                isinstance(value, list) and len(value) == 16):
+            return "matrix"
+        if isinstance(value, list):
+            return "double3"
+        return "double"
+
+    # --- Stand-in backend for BuildPlan.flush() -----------------------------------------
+
+    def create(self, nodeType, name):
+        return self.add_node(nodeType, name)
+
+    def get_name(self, name):
+        return name
+
+    def add_attr(self, node, longName, attrType, niceName=None):
+        self.cmd_addAttr(node, ln=longName, at=attrType, nn=niceName)
+
+    def set_attr(self, plug, value, valueType=None):
+        if isinstance(value, (list, tuple)):
+            self.cmd_setAttr(plug, *value, type=valueType)
+        else:
+            self.cmd_setAttr(plug, value)
+
+    def connect(self, src, dst, force=False):
+        self.cmd_connectAttr(src, dst, f=force)
+
+    def disconnect(self, src, dst):
+        self.cmd_disconnectAttr(src, dst)
+
+    def get_type(self, node):
+        return self.nodes[node].type if node in self.nodes else None
+
+    def has_attr(self, plug):
+        return self.cmd_objExists(plug)
+
+    def is_settable(self, plug):
+        name, attr = self.split(plug)
+        if name not in self.nodes:
+            return False
+        node = self.nodes[name]
+        root = self.attr_root(attr)
+        # Only dynamic attributes and set values are known not to be outputs, the
+        # transform matrices (offsetParentMatrix too) always stay live
+        return root in node.dynamic or (attr in node.attrs and root not in MATRIX_ATTRS)
+
+    def get_source(self, plug):
+        return self.conns.get(plug)
+
+    def get_inputs(self, node):
+        return [(src, dst) for dst, src in self.conns.items() if self.split(dst)[0] == node]
+
+    def get_outputs(self, node):
+        return [dst for dst, src in self.conns.items() if self.split(src)[0] == node]
+
+    def delete(self, node):
+        self.cmd_delete(node)
+
+    def get_value(self, plug):
+        value = self.cmd_getAttr(plug)
+        if isinstance(value, list) and len(value) == 1 and isinstance(value[0], tuple):
+            return list(value[0])
+        return value
+
+    def commit(self):
+        self.commits += 1
+
+    # --- Commands ------------------------------------------------------------------------
+
+    def cmd_ls(self, *args, **kwargs):
+        if kwargs.get("sl") or kwargs.get("selection"):
+            return list(self.selection)
+        names = []
+        for arg in args:
+            names.extend(arg if isinstance(arg, (list, tuple)) else [arg])
+        if not args:
+            names = list(self.nodes)
+        found = [n for n in names if self.cmd_objExists(n)]
+        nodeType = kwargs.get("type")
+        if nodeType is not None:
+            nodeTypes = nodeType if isinstance(nodeType, (list, tuple)) else [nodeType]
+            found = [n for n in found if self.get_node(n).type in nodeTypes]
+        return found
+
+    def cmd_objExists(self, name):
+        node, attr = self.split(name)
+        if node not in self.nodes:
+            return False
+        if not attr:
+            return True
+        root = self.attr_root(attr)
+        n = self.nodes[node]
+        return root in n.dynamic or root in n.attrs or attr in n.attrs
+
+    def cmd_createNode(self, nodeType, n=None, name=None, p=None, parent=None,
+                       ss=False, skipSelect=False):
+        return self.add_node(nodeType, n or name, p or parent)
+
+    def cmd_shadingNode(self, nodeType, asUtility=False, asShader=False, n=None,
+                        name=None):
+        return self.add_node(nodeType, n or name)
+
+    def cmd_spaceLocator(self, n=None, name=None, p=None, position=None):
+        transform = self.add_node("transform", n or name or "locator1")
+        self.add_shape(transform, "locator")
+        self.selection = [transform]
+        return [transform]
+
+    def cmd_joint(self, *args, **kwargs):
+        name = kwargs.get("n") or kwargs.get("name") or "joint1"
+        parent = None
+        if self.selection and self.nodes[self.selection[-1]].type == "joint":
+            # New joints are children of the selected joint
+            parent = self.selection[-1]
+        jnt = self.add_node("joint", name, parent)
+        roo = kwargs.get("roo") or kwargs.get("rotationOrder")
+        if roo is not None:
+            self.nodes[jnt].attrs["rotateOrder"] = ROTATE_ORDERS.index(roo)
+        if "p" in kwargs or "position" in kwargs:
+            pos = kwargs.get("p") or kwargs.get("position")
+            self.nodes[jnt].attrs["translate"] = [tuple(pos)]
+        self.selection = [jnt]
+        return jnt
+
+    def cmd_curve(self, d=3, p=None, n=None, name=None, **kwargs):
+        transform = self.add_node("transform", n or name or "curve1")
+        shape = self.add_shape(transform, "nurbsCurve")
+        self.nodes[shape].data["points"] = [tuple(pt) for pt in (p or [])]
+        self.selection = [transform]
+        return transform
+
+    def cmd_nurbsPlane(self, *args, **kwargs):
+        name = kwargs.get("name") or kwargs.get("n") or "nurbsPlane1"
+        transform = self.add_node("transform", name)
+        shape = self.add_shape(transform, "nurbsSurface")
+        width = kwargs.get("w", 1.0)
+        self.nodes[shape].data.update({"width": width, "spansU": kwargs.get("u", 1),
+                                       "spansV": kwargs.get("v", 1),
+                                       "length": width * kwargs.get("lr", 1.0)})
+        history = self.add_node("makeNurbPlane", "makeNurbPlane1")
+        self.selection = [transform]
+        return [transform, history]
+
+    def cmd_duplicateCurve(self, iso, ch=True, rn=False, l=False, n=None, name=None):
+        surface = self.get_node(self.get_shape(iso))
+        transform = self.add_node("transform", n or name or "duplicatedCurve1")
+        shape = self.add_shape(transform, "nurbsCurve")
+        width = surface.data.get("width", 1.0)
+        self.nodes[shape].data["points"] = [(-width * .5, 0, 0), (width * .5, 0, 0)]
+        # The iso curve has as many spans as the surface has in u
+        self.nodes[shape].data["spans"] = surface.data.get("spansU", 1)
+        return [transform]
+
+    def cmd_detachCurve(self, param, ch=True, n=None, name=None, **kwargs):
+        curve = self.split(param)[0]
+        points = self.nodes[self.get_shape(curve)].data.get("points", [])
+        mid = tuple([(a + b) * .5 for a, b in zip(points[0], points[-1])]) if points else (0, 0, 0)
+        base = n or name or "{}detachedCurve".format(curve)
+        crvs = []
+        for pts in [[points[0], mid], [mid, points[-1]]] if points else [[], []]:
+            transform = self.add_node("transform", base)
+            shape = self.add_shape(transform, "nurbsCurve")
+            self.nodes[shape].data["points"] = pts
+            crvs.append(transform)
+        return crvs + [self.add_node("detachCurve", "detachCurve1")]
+
+    def cmd_arclen(self, curve, **kwargs):
+        points = self.get_node(self.get_shape(curve)).data.get("points", [])
+        length = 0.0
+        for a, b in zip(points[:-1], points[1:]):
+            length += math.sqrt(sum([(x - y) ** 2 for x, y in zip(a, b)]))
+        return length
+
+    def cmd_cluster(self, *components, **kwargs):
+        name = kwargs.get("n") or kwargs.get("name") or "cluster1"
+        deformer = self.add_node("cluster", name)
+        handle = self.add_node("transform", "{}Handle".format(deformer))
+        self.add_shape(handle, "clusterHandle")
+        return [deformer, handle]
+
+    def cmd_nonLinear(self, *objs, **kwargs):
+        defType = kwargs.get("type", "twist")
+        deformer = self.add_node("nonLinear", "{}1".format(defType))
+        handle = self.add_node("transform", "{}1Handle".format(defType))
+        self.add_shape(handle, "deform{}".format(defType.capitalize()))
+        return [deformer, handle]
+
+    def cmd_blendShape(self, *args, **kwargs):
+        if kwargs.get("q") or kwargs.get("query"):
+            return list(self.get_node(args[0]).data.get("targets", []))
+        if kwargs.get("edit") or kwargs.get("e"):
+            target = kwargs.get("t")
+            self.get_node(args[0]).data.setdefault("targets", []).append(target[2])
+            return [args[0]]
+        bs = self.add_node("blendShape", kwargs.get("n") or kwargs.get("name"))
+        self.nodes[bs].data["targets"] = list(args[:-1])
+        return [bs]
+
+    def cmd_duplicate(self, obj, name=None, n=None, **kwargs):
+        src = self.get_node(obj)
+        dup = self.add_node(src.type, name or n or src.name, src.parent)
+        self.nodes[dup].attrs = dict(src.attrs)
+        for shape in self.shapes(src.name):
+            copy = self.add_shape(dup, self.nodes[shape].type)
+            self.nodes[copy].data = dict(self.nodes[shape].data)
+        return [dup]
+
+    def cmd_group(self, *objs, **kwargs):
+        grp = self.add_node("transform", kwargs.get("n") or kwargs.get("name") or "group1")
+        self.cmd_parent(*(list(objs) + [grp]))
+        return grp
+
+    def cmd_rename(self, old, new):
+        node = self.get_node(old)
+        old = node.name
+        new = self.unique_name(new)
+        self.worlds.clear()
+        del self.nodes[old]
+        node.name = new
+        self.nodes[new] = node
+        if node.parent is not None:
+            siblings = self.kids[node.parent]
+            siblings[siblings.index(old)] = new
+        for child in self.kids.get(old, []):
+            self.nodes[child].parent = new
+        if old in self.kids:
+            self.kids[new] = self.kids.pop(old)
+        conns = OrderedDict()
+        for dst, src in self.conns.items():
+            # Keep connections pointing at the renamed node
+            conns[self.rename_plug(dst, old, new)] = self.rename_plug(src, old, new)
+        self.conns = conns
+        self.selection = [new if s == old else s for s in self.selection]
+        return new
+
+    def rename_plug(self, plug, old, new):
+        node, sep, attr = plug.partition(".")
+        return "{}{}{}".format(new if node == old else node, sep, attr)
+
+    def cmd_delete(self, *objs, **kwargs):
+        names = []
+        for obj in objs:
+            names.extend(obj if isinstance(obj, (list, tuple)) else [obj])
+        dead = set()
+        self.worlds.clear()
+        self.values = {}
+        for name in names:
+            name = self.split(name)[0]
+            if name not in self.nodes or name in dead:
+                continue
+            self.set_parent(name, None)
+            for node in [name] + self.descendants(name):
+                dead.add(node)
+                self.kids.pop(node, None)
+                del self.nodes[node]
+        for dst, src in list(self.conns.items()):
+            if self.split(dst)[0] in dead or self.split(src)[0] in dead:
+                del self.conns[dst]
+        self.selection = [s for s in self.selection if s in self.nodes]
+
+    def cmd_parent(self, *args, **kwargs):
+        objs = list(args)
+        if kwargs.get("w") or kwargs.get("world"):
+            parent = None
+        else:
+            parent = self.get_node(objs.pop()).name
+        relative = kwargs.get("r") or kwargs.get("relative")
+        for obj in objs:
+            node = self.get_node(obj)
+            if relative or node.type not in ["transform", "joint"]:
+                self.dirty(node.name)
+                self.set_parent(node.name, parent)
+                continue
+            # Keep the object where it is in world space, like Maya does
+            before = self.get_parent_matrix(node.name)
+            self.dirty(node.name)
+            self.set_parent(node.name, parent)
+            if before != self.get_parent_matrix(node.name):
+                self.set_world_matrix(node.name, self.get_local_matrix(node.name) * before)
+        return objs
+
+    def cmd_listRelatives(self, obj, p=False, parent=False, s=False, shapes=False,
+                          c=False, children=False, ad=False, allDescendents=False,
+                          type=None, **kwargs):
+        node = self.get_node(obj)
+        if p or parent:
+            if node.parent is None or (type is not None and
+                                       self.nodes[node.parent].type != type):
+                return None
+            return [node.parent]
+        if ad or allDescendents:
+            result = self.descendants(node.name)
+        elif s or shapes:
+            result = self.shapes(node.name)
+        else:
+            result = self.children(node.name)
+        if type is not None:
+            result = [r for r in result if self.nodes[r].type == type]
+        return result or None
+
+    def cmd_objectType(self, obj, isType=None, **kwargs):
+        nodeType = self.get_node(obj).type
+        if isType is not None:
+            return nodeType == isType
+        return nodeType
+
+    def cmd_nodeType(self, obj, **kwargs):
+        return self.get_node(obj).type
+
+    def cmd_select(self, *objs, **kwargs):
+        names = []
+        for obj in objs:
+            names.extend(obj if isinstance(obj, (list, tuple)) else [obj])
+        if kwargs.get("cl") or kwargs.get("clear"):
+            self.selection = []
+        elif kwargs.get("add"):
+            self.selection.extend([self.get_node(n).name for n in names])
+        else:
+            self.selection = [self.get_node(n).name for n in names]
+
+    def cmd_matchTransform(self, obj, target, **kwargs):
+        self.set_world_matrix(obj, self.get_world_matrix(target))
+
+    def cmd_xform(self, obj, **kwargs):
+        node = self.get_node(obj)
+        ws = kwargs.get("ws") or kwargs.get("worldSpace")
+        if kwargs.get("q") or kwargs.get("query"):
+            if kwargs.get("m") or kwargs.get("matrix"):
+                return list(self.get_world_matrix(obj) if ws else self.get_local_matrix(obj))
+            if ws:
+                translate, rot, scale, shear = decompose_matrix(self.get_world_matrix(obj))
+                order = self.cmd_getAttr("{}.rotateOrder".format(node.name))
+                values = {"t": translate, "ro": rotation_to_euler(rot, order), "s": scale}
+            else:
+                values = dict([(flag, self.get_vector(node.name, attr)) for flag, attr in
+                               [("t", "translate"), ("ro", "rotate"), ("s", "scale")]])
+            for flag in ["t", "ro", "s"]:
+                if kwargs.get(flag):
+                    return list(values[flag])
+            return None
+        if "piv" in kwargs:
+            node.data["pivot"] = kwargs["piv"]
+        self.dirty(node.name)
+        if ws and "t" in kwargs:
+            # Bring a world space position into the parent's space
+            point = MMatrix([1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0] +
+                            list(kwargs["t"]) + [1.0])
+            local = point * self.get_parent_matrix(node.name).inverse()
+            node.attrs["translate"] = [tuple(list(local)[12:15])]
+        for flag, attr in [("t", "translate"), ("ro", "rotate"), ("s", "scale")]:
+            if flag in kwargs and not (ws and flag == "t"):
+                node.attrs[attr] = [tuple(kwargs[flag])]
+
+    def cmd_makeIdentity(self, obj, **kwargs):
+        node = self.get_node(obj)
+        self.dirty(node.name)
+        for attr in ["translate", "rotate"]:
+            node.attrs[attr] = [(0.0, 0.0, 0.0)]
+        node.attrs["scale"] = [(1.0, 1.0, 1.0)]
+
+    def cmd_reorder(self, obj, **kwargs):
+        self.get_node(obj)
+
+    def cmd_getAttr(self, plug, size=False, mi=False, multiIndices=False, **kwargs):
+        node, attr = self.split(plug)
+        n = self.get_node(node)
+        if kwargs.get("type") or kwargs.get("typ"):
+            return self.get_attr_type(n, attr)
+        if mi or multiIndices or size:
+            prefix = "{}[".format(attr)
+            indices = sorted(set([int(a[len(prefix):].split("]")[0]) for a in n.attrs
+                                  if a.startswith(prefix)]))
+            if size:
+                return len(indices)
+            return indices or None
+        if n.type in DAG_TYPES and self.attr_root(attr) in DAG_MATRICES:
+            return list(self.get_dag_matrix(n.name, self.attr_root(attr)))
+        value = self.get_connected_value("{}.{}".format(n.name, attr))
+        if value is None:
+            value = self.get_channel_value(n, attr)
+        if value is not None:
+            return value
+        if attr in n.attrs:
+            return n.attrs[attr]
+        for axis, i in [("X", 0), ("Y", 1), ("Z", 2)]:
+            # Single channels of a compound value (translateX...)
+            if attr.endswith(axis) and attr[:-1] in n.attrs:
+                return n.attrs[attr[:-1]][0][i]
+        return self.default_value(n, attr)
+
+    def cmd_setAttr(self, plug, *values, **kwargs):
+        node, attr = self.split(plug)
+        n = self.get_node(node)
+        self.dirty(n.name)
+        if kwargs.get("lock") or kwargs.get("l"):
+            n.locked.add(attr)
+        if not values:
+            if not set(kwargs) & set(["lock", "l", "keyable", "k", "channelBox", "cb"]):
+                raise RuntimeError("setAttr: No data was provided.")
+            return
+        if kwargs.get("type") == "string":
+            n.attrs[attr] = values[0]
+        elif kwargs.get("type") == "matrix" or len(values) == 16:
+            n.attrs[attr] = [float(v) for v in values]
+        elif len(values) == 3:
+            n.attrs[attr] = [tuple(values)]
+        else:
+            n.attrs[attr] = values[0]
+            for axis, i in [("X", 0), ("Y", 1), ("Z", 2)]:
+                # Keep the compound value in sync with single channels
+                if attr.endswith(axis) and attr[:-1] in ["translate", "rotate", "scale"]:
+                    value = list(self.cmd_getAttr(plug[:-1])[0])
+                    value[i] = values[0]
+                    n.attrs[attr[:-1]] = [tuple(value)]
+
+    def cmd_addAttr(self, node, ln=None, longName=None, at=None, dt=None, **kwargs):
+        n = self.get_node(node)
+        name = ln or longName
+        if name in n.dynamic:
+            raise RuntimeError("Found a duplicate attribute name: {}".format(name))
+        n.dynamic[name] = at or dt
+        niceName = kwargs.get("nn") or kwargs.get("niceName")
+        if niceName:
+            n.data.setdefault("niceNames", {})[name] = niceName
+
+    def cmd_listAttr(self, node, ud=False, userDefined=False, **kwargs):
+        n = self.get_node(node)
+        if ud or userDefined:
+            return list(n.dynamic) or None
+        return sorted(set([self.attr_root(a) for a in n.attrs])) or None
+
+    def cmd_attributeQuery(self, attr, node=None, n=None, exists=False, ex=False,
+                           niceName=False, nn=False, **kwargs):
+        obj = self.get_node(node or n)
+        if exists or ex:
+            return attr in obj.dynamic or attr in obj.attrs
+        if niceName or nn:
+            return obj.data.get("niceNames", {}).get(attr, attr)
+
+    def cmd_connectAttr(self, src, dst, f=False, force=False):
+        self.get_node(src)
+        self.get_node(dst)
+        if dst in self.conns and not (f or force):
+            raise RuntimeError("{} is already connected to {}".format(self.conns[dst], dst))
+        self.dirty(dst)
+        self.conns[dst] = src
+
+    def cmd_disconnectAttr(self, src, dst):
+        if self.conns.get(dst) == src:
+            self.dirty(dst)
+            del self.conns[dst]
+
+    def cmd_connectionInfo(self, plug, id=False, isDestination=False, sfd=False,
+                           sourceFromDestination=False, **kwargs):
+        if id or isDestination:
+            return plug in self.conns
+        if sfd or sourceFromDestination:
+            return self.conns.get(plug, "")
+        return False
+
+    def cmd_listConnections(self, obj, s=True, d=True, plugs=False, p=False,
+                            c=False, connections=False, **kwargs):
+        node = self.split(obj)[0]
+        result = []
+        for dst, src in self.conns.items():
+            if s and self.split(dst)[0] == node:
+                other = src if plugs or p else self.split(src)[0]
+                # With c the plug on this node comes first
+                result.extend([dst, other] if c or connections else [other])
+            if d and self.split(src)[0] == node:
+                other = dst if plugs or p else self.split(dst)[0]
+                result.extend([src, other] if c or connections else [other])
+        return result or None
+
+    def cmd_skinCluster(self, *args, **kwargs):
+        objs = list(args)
+        geo = objs.pop()
+        influences = []
+        for jnt in objs:
+            # Binding to a joint binds its whole hierarchy
+            influences.append(jnt)
+            influences.extend([d for d in self.descendants(jnt)
+                               if self.nodes[d].type == "joint"])
+        sc = self.add_node("skinCluster", kwargs.get("n") or kwargs.get("name"))
+        self.nodes[sc].data.update({"influences": influences, "geometry": geo,
+                                    "weights": {}})
+        return [sc]
+
+    def cmd_ikHandle(self, sj=None, startJoint=None, ee=None, endEffector=None, n=None,
+                     name=None, **kwargs):
+        start = sj or startJoint
+        end = ee or endEffector
+        # The effector sits under the end joint's parent and follows the end joint
+        parent = self.nodes[end].parent
+        effector = self.add_node("ikEffector", "{}_effector".format(n or name or "ikHandle1"),
+                                 parent)
+        handle = self.add_node("ikHandle", n or name)
+        for attr in ["translateX", "translateY", "translateZ"]:
+            self.conns["{}.{}".format(effector, attr)] = "{}.{}".format(end, attr)
+        self.conns["{}.startJoint".format(handle)] = "{}.message".format(start)
+        self.conns["{}.endEffector".format(handle)] = "{}.handlePath[0]".format(effector)
+        return [handle, effector]
+
+    def cmd_poleVectorConstraint(self, target, handle, n=None, name=None, **kwargs):
+        con = self.add_node("poleVectorConstraint",
+                            n or name or "{}_poleVectorConstraint1".format(handle), handle)
+        start = self.split(self.conns["{}.startJoint".format(handle)])[0]
+        self.conns["{}.target[0].targetTranslate".format(con)] = "{}.translate".format(target)
+        self.conns["{}.target[0].targetParentMatrix".format(con)] = (
+            "{}.parentMatrix[0]".format(target))
+        self.conns["{}.constraintRotatePivot".format(con)] = "{}.translate".format(start)
+        self.conns["{}.constraintParentInverseMatrix".format(con)] = (
+            "{}.parentInverseMatrix[0]".format(start))
+        for axis in "XYZ":
+            self.conns["{}.poleVector{}".format(handle, axis)] = (
+                "{}.constraintTranslate{}".format(con, axis))
+        return [con]
+
+    def cmd_skinPercent(self, sc, *components, **kwargs):
+        node = self.get_node(sc)
+        weights = node.data["weights"]
+        if kwargs.get("q") or kwargs.get("query"):
+            row = weights.get(self.get_cv_indices(components[0])[0], {})
+            if "t" in kwargs or "transform" in kwargs:
+                return row.get(kwargs.get("t") or kwargs.get("transform"), 0.0)
+            return [row.get(jnt, 0.0) for jnt in node.data["influences"]]
+        values = dict([(jnt, float(wt)) for jnt, wt in kwargs.get("tv", [])])
+        for comp in components:
+            for index in self.get_cv_indices(comp):
+                weights[index] = dict(values)
+
+    def cmd_warning(self, msg):
+        self.warnings.append(msg)
+
+    def cmd_error(self, msg):
+        raise RuntimeError(msg)
+
+    def cmd_refresh(self, *args, **kwargs):
+        if "suspend" in kwargs:
+            self.suspended = bool(kwargs["suspend"])
+
+    def cmd_undoInfo(self, q=False, query=False, state=None, stateWithoutFlush=None,
+                     openChunk=False, closeChunk=False, chunkName=None, **kwargs):
+        if q or query:
+            return self.undoState
+        if openChunk:
+            self.chunks.append(chunkName or "")
+        if closeChunk:
+            if not self.chunks:
+                raise RuntimeError("undoInfo: No undo chunk is open.")
+            self.chunks.pop()
+        for value in [state, stateWithoutFlush]:
+            if value is not None:
+                self.undoState = bool(value)
+
+    def cmd_currentTime(self, *args, **kwargs):
+        if kwargs.get("q") or kwargs.get("query"):
+            return self.time
+        self.set_time(args[0] if args else kwargs.get("t", kwargs.get("time")))
+        return self.time
+
+    def cmd_playbackOptions(self, **kwargs):
+        flags = [("min", 0), ("minTime", 0), ("max", 1), ("maxTime", 1)]
+        if kwargs.get("q") or kwargs.get("query"):
+            for flag, i in flags:
+                if kwargs.get(flag):
+                    return self.playback[i]
+            return None
+        for flag, i in flags:
+            if flag in kwargs:
+                self.playback[i] = float(kwargs[flag])
+
+    def cmd_setKeyframe(self, obj, attribute=None, at=None, t=None, time=None, v=None,
+                        value=None, **kwargs):
+        node = self.get_node(obj)
+        attr = attribute or at
+        plug = "{}.{}".format(node.name, attr)
+        frame = self.time
+        for flag in [t, time]:
+            if flag is not None:
+                frame = float(flag[0] if isinstance(flag, (list, tuple)) else flag)
+        for flag in [v, value]:
+            if flag is not None:
+                value = flag
+        if value is None:
+            value = self.cmd_getAttr(plug)
+        src = self.conns.get(plug)
+        if src is None or self.get_node(src).type not in ANIM_CURVES:
+            curveType = "animCurveTU"
+            if attr.startswith("translate"):
+                curveType = "animCurveTL"
+            elif attr.startswith("rotate"):
+                curveType = "animCurveTA"
+            src = "{}.output".format(self.add_node(curveType, "{}_{}".format(node.name,
+                                                                             attr)))
+            self.get_node(src).data["keys"] = []
+            self.cmd_connectAttr(src, plug, f=True)
+        curve = self.get_node(src)
+        if curve.type == "animCurveTA":
+            value = math.radians(value)
+        keys = dict(curve.data["keys"])
+        keys[frame] = float(value)
+        curve.data["keys"] = sorted(keys.items())
+        self.dirty(node.name)
+        return 1
+
+    def cmd_evaluationManager(self, q=False, query=False, mode=None, **kwargs):
+        if q or query:
+            return [self.evalMode]
+        if mode is not None:
+            self.evalMode = mode
+
+
+class ApiFinder:
+    """
+    Import hook handing out the stand-in API modules the first time they're imported
+    """
+
+    def __init__(self, modules):
+        self.modules = modules
+
+    def find_spec(self, name, path=None, target=None):
+        if name not in self.modules:
+            return None
+        return importlib.util.spec_from_loader(name, self)
+
+    def create_module(self, spec):
+        return self.modules[spec.name]
+
+    def exec_module(self, module):
+        pass
+
+
+# Scene used by the installed maya.cmds stand-in
+SCENE = Scene()
+
+
+def mk_command(cmd):
+    """
+    Create a module level function that forwards a command to the current scene
+    """
+    def command(*args, **kwargs):
+        return SCENE.call(cmd, args, kwargs)
+    command.__name__ = cmd
+    return command
+
+
+def new_scene():
+    """
+    Clear the stand-in scene and its counters
+    """
+    SCENE.reset()
+    return SCENE
+
+
+def install():
+    """
+    Register the stand-in maya, maya.cmds, maya.api.OpenMaya and OpenMayaAnim modules
+    and return the scene they operate on
+    """
+    if getattr(sys.modules.get("maya.cmds"), "HEADLESS", False):
+        return SCENE
+
+    maya = types.ModuleType("maya")
+    cmds = types.ModuleType("maya.cmds")
+    api = types.ModuleType("maya.api")
+    om = types.ModuleType("maya.api.OpenMaya")
+    oma = types.ModuleType("maya.api.OpenMayaAnim")
+
+    for attr in dir(Scene):
+        if attr.startswith("cmd_"):
+            setattr(cmds, attr[4:], mk_command(attr[4:]))
+    cmds.HEADLESS = True
+    for cls in [MMatrix, MFn, MIntArray, MDoubleArray, MObject, MDagPath, MSelectionList,
+                MFnSingleIndexedComponent, MFnDoubleIndexedComponent, MSpace,
+                MFnNurbsSurface, MPlug, MFnDependencyNode, MFnMatrixData, MQuaternion,
+                MEulerRotation, MTransformationMatrix, MAngle, MTime, MTimeArray,
+                MDGContext, MDGModifier]:
+        setattr(om, cls.__name__, cls)
+    oma.MFnSkinCluster = MFnSkinCluster
+    oma.MFnAnimCurve = MFnAnimCurve
+
+    maya.cmds = cmds
+    maya.api = api
+    # Packages, so their submodules can be imported
+    maya.__path__ = []
+    api.__path__ = []
+    sys.modules.update({"maya": maya, "maya.cmds": cmds, "maya.api": api})
+    sys.meta_path.insert(0, ApiFinder({"maya.api.OpenMaya": om,
+                                       "maya.api.OpenMayaAnim": oma}))
+    return SCENE
+
+
+def main(args=None):
+    """
+    Run a python script with the stand-in installed
+    """
+    args = sys.argv[1:] if args is None else args
+    if not args:
+        print("usage: python headlesstools.py script.py [args]")
+        return 1
+    install()
+    sys.argv = list(args)
+    # Like running the script itself, its folder comes first on the path
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args[0])))
+    runpy.run_path(args[0], run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    # Run the importable module, not this __main__ copy, so the scripts that import
+    # headlesstools get the scene that was installed
+    import headlesstools
+    sys.exit(headlesstools.main())
@@ -0,0 +1,72 @@
+###########################################################################################
+#
+#   Title: Matrix Tools
+#
+#   Descritpion: The constraint, ribbon and fkik tools as one package, together with the
+#       build plans, build sessions and spatial caches they use and the tools built on
+#       top of them (specs, saved networks, optimizing, baking, evaluation and costs),
+#       so the folder can be copied on its own. Importing it is close to free: a submodule (and the Maya API
+#       modules it needs) is only loaded the first time something in it is used, so
+#       adding the tools to a shelf or a startup script doesn't slow down Maya's startup
+#
+#    Instructions: import the package and use the tools straight from it:
+#           import matrixtools
+#           matrixtools.Constraint(mo=True).parent()
+#           matrixtools.Ribbon("arm").build_ribbon_rig()
+#
+#       - the submodules can still be imported on their own:
+#           from matrixtools import ribbontools
+#       - matrixtools.loaded() lists the submodules that have been loaded so far
+#       - headlesstools.py, benchtools.py and profiletools.py stay outside the package:
+#           they're development tools for running, timing and profiling it without Maya
+#           and aren't needed to use it
+#       - the top level matrixconstrainttools, ribbontools and fkiktools modules are
+#           deprecated and only forward to the package
+#       - benchtools.py --imports checks the import times stay within their budget and
+#           that nothing in the package imports tools from outside it
+#
+###########################################################################################
+
+import importlib
+import sys
+
+SUBMODULES = ["matrixconstrainttools", "ribbontools", "fkiktools", "buildtools",
+              "sessiontools", "spatialtools", "spectools", "networktools", "optimizetools",
+              "baketools", "paralleltools", "costtools", "evaltools", "mathtools"]
+# Names the package hands out, with the submodule each one lives in
+EXPORTS = {"Matrix": "matrixconstrainttools",
+           "Constraint": "matrixconstrainttools",
+           "BlendColor": "matrixconstrainttools",
+           "Rivet": "matrixconstrainttools",
+           "ConstraintBatch": "matrixconstrainttools",
+           "NodeRegistry": "matrixconstrainttools",
+           "Ribbon": "ribbontools",
+           "FKIK": "fkiktools",
+           "BuildPlan": "buildtools",
+           "BuildSession": "sessiontools"}
+
+
+def loaded():
+    """
+    List the submodules that have been loaded
+    """
+    return [name for name in SUBMODULES if "{}.{}".format(__name__, name) in sys.modules]
+
+
+def __getattr__(name):
+    """
+    Load a submodule, or the submodule a tool lives in, the first time it's used
+    """
+    if name in SUBMODULES:
+        return importlib.import_module("{}.{}".format(__name__, name))
+    if name in EXPORTS:
+        module = importlib.import_module("{}.{}".format(__name__, EXPORTS[name]))
+        value = getattr(module, name)
+        # Later lookups find it without going through here
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(list(globals()) + SUBMODULES + list(EXPORTS)))
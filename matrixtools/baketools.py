@@ -0,0 +1,346 @@
+###########################################################################################
+#
+#   Title: Bake Tools
+#
+#   Descritpion: Bakes everything driven by the matrix constraint networks (Constraint,
+#       BlendColor and Rivet, so also the rivets of a Ribbon) to animation curves before
+#       export. All the driven objects are sampled together in a single pass over the
+#       frame range and every channel gets its keys in one write instead of one key at a
+#       time
+#
+#    Instructions: bake every driven object over the playback range:
+#           var = Baker()
+#           var.bake()
+#
+#       - Baker(objs, start, end, step) bakes only the given objects over another range.
+#           Without objects, whatever the matrix nodes of the constraint networks (and
+#           the nodes they feed) drive is baked
+#       - only the axes a network drives are baked. When it drives the offsetParentMatrix
+#           every axis is, replacing whatever else drove one, and the offsetParentMatrix
+#           goes back to identity. A static offsetParentMatrix is kept and left out of
+#           the baked values
+#       - var.bake(delete=True) also deletes the decompose, blend and rivet nodes that no
+#           longer drive anything once the bake is done
+#       - rivets with inheritsTransform off are baked in world space, everything else in
+#           the space of its parent. Joints parented under a rivet (like the ones of a
+#           Ribbon) follow their baked rivet
+#       - var.undo() reverts the whole bake in one step
+#
+###########################################################################################
+
+from collections import OrderedDict
+
+import maya.cmds as mc
+from maya.api import OpenMaya as om
+from maya.api import OpenMayaAnim as oma
+
+# Nodes the constraint networks are made of (and the unit conversions Maya adds)
+NETWORK_TYPES = ["multMatrix", "wtAddMatrix", "choice", "decomposeMatrix", "quatToEuler",
+                 "blendColors", "fourByFourMatrix", "pickMatrix", "blendMatrix",
+                 "multDoubleLinear", "pointOnSurfaceInfo", "uvPin", "unitConversion"]
+# The matrix nodes a network starts from, the other types only count downstream of them
+MATRIX_TYPES = ["multMatrix", "wtAddMatrix", "decomposeMatrix", "fourByFourMatrix",
+                "pickMatrix", "blendMatrix", "uvPin"]
+CHANNELS = ["translate", "rotate", "scale"]
+VECTORS = ["X", "Y", "Z"]
+OPM = "offsetParentMatrix"
+CURVE_TYPES = {"translate": oma.MFnAnimCurve.kAnimCurveTL,
+               "rotate": oma.MFnAnimCurve.kAnimCurveTA,
+               "scale": oma.MFnAnimCurve.kAnimCurveTU}
+
+
+def get_channel(attr):
+    """
+    Get the channel (translate, rotate, scale or offsetParentMatrix) a driven attribute
+    belongs to, or None
+    """
+    for channel in CHANNELS:
+        if attr == channel or attr in ["{}{}".format(channel, v) for v in VECTORS]:
+            return channel
+    if attr == OPM:
+        return OPM
+    return None
+
+
+class Baker:
+    """
+    Samples every driven object over a frame range and bakes it to animation curves
+    """
+
+    def __init__(self, objs=None, start=None, end=None, step=1):
+        if start is None:
+            start = mc.playbackOptions(q=True, min=True)
+        if end is None:
+            end = mc.playbackOptions(q=True, max=True)
+        self.start = start
+        self.end = end
+        self.step = step
+        self.objs = objs
+        self.driven = OrderedDict()
+        self.sources = set()
+        self.curves = {}
+        self.dg = None
+
+    def get_frames(self):
+        """
+        Get every frame to sample
+        """
+        frames = []
+        frame = self.start
+        while frame <= self.end + 1e-6:
+            frames.append(frame)
+            frame += self.step
+        return frames
+
+    def get_network_outputs(self):
+        """
+        Get every (destination, source) connection out of the constraint networks: the
+        matrix nodes and the nodes they feed, not every choice, blendColors or unit
+        conversion of the scene
+        """
+        nodes = set(mc.ls(type=NETWORK_TYPES) or [])
+        stack = list(mc.ls(type=MATRIX_TYPES) or [])
+        found = set()
+        conns = []
+        while stack:
+            node = stack.pop()
+            if node in found:
+                continue
+            found.add(node)
+            plugs = mc.listConnections(node, s=False, d=True, c=True, p=True) or []
+            for src, dst in zip(plugs[::2], plugs[1::2]):
+                conns.append((dst, src))
+                if dst.partition(".")[0] in nodes:
+                    stack.append(dst.partition(".")[0])
+        return conns, nodes
+
+    def get_driven(self):
+        """
+        Find the channels to bake per object ({obj: {channel: [driven plugs]}}). Without
+        objects every transform a network drives is used
+        """
+        self.driven = OrderedDict()
+        if self.objs is None:
+            conns, nodes = self.get_network_outputs()
+        else:
+            conns = []
+            for obj in self.objs:
+                plugs = mc.listConnections(obj, s=True, d=False, c=True, p=True) or []
+                conns.extend(zip(plugs[::2], plugs[1::2]))
+            nodes = None
+
+        for dst, src in conns:
+            obj, sep, attr = dst.partition(".")
+            channel = get_channel(attr)
+            if channel is None or (nodes is not None and obj in nodes):
+                continue
+            self.driven.setdefault(obj, OrderedDict()).setdefault(channel, []).append(dst)
+            self.sources.add(src.partition(".")[0])
+
+        for obj, channels in self.driven.items():
+            if OPM in channels:
+                # An offsetParentMatrix drive moves every channel
+                for channel in CHANNELS:
+                    channels.setdefault(channel, [])
+        return self.driven
+
+    def get_plugs(self, obj):
+        """
+        Get the world and parent inverse matrix plugs of an object
+        """
+        sel = om.MSelectionList()
+        sel.add(obj)
+        fn = om.MFnDependencyNode(sel.getDependNode(0))
+        wm = fn.findPlug("worldMatrix", False).elementByLogicalIndex(0)
+        pim = None
+        if mc.getAttr("{}.inheritsTransform".format(obj)):
+            pim = fn.findPlug("parentInverseMatrix", False).elementByLogicalIndex(0)
+        return wm, pim
+
+    def get_offset(self, obj):
+        """
+        Get the inverse of a static offsetParentMatrix (None when it's identity or driven
+        by the network, the bake resets a driven one)
+        """
+        if OPM in self.driven[obj]:
+            return None
+        opm = om.MMatrix(mc.getAttr("{}.{}".format(obj, OPM)))
+        if opm.isEquivalent(om.MMatrix()):
+            return None
+        return opm.inverse()
+
+    def get_orient(self, obj):
+        """
+        Get the inverse joint orient of a joint (None for any other transform)
+        """
+        if mc.nodeType(obj) != "joint":
+            return None
+        jo = [om.MAngle(v, om.MAngle.uiUnit()).asRadians()
+              for v in mc.getAttr("{}.jointOrient".format(obj))[0]]
+        return om.MEulerRotation(jo).asQuaternion().inverse()
+
+    def sample(self):
+        """
+        Evaluate every driven object at every frame in one pass and return the local
+        translate, rotate and scale per object as {obj: {channel: [[x, y, z]...]}}
+        """
+        frames = self.get_frames()
+        items = []
+        for obj in self.driven:
+            wm, pim = self.get_plugs(obj)
+            order = mc.getAttr("{}.rotateOrder".format(obj))
+            items.append((obj, wm, pim, self.get_offset(obj), order, self.get_orient(obj)))
+
+        samples = dict([(obj, {"translate": [], "rotate": [], "scale": []})
+                        for obj in self.driven])
+        unit = om.MTime.uiUnit()
+        for frame in frames:
+            # Read every plug in the context of this frame without moving the timeline
+            prev = om.MDGContext(om.MTime(frame, unit)).makeCurrent()
+            try:
+                for obj, wm, pim, offset, order, orient in items:
+                    mtrx = om.MFnMatrixData(wm.asMObject()).matrix()
+                    if pim is not None:
+                        mtrx = mtrx * om.MFnMatrixData(pim.asMObject()).matrix()
+                    if offset is not None:
+                        # The offsetParentMatrix stays, only what comes before it is baked
+                        mtrx = mtrx * offset
+                    tm = om.MTransformationMatrix(mtrx)
+                    quat = tm.rotation(asQuaternion=True)
+                    if orient is not None:
+                        # Take the joint orient back out of the rotation
+                        quat = quat * orient
+                    rot = quat.asEulerRotation()
+                    rot.reorderIt(order)
+
+                    samples[obj]["translate"].append(tm.translation(om.MSpace.kTransform))
+                    samples[obj]["rotate"].append([rot.x, rot.y, rot.z])
+                    samples[obj]["scale"].append(tm.scale(om.MSpace.kTransform))
+            finally:
+                prev.makeCurrent()
+        return samples
+
+    def break_conns(self, obj, channels):
+        """
+        Queue the disconnection of every baked channel of an object
+        """
+        sel = om.MSelectionList()
+        sel.add(obj)
+        fn = om.MFnDependencyNode(sel.getDependNode(0))
+        for channel, plugs in channels.items():
+            for plug in plugs:
+                mPlug = fn.findPlug(plug.partition(".")[2], False)
+                self.dg.disconnect(mPlug.source(), mPlug)
+            if channel == OPM:
+                # Without its drive the offsetParentMatrix goes back to identity
+                data = om.MFnMatrixData().create(om.MMatrix())
+                self.dg.newPlugValue(fn.findPlug(OPM, False), data)
+        return fn
+
+    def get_axes(self, channel, channels):
+        """
+        Get the axes of a channel that get baked: the ones the network drove (all of them
+        when it drove the whole channel or the offsetParentMatrix)
+        """
+        if OPM in channels:
+            return VECTORS
+        attrs = [plug.partition(".")[2] for plug in channels[channel]]
+        if channel in attrs:
+            return VECTORS
+        return [v for v in VECTORS if "{}{}".format(channel, v) in attrs]
+
+    def write(self, samples):
+        """
+        Replace the drive of every channel with an animation curve, adding all the keys
+        of a curve in one call
+        """
+        times = om.MTimeArray()
+        unit = om.MTime.uiUnit()
+        for frame in self.get_frames():
+            times.append(om.MTime(frame, unit))
+
+        self.dg = om.MDGModifier()
+        created = []
+        for obj, channels in self.driven.items():
+            fn = self.break_conns(obj, channels)
+            for channel in CHANNELS:
+                if channel not in channels:
+                    continue
+                network = [plug.partition(".")[2] for plug in channels[channel]]
+                for v in self.get_axes(channel, channels):
+                    i = VECTORS.index(v)
+                    attr = "{}{}".format(channel, v)
+                    plug = fn.findPlug(attr, False)
+                    if channel not in network and attr not in network and plug.isDestination:
+                        # The sample already has what else drove the axis (like its own
+                        # animation curve) on top of the offsetParentMatrix, so replace it
+                        self.dg.disconnect(plug.source(), plug)
+                    crvFn = oma.MFnAnimCurve()
+                    crv = crvFn.create(plug, CURVE_TYPES[channel], self.dg)
+                    crvFn.addKeys(times, [value[i] for value in samples[obj][channel]])
+                    created.append((obj, crv))
+        self.dg.doIt()
+
+        self.curves = {}
+        for obj, crv in created:
+            self.curves.setdefault(obj, []).append(om.MFnDependencyNode(crv).name())
+        return self.curves
+
+    def get_redundant(self):
+        """
+        Get the network nodes that fed the baked channels and no longer drive anything
+        """
+        found = set()
+        stack = list(self.sources)
+        while stack:
+            node = stack.pop()
+            if node in found or mc.nodeType(node) not in NETWORK_TYPES:
+                continue
+            found.add(node)
+            stack.extend(mc.listConnections(node, s=True, d=False) or [])
+
+        changed = True
+        while changed:
+            # Keep anything still driving something that isn't being deleted
+            changed = False
+            for node in list(found):
+                outs = mc.listConnections(node, s=False, d=True) or []
+                if [out for out in outs if out not in found]:
+                    found.discard(node)
+                    changed = True
+        return sorted(found)
+
+    def delete(self):
+        """
+        Delete the network nodes the bake made redundant
+        """
+        nodes = self.get_redundant()
+        if nodes:
+            sel = om.MSelectionList()
+            for node in nodes:
+                sel.add(node)
+            for i in range(len(nodes)):
+                self.dg.deleteNode(sel.getDependNode(i))
+            self.dg.doIt()
+        return nodes
+
+    def bake(self, delete=False):
+        """
+        Bake every driven object and return the curves created per object
+        """
+        if not self.get_driven():
+            mc.warning("Nothing driven to bake")
+            return {}
+        samples = self.sample()
+        curves = self.write(samples)
+        if delete:
+            self.delete()
+        return curves
+
+    def undo(self):
+        """
+        Revert the last bake in one step
+        """
+        if self.dg is not None:
+            self.dg.undoIt()
+            self.dg = None
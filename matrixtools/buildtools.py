@@ -0,0 +1,838 @@
+###########################################################################################
+#
+#   Title: Build Tools
+#
+#   Descritpion: Records the nodes, attributes, values and connections a builder wants
+#       to make into a BuildPlan so the whole network can be created in one transaction
+#       instead of one cmds call (and one undo entry) at a time
+#
+#    Instructions: give any Matrix based builder (Constraint, BlendColor, Rivet, Ribbon)
+#       a plan before building (var.plan = BuildPlan()), run your commands as usual and
+#       then apply everything at once with var.plan.flush()
+#
+#       - plan.summary() and plan.dump() let you inspect what will be built
+#       - plan.flush(LocalGraph()) applies the plan to a plain Python stand-in so plans
+#           can be checked without a Maya session. BuildPlan(backend) sets the backend
+#           used when flush() is called without one
+#       - plan.undo() reverts the last flush as a single step. In Maya the flush is also
+#           one entry on the undo queue (this file registers itself as a small plugin
+#           for it), so ctrl+z does the same. Run the build inside a
+#           sessiontools.BuildSession to put the transforms it makes in the same entry
+#       - BuildPlan(reconcile=True) makes the builders record their whole network again
+#           even where it already exists. flush() then compares it with the scene and
+#           only creates, sets, connects or disconnects what differs, so rerunning a
+#           build after a small change only applies the change. Nodes an earlier build
+#           made for the same objects (plan.own(), the node registry records them) that
+#           the new network doesn't use anymore are deleted. plan.report counts what was
+#           applied
+#
+###########################################################################################
+
+import os
+import re
+
+# Matrix array attributes whose [0] element is the only one anybody uses
+ARRAY_MATRICES = re.compile(
+    r"\.(worldMatrix|worldInverseMatrix|parentMatrix|parentInverseMatrix)\[0\]$")
+
+
+def norm_plug(plug):
+    """
+    Write a plug the same way however it was connected (node.worldMatrix[0] and
+    node.worldMatrix are the same plug)
+    """
+    return ARRAY_MATRICES.sub(r".\1", plug)
+
+
+# Undoable command that runs a ModifierBackend commit, and the steps waiting for it
+COMMAND = "matrixToolsModifier"
+PENDING = []
+COMMAND_CLASS = []
+
+
+def maya_useNewAPI():
+    """
+    Tell Maya this plugin uses the Python API 2.0
+    """
+
+
+def initializePlugin(plugin):
+    """
+    Register the modifier command. Maya loads this file as a plugin, so the command is
+    taken from the package module to share its PENDING steps
+    """
+    from maya.api import OpenMaya as om
+    from matrixtools import buildtools
+
+    om.MFnPlugin(plugin).registerCommand(COMMAND, buildtools.mk_command)
+
+
+def uninitializePlugin(plugin):
+    """
+    Remove the modifier command
+    """
+    from maya.api import OpenMaya as om
+
+    om.MFnPlugin(plugin).deregisterCommand(COMMAND)
+
+
+def mk_command():
+    """
+    Create the modifier command (the class needs OpenMaya so it's only made in Maya)
+    """
+    if not COMMAND_CLASS:
+        from maya.api import OpenMaya as om
+
+        class ModifierCommand(om.MPxCommand):
+            def doIt(self, args):
+                self.step = PENDING.pop(0)
+                self.step.redo()
+
+            def redoIt(self):
+                self.step.redo()
+
+            def undoIt(self):
+                self.step.undo()
+
+            def isUndoable(self):
+                return True
+
+        COMMAND_CLASS.append(ModifierCommand)
+    return COMMAND_CLASS[0]()
+
+
+def load_command():
+    """
+    Load the modifier command, False if Maya can't (then edits skip the undo queue)
+    """
+    import maya.cmds as mc
+
+    if not hasattr(mc, COMMAND):
+        try:
+            mc.loadPlugin(os.path.splitext(__file__)[0] + ".py", quiet=True)
+        except RuntimeError:
+            return False
+    return hasattr(mc, COMMAND)
+
+
+def is_equal(value, current, tolerance=1e-6):
+    """
+    Compare a planned value with the one in the scene
+    """
+    if isinstance(value, (list, tuple)) or isinstance(current, (list, tuple)):
+        if not isinstance(value, (list, tuple)) or not isinstance(current, (list, tuple)):
+            return False
+        return len(value) == len(current) and all(
+            [is_equal(v, c, tolerance) for v, c in zip(value, current)])
+    try:
+        return abs(float(value) - float(current)) <= tolerance
+    except (TypeError, ValueError):
+        return value == current
+
+
+class BuildPlan:
+    """
+    In-memory record of a node network waiting to be created
+    """
+
+    def __init__(self, backend=None, reconcile=False):
+        self.nodes = []
+        self.attrs = []
+        self.values = []
+        self.conns = []
+        self.planned = set()
+        self.dests = {}
+        self.names = {}
+        self.callbacks = []
+        self.backend = None
+        self.defaultBackend = backend
+        self.reconcile = reconcile
+        self.matches = {}
+        self.owned = set()
+        self.report = {}
+
+    def mk_node(self, nodeType, name):
+        """
+        Record a node to be created, renaming it the way Maya would if the name is
+        already planned
+        """
+        base = name.rstrip("0123456789")
+        i = 1
+        while name in self.planned:
+            name = "{}{}".format(base, i)
+            i += 1
+        self.nodes.append((name, nodeType))
+        self.planned.add(name)
+        return name
+
+    def add_attr(self, node, longName, attrType="matrix", niceName=None):
+        """
+        Record a dynamic attribute to be added to a node
+        """
+        attr = "{}.{}".format(node, longName)
+        if attr not in self.planned:
+            self.attrs.append((node, longName, attrType, niceName))
+            self.planned.add(attr)
+        return attr
+
+    def set_attr(self, plug, value, valueType=None):
+        """
+        Record an attribute value
+        """
+        self.values.append((plug, value, valueType))
+
+    def connect(self, src, dst, force=False):
+        """
+        Record a connection between two plugs
+        """
+        self.conns.append((src, dst, force))
+        self.dests[dst] = src
+
+    def match(self, name, node):
+        """
+        Record the scene node a planned node stands for (a reconcile reuses it)
+        """
+        self.matches[name] = node
+
+    def own(self, nodes):
+        """
+        Record scene nodes an earlier build made for what the plan rebuilds, a reconcile
+        deletes the ones the plan doesn't use anymore
+        """
+        self.owned.update(nodes)
+
+    def has(self, obj):
+        """
+        Check if a node or attribute is part of the plan
+        """
+        return obj in self.planned
+
+    def is_connected(self, dst):
+        """
+        Check if a plug already receives a planned connection
+        """
+        return dst in self.dests
+
+    def summary(self):
+        """
+        Count the planned operations by kind and the planned nodes by type
+        """
+        nodeTypes = {}
+        for name, nodeType in self.nodes:
+            nodeTypes[nodeType] = nodeTypes.get(nodeType, 0) + 1
+
+        return {"nodes": len(self.nodes), "attrs": len(self.attrs),
+                "values": len(self.values), "connections": len(self.conns),
+                "nodeTypes": nodeTypes}
+
+    def dump(self):
+        """
+        List every planned operation in the order it will be applied
+        """
+        ops = []
+        for name, nodeType in self.nodes:
+            ops.append(("createNode", nodeType, name))
+        for node, longName, attrType, niceName in self.attrs:
+            ops.append(("addAttr", node, longName, attrType))
+        for plug, value, valueType in self.values:
+            ops.append(("setAttr", plug, value))
+        for src, dst, force in self.conns:
+            ops.append(("connectAttr", src, dst))
+        return ops
+
+    def resolve(self, plug):
+        """
+        Swap the planned node name in a plug for the name the node actually received
+        """
+        node, sep, attr = plug.partition(".")
+        return "{}{}{}".format(self.names.get(node, node), sep, attr)
+
+    def clear(self):
+        """
+        Empty the plan so it can record the next build
+        """
+        self.nodes = []
+        self.attrs = []
+        self.values = []
+        self.conns = []
+        self.planned = set()
+        self.dests = {}
+        self.callbacks = []
+        self.matches = {}
+        self.owned = set()
+
+    def flush(self, backend=None):
+        """
+        Apply the whole plan through a single modifier (or any stand-in backend) and
+        return the planned-to-actual node names
+        """
+        if backend is None:
+            backend = self.defaultBackend or ModifierBackend()
+
+        chunk = isinstance(backend, ModifierBackend)
+        if chunk:
+            # Every commit is a command, the chunk makes the flush one undo entry
+            backend.open_chunk()
+        try:
+            if self.reconcile:
+                self.apply_diff(backend)
+            else:
+                self.apply_all(backend)
+        finally:
+            if chunk:
+                backend.close_chunk()
+
+        self.backend = backend
+        for callback in self.callbacks:
+            # Let anything holding planned names (like the node registry) update them
+            callback(self.names)
+        self.clear()
+
+        return self.names
+
+    def apply_all(self, backend):
+        """
+        Create everything in the plan
+        """
+        self.names = {}
+        created = []
+        for name, nodeType in self.nodes:
+            # Nodes first so everything else can find them by name
+            created.append((name, backend.create(nodeType, name)))
+        backend.commit()
+        for name, handle in created:
+            self.names[name] = backend.get_name(handle)
+
+        for node, longName, attrType, niceName in self.attrs:
+            backend.add_attr(self.resolve(node), longName, attrType, niceName)
+        backend.commit()
+
+        for plug, value, valueType in self.values:
+            backend.set_attr(self.resolve(plug), value, valueType)
+        for src, dst, force in self.conns:
+            backend.connect(self.resolve(src), self.resolve(dst), force)
+        backend.commit()
+
+    def apply_diff(self, backend):
+        """
+        Apply only what differs between the plan and the scene: missing nodes and
+        attributes, changed values and connections, inputs of reused nodes the plan no
+        longer makes and the nodes an earlier build owned that the plan left unused
+        """
+        report = {"created": 0, "reused": 0, "attrs": 0, "values": 0, "connected": 0,
+                  "disconnected": 0, "deleted": 0}
+        self.names = {}
+        created = []
+        reused = []
+        for name, nodeType in self.nodes:
+            node = None
+            for candidate in [self.matches.get(name), name]:
+                if candidate is not None and backend.get_type(candidate) == nodeType:
+                    node = candidate
+                    break
+            if node is None:
+                created.append((name, backend.create(nodeType, name)))
+            else:
+                self.names[name] = node
+                reused.append(node)
+        backend.commit()
+        for name, handle in created:
+            self.names[name] = backend.get_name(handle)
+        report["created"] = len(created)
+        report["reused"] = len(reused)
+
+        for node, longName, attrType, niceName in self.attrs:
+            node = self.resolve(node)
+            if not backend.has_attr("{}.{}".format(node, longName)):
+                backend.add_attr(node, longName, attrType, niceName)
+                report["attrs"] += 1
+        backend.commit()
+
+        new = set([self.names[name] for name, handle in created])
+        for plug, value, valueType in self.values:
+            plug = self.resolve(plug)
+            if plug.partition(".")[0] in new or not is_equal(value, backend.get_value(plug)):
+                backend.set_attr(plug, value, valueType)
+                report["values"] += 1
+
+        # One query per reused node gives every connection it receives
+        inputs = {}
+        for node in reused:
+            for src, dst in backend.get_inputs(node):
+                inputs[norm_plug(dst)] = (src, dst)
+        planned = set()
+        for src, dst, force in self.conns:
+            src = self.resolve(src)
+            dst = self.resolve(dst)
+            planned.add(norm_plug(dst))
+            if dst.partition(".")[0] in new or src.partition(".")[0] in new:
+                current = None
+            elif norm_plug(dst) in inputs:
+                current = norm_plug(inputs[norm_plug(dst)][0])
+            else:
+                current = backend.get_source(dst)
+                current = current and norm_plug(current)
+            if current != norm_plug(src):
+                backend.connect(src, dst, True)
+                report["connected"] += 1
+        for key, (src, dst) in sorted(inputs.items()):
+            if key not in planned:
+                # Left over from an earlier build (like a driver that was removed)
+                backend.disconnect(src, dst)
+                report["disconnected"] += 1
+        backend.commit()
+
+        # Only nodes an earlier build of the same objects made are safe to delete. A node
+        # that only fed deleted ones is left without outputs, so keep going until
+        # nothing else goes
+        orphans = sorted(self.owned - set(self.names.values()))
+        deleted = True
+        while deleted:
+            deleted = [node for node in orphans if backend.get_type(node) is not None
+                       and not backend.get_outputs(node)]
+            for node in deleted:
+                backend.delete(node)
+            report["deleted"] += len(deleted)
+            orphans = [node for node in orphans if node not in deleted]
+            backend.commit()
+
+        self.report = report
+        return report
+
+    def undo(self):
+        """
+        Revert the last flush in one step
+        """
+        if self.backend is not None:
+            self.backend.undo()
+            self.backend = None
+
+
+class ModifierStep:
+    """
+    The DG and DAG modifier pair of one commit. Doing or undoing it twice does nothing,
+    so the undo queue and BuildPlan.undo() can both revert it
+    """
+
+    def __init__(self, dg, dag):
+        self.dg = dg
+        self.dag = dag
+        self.done = False
+
+    def redo(self):
+        """
+        Execute the queued edits
+        """
+        if not self.done:
+            self.dag.doIt()
+            self.dg.doIt()
+            self.done = True
+
+    def undo(self):
+        """
+        Revert the edits
+        """
+        if self.done:
+            self.dg.undoIt()
+            self.dag.undoIt()
+            self.done = False
+
+
+class ModifierBackend:
+    """
+    Applies a BuildPlan through OpenMaya DG and DAG modifiers, one pair per commit. Each
+    commit runs as an undoable command so the edits are on Maya's undo queue
+    """
+
+    def __init__(self):
+        import maya.cmds as mc
+        from maya.api import OpenMaya as om
+
+        self.mc = mc
+        self.om = om
+        self.dg = om.MDGModifier()
+        self.dag = om.MDagModifier()
+        self.steps = []
+        self.objs = {}
+        self.undoable = load_command()
+
+    def get_plug(self, plug):
+        """
+        Get the MPlug for a plug string
+        """
+        sel = self.om.MSelectionList()
+        sel.add(plug)
+        return sel.getPlug(0)
+
+    def get_node(self, node):
+        """
+        Get the MObject for a node name
+        """
+        if node in self.objs:
+            return self.objs[node]
+        sel = self.om.MSelectionList()
+        sel.add(node)
+        return sel.getDependNode(0)
+
+    def create(self, nodeType, name):
+        """
+        Queue a node and return its MObject
+        """
+        if self.om.MNodeClass(nodeType).hasAttribute("worldMatrix"):
+            # Only DAG nodes carry a world matrix
+            obj = self.dag.createNode(nodeType)
+            self.dag.renameNode(obj, name)
+        else:
+            obj = self.dg.createNode(nodeType)
+            self.dg.renameNode(obj, name)
+        return obj
+
+    def get_name(self, obj):
+        """
+        Get the name Maya gave a created node
+        """
+        name = self.om.MFnDependencyNode(obj).name()
+        self.objs[name] = obj
+        return name
+
+    def add_attr(self, node, longName, attrType, niceName=None):
+        """
+        Queue a dynamic attribute
+        """
+        if attrType == "matrix":
+            fn = self.om.MFnMatrixAttribute()
+            attr = fn.create(longName, longName)
+        else:
+            fn = self.om.MFnNumericAttribute()
+            attr = fn.create(longName, longName, self.om.MFnNumericData.kDouble)
+            fn.keyable = True
+        if niceName is not None:
+            fn.setNiceNameOverride(niceName)
+        self.dg.addAttribute(self.get_node(node), attr)
+
+    def set_value(self, plug, value):
+        """
+        Queue a single numeric value
+        """
+        if isinstance(value, bool):
+            self.dg.newPlugValueBool(plug, value)
+        elif isinstance(value, int):
+            self.dg.newPlugValueInt(plug, value)
+        else:
+            self.dg.newPlugValueDouble(plug, value)
+
+    def set_attr(self, plug, value, valueType=None):
+        """
+        Queue an attribute value
+        """
+        mPlug = self.get_plug(plug)
+        if valueType == "matrix":
+            data = self.om.MFnMatrixData().create(self.om.MMatrix(value))
+            self.dg.newPlugValue(mPlug, data)
+        elif isinstance(value, (list, tuple)):
+            # Compound attributes (color1, translate...) are set per child
+            for i, v in enumerate(value):
+                self.set_value(mPlug.child(i), v)
+        else:
+            self.set_value(mPlug, value)
+
+    def connect(self, src, dst, force=False):
+        """
+        Queue a connection, breaking an existing one if forced
+        """
+        srcPlug = self.get_plug(src)
+        dstPlug = self.get_plug(dst)
+        if force and dstPlug.isDestination:
+            self.dg.disconnect(dstPlug.source(), dstPlug)
+        self.dg.connect(srcPlug, dstPlug)
+
+    def disconnect(self, src, dst):
+        """
+        Queue breaking a connection
+        """
+        self.dg.disconnect(self.get_plug(src), self.get_plug(dst))
+
+    def get_type(self, node):
+        """
+        Get the type of a scene node (None if it doesn't exist)
+        """
+        sel = self.om.MSelectionList()
+        try:
+            sel.add(node)
+        except RuntimeError:
+            return None
+        return self.om.MFnDependencyNode(sel.getDependNode(0)).typeName
+
+    def has_attr(self, plug):
+        """
+        Check if an attribute exists
+        """
+        node, sep, attr = plug.partition(".")
+        return self.om.MFnDependencyNode(self.get_node(node)).hasAttribute(attr)
+
+    def is_settable(self, plug):
+        """
+        Check if a plug holds a value that can be set (not an output), leaving out the
+        ones that move an object like offsetParentMatrix
+        """
+        fn = self.om.MFnAttribute(self.get_plug(plug).attribute())
+        return fn.writable and fn.storable and not fn.affectsWorldSpace
+
+    def get_plug_name(self, mPlug):
+        """
+        Name a plug with long attribute names, looking through unit conversion nodes
+        """
+        if mPlug.node().hasFn(self.om.MFn.kUnitConversion):
+            inPlug = self.om.MFnDependencyNode(mPlug.node()).findPlug("input", False)
+            if inPlug.isDestination:
+                return self.get_plug_name(inPlug.source())
+        return mPlug.partialName(includeNodeName=True, includeNonMandatoryIndices=True,
+                                 includeInstancedIndices=True, useLongNames=True)
+
+    def get_source(self, plug):
+        """
+        Get the plug connected into a plug (None if there is none)
+        """
+        mPlug = self.get_plug(plug)
+        if not mPlug.isDestination:
+            return None
+        return self.get_plug_name(mPlug.source())
+
+    def get_inputs(self, node):
+        """
+        Get every (source, destination) connection a node receives
+        """
+        fn = self.om.MFnDependencyNode(self.get_node(node))
+        inputs = []
+        for mPlug in fn.getConnections():
+            if mPlug.isDestination:
+                inputs.append((self.get_plug_name(mPlug.source()),
+                               self.get_plug_name(mPlug)))
+        return inputs
+
+    def get_outputs(self, node):
+        """
+        Get every plug a node connects into
+        """
+        fn = self.om.MFnDependencyNode(self.get_node(node))
+        outputs = []
+        for mPlug in fn.getConnections():
+            outputs.extend([self.get_plug_name(dst) for dst in mPlug.destinations()])
+        return outputs
+
+    def delete(self, node):
+        """
+        Queue deleting a node
+        """
+        self.dg.deleteNode(self.get_node(node))
+
+    def get_value(self, plug):
+        """
+        Read a plug value (matrices as 16 values, compounds as a list)
+        """
+        mPlug = self.get_plug(plug)
+        attr = mPlug.attribute()
+        if attr.hasFn(self.om.MFn.kMatrixAttribute) or attr.hasFn(
+                self.om.MFn.kTypedAttribute):
+            try:
+                return list(self.om.MFnMatrixData(mPlug.asMObject()).matrix())
+            except RuntimeError:
+                return None
+        if mPlug.isCompound:
+            return [mPlug.child(i).asDouble() for i in range(mPlug.numChildren())]
+        return mPlug.asDouble()
+
+    def open_chunk(self):
+        """
+        Start grouping the commits into one undo entry
+        """
+        if self.undoable:
+            self.mc.undoInfo(openChunk=True, chunkName=COMMAND)
+
+    def close_chunk(self):
+        """
+        Stop grouping the commits
+        """
+        if self.undoable:
+            self.mc.undoInfo(closeChunk=True)
+
+    def commit(self):
+        """
+        Execute everything queued since the last commit
+        """
+        step = ModifierStep(self.dg, self.dag)
+        self.steps.append(step)
+        self.dg = self.om.MDGModifier()
+        self.dag = self.om.MDagModifier()
+        if self.undoable:
+            PENDING.append(step)
+            getattr(self.mc, COMMAND)()
+        else:
+            step.redo()
+
+    def undo(self):
+        """
+        Undo everything this backend has done
+        """
+        while self.steps:
+            self.steps.pop().undo()
+
+
+class LocalGraph:
+    """
+    Plain Python stand-in for a Maya scene that plans can be flushed into and inspected.
+    Seed it with the scene objects a plan refers to ({name: nodeType})
+    """
+
+    def __init__(self, nodes=None):
+        self.nodes = dict(nodes or {})
+        self.attrs = {}
+        self.values = {}
+        self.conns = {}
+        self.commits = 0
+        self.history = []
+
+    def create(self, nodeType, name):
+        """
+        Add a node, renaming it the way Maya would if the name is taken
+        """
+        base = name.rstrip("0123456789")
+        i = 1
+        while name in self.nodes:
+            name = "{}{}".format(base, i)
+            i += 1
+        self.nodes[name] = nodeType
+        self.history.append(("node", name))
+        return name
+
+    def get_name(self, name):
+        """
+        Nodes are named on creation so there is nothing to look up
+        """
+        return name
+
+    def add_attr(self, node, longName, attrType, niceName=None):
+        """
+        Add a dynamic attribute
+        """
+        if node not in self.nodes:
+            raise RuntimeError("No object matches name: {}".format(node))
+        attr = "{}.{}".format(node, longName)
+        self.attrs[attr] = attrType
+        self.history.append(("attr", attr))
+
+    def set_attr(self, plug, value, valueType=None):
+        """
+        Store an attribute value
+        """
+        if plug.partition(".")[0] not in self.nodes:
+            raise RuntimeError("No object matches name: {}".format(plug))
+        self.history.append(("value", plug, self.values.get(plug)))
+        self.values[plug] = value
+
+    def connect(self, src, dst, force=False):
+        """
+        Store a connection
+        """
+        for plug in [src, dst]:
+            if plug.partition(".")[0] not in self.nodes:
+                raise RuntimeError("No object matches name: {}".format(plug))
+        if dst in self.conns and not force:
+            raise RuntimeError("{} is already connected".format(dst))
+        self.history.append(("conn", dst, self.conns.get(dst)))
+        self.conns[dst] = src
+
+    def disconnect(self, src, dst):
+        """
+        Remove a connection
+        """
+        if self.conns.get(dst) == src:
+            self.history.append(("conn", dst, src))
+            del self.conns[dst]
+
+    def get_type(self, node):
+        """
+        Get the type of a node (None if it doesn't exist)
+        """
+        return self.nodes.get(node)
+
+    def has_attr(self, plug):
+        """
+        Check if a dynamic attribute exists
+        """
+        return plug in self.attrs
+
+    def is_settable(self, plug):
+        """
+        Check if a plug is a dynamic attribute or has a value set, the only plugs the
+        graph knows aren't outputs
+        """
+        return plug in self.attrs or plug in self.values
+
+    def get_source(self, plug):
+        """
+        Get the plug connected into a plug
+        """
+        return self.conns.get(plug)
+
+    def get_inputs(self, node):
+        """
+        Get every (source, destination) connection a node receives
+        """
+        prefix = "{}.".format(node)
+        return [(src, dst) for dst, src in self.conns.items() if dst.startswith(prefix)]
+
+    def get_outputs(self, node):
+        """
+        Get every plug a node connects into
+        """
+        prefix = "{}.".format(node)
+        return [dst for dst, src in self.conns.items() if src.startswith(prefix)]
+
+    def delete(self, node):
+        """
+        Remove a node and its connections
+        """
+        prefix = "{}.".format(node)
+        for dst, src in list(self.conns.items()):
+            if dst.startswith(prefix) or src.startswith(prefix):
+                self.disconnect(src, dst)
+        self.history.append(("delete", node, self.nodes.pop(node)))
+
+    def get_value(self, plug):
+        """
+        Get a stored value
+        """
+        return self.values.get(plug)
+
+    def commit(self):
+        """
+        Count the transactions that were applied
+        """
+        self.commits += 1
+
+    def undo(self):
+        """
+        Roll back everything in reverse order
+        """
+        for item in reversed(self.history):
+            if item[0] == "node":
+                del self.nodes[item[1]]
+            elif item[0] == "delete":
+                self.nodes[item[1]] = item[2]
+            elif item[0] == "attr":
+                del self.attrs[item[1]]
+            elif item[0] == "value":
+                self.restore(self.values, item[1], item[2])
+            else:
+                self.restore(self.conns, item[1], item[2])
+        self.history = []
+
+    def restore(self, table, key, value):
+        """
+        Put back a previous table entry (or remove it if there wasn't one)
+        """
+        if value is None:
+            table.pop(key, None)
+        else:
+            table[key] = value
@@ -0,0 +1,156 @@
+###########################################################################################
+#
+#   Title: Cost Tools
+#
+#   Descritpion: Static evaluation cost model for the rigs these tools build. Every node
+#       is weighted by its type (the paralleltools costs, where a decomposeMatrix is 1)
+#       and a rig is summarized as node counts and cost per type, connections, fan-out
+#       and an estimated cost per frame, so Ribbon configurations (jointNum, deformers)
+#       or constraint modes can be compared before a character goes into production
+#
+#    Instructions: report on a built rig:
+#           var = CostReport(nodes=mc.ls("arm_*"))
+#           var.analyze()
+#           print(var.summary())
+#
+#       - CostReport() reports on the whole scene, CostReport(plan) on a
+#           buildtools.BuildPlan or LocalGraph before it's flushed
+#       - measure(build) runs a build and only reports on the nodes it created:
+#           a = measure(lambda: Ribbon("a", jointNum=5).build_ribbon_rig())
+#           b = measure(lambda: Ribbon("b", jointNum=9).build_ribbon_rig())
+#           print(compare([("5 joints", a), ("9 joints", b)]))
+#       - the frame estimate assumes every node evaluates once a frame: "cost" is the
+#           serial (DG) estimate, "frame" the parallel one spread over THREADS cores
+#           (never less than the critical path)
+#       - outside Maya, run the comparison through the headless stand-in:
+#           python headlesstools.py myCompare.py
+#
+###########################################################################################
+
+import maya.cmds as mc
+
+from matrixtools import paralleltools as pt
+
+# Cores the parallel frame estimate spreads the rig over
+THREADS = 4
+# Nodes driving more than this many nodes are listed as fan-out hotspots
+FAN_OUT_LIMIT = 8
+
+
+def measure(build, threads=THREADS):
+    """
+    Run a build and get the cost report of the nodes it created
+    """
+    before = set(mc.ls())
+    build()
+    nodes = [node for node in mc.ls() if node not in before]
+    return CostReport(nodes=nodes, threads=threads).analyze()
+
+
+def compare(reports):
+    """
+    Put the totals and the cost per node type of several reports side by side. Takes
+    (name, report) pairs or a dict of them
+    """
+    items = sorted(reports.items()) if isinstance(reports, dict) else list(reports)
+    names = [name for name, report in items]
+    width = max([12] + [len(name) for name in names])
+    cell = "{:>%d}" % width
+    lines = ["{:<24}".format("") + " ".join([cell.format(name) for name in names])]
+
+    rows = [("nodes", lambda r: r["nodes"], "{}"),
+            ("connections", lambda r: r["connections"], "{}"),
+            ("cost (serial)", lambda r: r["cost"], "{:.1f}"),
+            ("frame (parallel)", lambda r: r["frame"], "{:.1f}"),
+            ("critical path", lambda r: r["critical"], "{:.1f}"),
+            ("max fan-out", lambda r: r["fanOut"]["max"], "{}")]
+    for label, get, fmt in rows:
+        lines.append("{:<24}".format(label) + " ".join(
+            [cell.format(fmt.format(get(report))) for name, report in items]))
+
+    # Most expensive types first, by the most any variant spends on them
+    types = set()
+    for name, report in items:
+        types.update(report["types"])
+    types = sorted(types, key=lambda t: (-max([report["types"].get(t, {}).get("cost", 0.0)
+                                              for name, report in items]), t))
+    for nodeType in types:
+        values = []
+        for name, report in items:
+            entry = report["types"].get(nodeType)
+            values.append(cell.format("{} / {:.1f}".format(entry["count"], entry["cost"])
+                                      if entry else "-"))
+        lines.append("  {:<22}".format(nodeType) + " ".join(values))
+    return "\n".join(lines)
+
+
+class CostReport:
+    """
+    Estimates what a rig costs to evaluate every frame
+    """
+
+    def __init__(self, target=None, nodes=None, threads=THREADS):
+        self.analyzer = pt.Analyzer(target, nodes)
+        self.threads = threads
+        self.report = {}
+
+    def get_types(self, costs):
+        """
+        Count the nodes of every type and add up what they cost. The scene nodes a
+        plan connects to have no known type
+        """
+        types = {}
+        for node, nodeType in self.analyzer.types.items():
+            entry = types.setdefault(nodeType or "unknown", {"count": 0, "cost": 0.0})
+            entry["count"] += 1
+            entry["cost"] += costs[node]
+        return types
+
+    def get_fan_out(self):
+        """
+        Get the largest and mean number of nodes a node drives (every one of them is
+        dirtied when it changes) and the nodes driving more than FAN_OUT_LIMIT
+        """
+        counts = dict([(node, len(succ)) for node, succ in self.analyzer.succ.items()])
+        hotspots = sorted([(node, count) for node, count in counts.items()
+                           if count > FAN_OUT_LIMIT], key=lambda item: (-item[1], item[0]))
+        return {"max": max(counts.values()) if counts else 0,
+                "mean": float(sum(counts.values())) / len(counts) if counts else 0.0,
+                "hotspots": hotspots}
+
+    def analyze(self):
+        """
+        Build the dependency graph and return the report
+        """
+        graph = self.analyzer.analyze()
+        critical = graph["critical"]["cost"]
+        self.report = {"nodes": graph["nodes"],
+                       "connections": graph["connections"],
+                       "types": self.get_types(graph["costs"]),
+                       "fanOut": self.get_fan_out(),
+                       "cost": graph["cost"],
+                       "critical": critical,
+                       "frame": max(critical, graph["cost"] / self.threads),
+                       "threads": self.threads}
+        return self.report
+
+    def summary(self):
+        """
+        Describe the last report as a few totals and a table of the cost per node type
+        """
+        report = self.report or self.analyze()
+        fanOut = report["fanOut"]
+        lines = ["{} nodes, {} connections".format(report["nodes"], report["connections"]),
+                 "cost per frame: {:.1f} serial, {:.1f} parallel on {} threads "
+                 "(critical path {:.1f})".format(report["cost"], report["frame"],
+                                                 report["threads"], report["critical"]),
+                 "fan-out: max {}, mean {:.1f}".format(fanOut["max"], fanOut["mean"]),
+                 "    {:<22} {:>6} {:>8} {:>6}".format("type", "count", "cost", "share")]
+        types = sorted(report["types"].items(), key=lambda item: (-item[1]["cost"], item[0]))
+        for nodeType, entry in types:
+            lines.append("    {:<22} {:>6} {:>8.1f} {:>6.0%}".format(
+                nodeType, entry["count"], entry["cost"],
+                entry["cost"] / report["cost"] if report["cost"] else 0.0))
+        for node, count in fanOut["hotspots"]:
+            lines.append("fan-out: {} drives {} nodes".format(node, count))
+        return "\n".join(lines)
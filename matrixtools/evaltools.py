@@ -0,0 +1,633 @@
+###########################################################################################
+#
+#   Title: Eval Tools
+#
+#   Descritpion: Evaluates the node networks built by Constraint, BlendColor and Rivet
+#       with NumPy instead of Maya, for thousands of driver poses at once. Matrices are
+#       stacked (frames, 4, 4) arrays so a whole animation evaluates in a handful of
+#       array operations
+#
+#    Instructions: capture a network, then evaluate it for a batch of poses:
+#           net = from_scene()                  (inside Maya or the headless stand-in)
+#           net = from_plan(plan)               (from a buildtools.BuildPlan)
+#           result = Evaluator(net).evaluate({"driver.worldMatrix[0]": poses})
+#
+#       - poses can be (frames, 4, 4) arrays (or (frames, 16) lists); plugs that aren't
+#           given fall back to the values captured with the network
+#       - evaluate() returns every driven plug (node.translate, node.rotate...) as an
+#           array with one row per frame, or pass the plugs you want
+#       - supported nodes: multMatrix, wtAddMatrix, choice, decomposeMatrix,
+#           quatToEuler, blendColors, fourByFourMatrix, pickMatrix, blendMatrix,
+#           aimMatrix, inverseMatrix, multDoubleLinear, multiplyDivide, plusMinusAverage
+#           (1D and 3D), clamp, condition, blendTwoAttr and distanceBetween. pointOnSurfaceInfo
+#           and uvPin outputs have to be given as inputs since there's no surface to
+#           evaluate
+#       - matrices are split and built with mathtools.decompose and compose, the same
+#           math the headless stand-in uses, so both give the same results
+#
+###########################################################################################
+
+import re
+
+import numpy as np
+
+from . import mathtools
+
+ROTATE_ORDERS = ["xyz", "yzx", "zxy", "xzy", "yxz", "zyx"]
+AXES = {"X": 0, "Y": 1, "Z": 2, "R": 0, "G": 1, "B": 2, "x": 0, "y": 1, "z": 2}
+# Matrix array attributes whose [0] element is the only one anybody uses
+ARRAY_MATRICES = re.compile(
+    r"\.(worldMatrix|worldInverseMatrix|parentMatrix|parentInverseMatrix)\[0\]$")
+# Unconnected inputs worth capturing per node type (multi attributes are found by index)
+INPUTS = {"multMatrix": [],
+          "wtAddMatrix": [],
+          "choice": ["selector"],
+          "decomposeMatrix": ["inputRotateOrder"],
+          "quatToEuler": ["inputRotateOrder"],
+          "blendColors": ["blender", "color1", "color2"],
+          "fourByFourMatrix": ["in{}{}".format(r, c) for r in range(4) for c in range(4)],
+          "pickMatrix": ["useTranslate", "useRotate", "useScale", "useShear"],
+          "blendMatrix": ["envelope"],
+          "multDoubleLinear": ["input1", "input2"],
+          "pointOnSurfaceInfo": ["parameterU", "parameterV"],
+          "uvPin": [],
+          "multiplyDivide": ["operation"] + ["input{}{}".format(i, c) for i in [1, 2]
+                                             for c in "XYZ"],
+          "plusMinusAverage": ["operation"],
+          "clamp": ["{}{}".format(a, c) for a in ["input", "min", "max"] for c in "RGB"],
+          "condition": ["operation", "firstTerm", "secondTerm"] + [
+              "{}{}".format(a, c) for a in ["colorIfTrue", "colorIfFalse"] for c in "RGB"],
+          "blendTwoAttr": ["attributesBlender"],
+          "distanceBetween": [],
+          "inverseMatrix": [],
+          "aimMatrix": ["primaryMode", "secondaryMode"] + [
+              "{}{}".format(a, c) for a in ["primaryInputAxis", "secondaryInputAxis"]
+              for c in "XYZ"]}
+MULTI_INPUTS = {"multMatrix": ["matrixIn"],
+                "wtAddMatrix": ["wtMatrix"],
+                "choice": ["input"],
+                "blendMatrix": ["target"],
+                "plusMinusAverage": ["input1D", "input3D"],
+                "blendTwoAttr": ["input"]}
+
+
+def norm_plug(plug):
+    """
+    Write a plug the same way however it was connected (node.worldMatrix[0] and
+    node.worldMatrix are the same plug)
+    """
+    return ARRAY_MATRICES.sub(r".\1", plug)
+
+
+def to_matrix(value):
+    """
+    Turn a flat 16 value list (or a stack of them) into (..., 4, 4) matrices
+    """
+    value = np.asarray(value, dtype=float)
+    if value.shape[-1] == 16:
+        value = value.reshape(value.shape[:-1] + (4, 4))
+    return value
+
+
+def axis_matrix(axis, angle):
+    """
+    Rotation about one axis as (..., 3, 3) matrices (row vectors, like Maya)
+    """
+    c = np.cos(angle)
+    s = np.sin(angle)
+    one = np.ones_like(angle)
+    zero = np.zeros_like(angle)
+    if axis == 0:
+        rows = [[one, zero, zero], [zero, c, s], [zero, -s, c]]
+    elif axis == 1:
+        rows = [[c, zero, -s], [zero, one, zero], [s, zero, c]]
+    else:
+        rows = [[c, s, zero], [-s, c, zero], [zero, zero, one]]
+    return np.stack([np.stack(row, -1) for row in rows], -2)
+
+
+def euler_to_matrix(rotate, order=0):
+    """
+    Euler rotations (..., 3) in degrees to (..., 3, 3) rotation matrices
+    """
+    rad = np.radians(np.asarray(rotate, dtype=float))
+    result = None
+    for letter in ROTATE_ORDERS[int(order)]:
+        i = "xyz".index(letter)
+        m = axis_matrix(i, rad[..., i])
+        # With row vectors the first rotation in the order is applied first
+        result = m if result is None else np.matmul(result, m)
+    return result
+
+
+def matrix_to_euler(rot, order=0):
+    """
+    (..., 3, 3) rotation matrices to euler rotations (..., 3) in degrees
+    """
+    i, j, k = ["xyz".index(letter) for letter in ROTATE_ORDERS[int(order)]]
+    parity = 1.0 if (i, j, k) in [(0, 1, 2), (1, 2, 0), (2, 0, 1)] else -1.0
+    # Work with the column vector form of the matrix
+    m = np.swapaxes(rot, -1, -2)
+
+    a = np.arctan2(parity * m[..., k, j], m[..., k, k])
+    b = np.arcsin(np.clip(-parity * m[..., k, i], -1.0, 1.0))
+    c = np.arctan2(parity * m[..., j, i], m[..., i, i])
+
+    result = np.zeros(rot.shape[:-2] + (3,))
+    result[..., i] = a
+    result[..., j] = b
+    result[..., k] = c
+    return np.degrees(result)
+
+
+def matrix_to_quat(rot):
+    """
+    (..., 3, 3) rotation matrices to (..., 4) quaternions (x, y, z, w)
+    """
+    m = np.swapaxes(rot, -1, -2)
+    m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+    # Pick the most stable of the four formulas per matrix
+    candidates = [
+        (1 + m00 + m11 + m22, [m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0],
+                               m[..., 1, 0] - m[..., 0, 1], 1 + m00 + m11 + m22]),
+        (1 + m00 - m11 - m22, [1 + m00 - m11 - m22, m[..., 0, 1] + m[..., 1, 0],
+                               m[..., 0, 2] + m[..., 2, 0], m[..., 2, 1] - m[..., 1, 2]]),
+        (1 - m00 + m11 - m22, [m[..., 0, 1] + m[..., 1, 0], 1 - m00 + m11 - m22,
+                               m[..., 1, 2] + m[..., 2, 1], m[..., 0, 2] - m[..., 2, 0]]),
+        (1 - m00 - m11 + m22, [m[..., 0, 2] + m[..., 2, 0], m[..., 1, 2] + m[..., 2, 1],
+                               1 - m00 - m11 + m22, m[..., 1, 0] - m[..., 0, 1]])]
+    traces = np.stack([t for t, q in candidates], -1)
+    quats = np.stack([np.stack(q, -1) for t, q in candidates], -2)
+    best = np.argmax(traces, -1)
+    quat = np.take_along_axis(quats, best[..., None, None], -2)[..., 0, :]
+    quat = quat / np.linalg.norm(quat, axis=-1, keepdims=True)
+    # Keep w positive so the same rotation always gives the same quaternion
+    return np.where(quat[..., 3:] < 0, -quat, quat)
+
+
+def quat_to_matrix(quat):
+    """
+    (..., 4) quaternions (x, y, z, w) to (..., 3, 3) rotation matrices
+    """
+    quat = np.asarray(quat, dtype=float)
+    quat = quat / np.linalg.norm(quat, axis=-1, keepdims=True)
+    x, y, z, w = quat[..., 0], quat[..., 1], quat[..., 2], quat[..., 3]
+    cols = [[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]]
+    m = np.stack([np.stack(row, -1) for row in cols], -2)
+    return np.swapaxes(m, -1, -2)
+
+
+def slerp(q1, q2, t):
+    """
+    Spherical interpolation between (..., 4) quaternions
+    """
+    dot = np.sum(q1 * q2, -1, keepdims=True)
+    # Take the short way around
+    q2 = np.where(dot < 0, -q2, q2)
+    dot = np.clip(np.abs(dot), 0.0, 1.0)
+    t = np.asarray(t, dtype=float)[..., None]
+    angle = np.arccos(dot)
+    sin = np.sin(angle)
+    small = sin < 1e-6
+    safe = np.where(small, 1.0, sin)
+    w1 = np.where(small, 1 - t, np.sin((1 - t) * angle) / safe)
+    w2 = np.where(small, t, np.sin(t * angle) / safe)
+    quat = w1 * q1 + w2 * q2
+    return quat / np.linalg.norm(quat, axis=-1, keepdims=True)
+
+
+def decompose(mtrx):
+    """
+    Split (..., 4, 4) matrices into translate, rotation matrix, scale and shear (see
+    mathtools.decompose)
+    """
+    m = to_matrix(mtrx)
+    translate, rot, scale, shear = mathtools.decompose(
+        [[m[..., r, c] for c in range(4)] for r in range(4)])
+    return (np.stack(translate, -1), np.stack([np.stack(row, -1) for row in rot], -2),
+            np.stack(scale, -1), np.stack(shear, -1))
+
+
+def compose(translate, rot, scale, shear):
+    """
+    Build (..., 4, 4) matrices from translate, rotation matrix, scale and shear (see
+    mathtools.compose)
+    """
+    translate = np.asarray(translate, dtype=float)
+    rot = np.asarray(rot, dtype=float)
+    scale = np.asarray(scale, dtype=float)
+    shear = np.asarray(shear, dtype=float)
+    rows = mathtools.compose([translate[..., i] for i in range(3)],
+                             [[rot[..., r, c] for c in range(3)] for r in range(3)],
+                             [scale[..., i] for i in range(3)],
+                             [shear[..., i] for i in range(3)])
+    values = np.broadcast_arrays(*[np.asarray(v, dtype=float) for row in rows for v in row])
+    m = np.stack(values, -1)
+    return m.reshape(m.shape[:-1] + (4, 4))
+
+
+class Network:
+    """
+    The nodes ({name: nodeType}), constant values ({plug: value}) and connections
+    ({destination plug: source plug}) of a node network
+    """
+
+    def __init__(self, nodes=None, values=None, conns=None):
+        self.nodes = dict(nodes or {})
+        self.values = {}
+        self.conns = {}
+        for plug, value in (values or {}).items():
+            self.values[norm_plug(plug)] = value
+        for dst, src in (conns or {}).items():
+            self.conns[norm_plug(dst)] = norm_plug(src)
+
+    def get_driven(self):
+        """
+        Get the plugs outside of the network that the network drives
+        """
+        return sorted([dst for dst, src in self.conns.items()
+                       if dst.partition(".")[0] not in self.nodes
+                       and src.partition(".")[0] in self.nodes])
+
+    def get_external(self):
+        """
+        Get the plugs outside of the network that feed into it
+        """
+        return sorted(set([src for dst, src in self.conns.items()
+                           if src.partition(".")[0] not in self.nodes]))
+
+
+def from_plan(plan):
+    """
+    Capture the network recorded in a buildtools.BuildPlan
+    """
+    net = Network(dict(plan.nodes))
+    for plug, value, valueType in plan.values:
+        net.values[norm_plug(plug)] = value
+    for src, dst, force in plan.conns:
+        net.conns[norm_plug(dst)] = norm_plug(src)
+    return net
+
+
+def get_value(mc, plug):
+    """
+    Read a plug, unwrapping the single item list cmds returns for compound values
+    """
+    value = mc.getAttr(plug)
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], tuple):
+        return list(value[0])
+    return value
+
+
+def from_scene(nodes=None):
+    """
+    Capture a network from the scene: every supported node (or just the ones given),
+    its connections, its unconnected inputs and the current value of everything
+    outside the network that feeds it
+    """
+    import maya.cmds as mc
+
+    if nodes is None:
+        nodes = mc.ls(type=list(INPUTS)) or []
+    net = Network(dict([(node, mc.nodeType(node)) for node in nodes]))
+
+    for node in nodes:
+        plugs = mc.listConnections(node, s=True, d=False, c=True, p=True) or []
+        for dst, src in zip(plugs[::2], plugs[1::2]):
+            net.conns[norm_plug(dst)] = norm_plug(src)
+            if src.partition(".")[0] not in net.nodes:
+                # Store the current value of outside inputs as their rest pose
+                net.values[norm_plug(src)] = get_value(mc, src)
+        plugs = mc.listConnections(node, s=False, d=True, c=True, p=True) or []
+        for src, dst in zip(plugs[::2], plugs[1::2]):
+            net.conns[norm_plug(dst)] = norm_plug(src)
+
+        nodeType = net.nodes[node]
+        attrs = list(INPUTS.get(nodeType, []))
+        for multi in MULTI_INPUTS.get(nodeType, []):
+            for i in mc.getAttr("{}.{}".format(node, multi), mi=True) or []:
+                if multi == "input3D":
+                    attrs.extend(["{0}[{1}].{0}{2}".format(multi, i, c) for c in "xyz"])
+                elif nodeType in ["plusMinusAverage", "blendTwoAttr"]:
+                    attrs.append("{}[{}]".format(multi, i))
+                elif nodeType == "wtAddMatrix":
+                    attrs.append("{}[{}].weightIn".format(multi, i))
+                elif nodeType == "blendMatrix":
+                    attrs.extend(["{}[{}].{}".format(multi, i, a) for a in
+                                  ["weight", "translateWeight", "rotateWeight",
+                                   "scaleWeight", "shearWeight"]])
+        for attr in attrs:
+            plug = "{}.{}".format(node, attr)
+            if plug not in net.conns:
+                net.values[plug] = get_value(mc, plug)
+    return net
+
+
+class Evaluator:
+    """
+    Evaluates a Network for a batch of input values
+    """
+
+    def __init__(self, network):
+        self.net = network
+        self.inputs = {}
+        self.cache = {}
+        self.outputs = {}
+        self.busy = set()
+
+    def evaluate(self, inputs, plugs=None):
+        """
+        Evaluate plugs (every driven plug by default) for a batch of inputs
+        ({plug: array}) and return {plug: array}
+        """
+        self.inputs = {}
+        for plug, value in inputs.items():
+            self.inputs[norm_plug(plug)] = np.asarray(value, dtype=float)
+        self.cache = {}
+        self.outputs = {}
+
+        frames = max([len(v) for v in self.inputs.values() if v.ndim > 0] + [1])
+        result = {}
+        for plug in plugs or self.net.get_driven():
+            value = self.get(plug)
+            # Constant results still get one row per frame
+            if value.ndim == 0 or value.shape[0] != frames:
+                value = np.broadcast_to(value, (frames,) + value.shape)
+            result[plug] = value
+        return result
+
+    def get(self, plug):
+        """
+        Get the value of any plug
+        """
+        plug = norm_plug(plug)
+        if plug not in self.cache:
+            self.cache[plug] = self.compute(plug)
+        return self.cache[plug]
+
+    def compute(self, plug):
+        """
+        Work out a plug from the inputs, its connection, its node or its parent plug
+        """
+        if plug in self.inputs:
+            return self.inputs[plug]
+        if plug in self.net.conns:
+            return self.get(self.net.conns[plug])
+
+        if plug in self.net.values:
+            return np.asarray(self.net.values[plug], dtype=float)
+
+        node, sep, attr = plug.partition(".")
+        nodeType = self.net.nodes.get(node)
+        if node not in self.busy and hasattr(self, "eval_{}".format(nodeType)):
+            # A node's own inputs can't come from evaluating the node
+            outputs = self.get_outputs(node, nodeType)
+            if attr in outputs:
+                return outputs[attr]
+
+        if attr.endswith("InverseMatrix"):
+            # The inverse of a world (or parent) matrix that was given
+            return np.linalg.inv(to_matrix(self.get(plug.replace("InverseMatrix", "Matrix"))))
+
+        if attr and attr[-1] in AXES and not attr.endswith("]"):
+            # A single channel of a compound plug
+            return self.get(plug[:-1])[..., AXES[attr[-1]]]
+
+        raise KeyError("No value for {}".format(plug))
+
+    def get_outputs(self, node, nodeType):
+        """
+        Evaluate every output of a node at once
+        """
+        if node not in self.outputs:
+            self.busy.add(node)
+            try:
+                self.outputs[node] = getattr(self, "eval_{}".format(nodeType))(node)
+            finally:
+                self.busy.discard(node)
+        return self.outputs[node]
+
+    def value(self, node, attr, default):
+        """
+        Get an input of a node, falling back to a default
+        """
+        plug = "{}.{}".format(node, attr)
+        try:
+            return self.get(plug)
+        except KeyError:
+            children = ["{}{}".format(plug, c) for c in ["X", "Y", "Z"]]
+            if any([c in self.net.conns for c in children]):
+                # Compound inputs can also be connected one channel at a time
+                return np.stack([self.value(node, c.partition(".")[2], default[i])
+                                 for i, c in enumerate(children)], -1)
+            children = ["{}{}".format(plug, c) for c in ["R", "G", "B"]]
+            if any([c in self.net.conns for c in children]):
+                return np.stack([self.value(node, c.partition(".")[2], default[i])
+                                 for i, c in enumerate(children)], -1)
+            return np.asarray(default, dtype=float)
+
+    def matrix(self, node, attr):
+        """
+        Get a matrix input of a node (identity if it has none)
+        """
+        return to_matrix(self.value(node, attr, np.eye(4)))
+
+    def vector(self, node, attr, default, channels="XYZ"):
+        """
+        Get a compound input one channel at a time (any channel can be connected)
+        """
+        return np.stack(np.broadcast_arrays(*[
+            np.asarray(self.value(node, "{}{}".format(attr, c), default[i]), dtype=float)
+            for i, c in enumerate(channels)]), -1)
+
+    def get_indices(self, node, multi):
+        """
+        Get the indices used by a multi attribute through connections or values
+        """
+        prefix = "{}.{}[".format(node, multi)
+        indices = set()
+        for plug in list(self.net.conns) + list(self.net.values) + list(self.inputs):
+            if plug.startswith(prefix):
+                indices.add(int(plug[len(prefix):].split("]")[0]))
+        return sorted(indices)
+
+    def eval_multMatrix(self, node):
+        result = np.eye(4)
+        for i in self.get_indices(node, "matrixIn"):
+            # Maya multiplies matrixIn[0] * matrixIn[1] * ...
+            result = np.matmul(result, self.matrix(node, "matrixIn[{}]".format(i)))
+        return {"matrixSum": result}
+
+    def eval_wtAddMatrix(self, node):
+        result = np.zeros((4, 4))
+        for i in self.get_indices(node, "wtMatrix"):
+            wt = self.value(node, "wtMatrix[{}].weightIn".format(i), 1.0)
+            mtrx = self.matrix(node, "wtMatrix[{}].matrixIn".format(i))
+            result = result + np.asarray(wt)[..., None, None] * mtrx
+        return {"matrixSum": result}
+
+    def eval_choice(self, node):
+        indices = self.get_indices(node, "input")
+        inputs = [to_matrix(self.value(node, "input[{}]".format(i), np.eye(4)))
+                  for i in range(max(indices) + 1)]
+        selector = np.asarray(self.value(node, "selector", 0), dtype=int)
+        stacked = np.stack(np.broadcast_arrays(*inputs))
+        if selector.ndim == 0:
+            return {"output": stacked[int(selector)]}
+        frames = np.arange(len(selector))
+        return {"output": np.broadcast_to(stacked, (stacked.shape[0], len(selector)) +
+                                          stacked.shape[-2:])[selector, frames]}
+
+    def eval_decomposeMatrix(self, node):
+        translate, rot, scale, shear = decompose(self.matrix(node, "inputMatrix"))
+        order = int(self.value(node, "inputRotateOrder", 0))
+        return {"outputTranslate": translate, "outputRotate": matrix_to_euler(rot, order),
+                "outputScale": scale, "outputShear": shear,
+                "outputQuat": matrix_to_quat(rot)}
+
+    def eval_quatToEuler(self, node):
+        quat = self.value(node, "inputQuat", [0, 0, 0, 1])
+        if quat.shape[-1] != 4:
+            quat = np.stack([self.value(node, "inputQuat{}".format(c), d)
+                             for c, d in zip("XYZW", [0, 0, 0, 1])], -1)
+        order = int(self.value(node, "inputRotateOrder", 0))
+        return {"outputRotate": matrix_to_euler(quat_to_matrix(quat), order)}
+
+    def eval_blendColors(self, node):
+        blender = np.asarray(self.value(node, "blender", 0.5))[..., None]
+        color1 = self.value(node, "color1", [1, 0, 0])
+        color2 = self.value(node, "color2", [0, 0, 1])
+        return {"output": color1 * blender + color2 * (1 - blender)}
+
+    def eval_fourByFourMatrix(self, node):
+        cells = []
+        for r in range(4):
+            for c in range(4):
+                cells.append(np.asarray(self.value(node, "in{}{}".format(r, c),
+                                                   float(r == c))))
+        cells = np.broadcast_arrays(*cells)
+        return {"output": np.stack(cells, -1).reshape(cells[0].shape + (4, 4))}
+
+    def eval_pickMatrix(self, node):
+        translate, rot, scale, shear = decompose(self.matrix(node, "inputMatrix"))
+        use = [bool(self.value(node, attr, 1)) for attr in
+               ["useTranslate", "useRotate", "useScale", "useShear"]]
+        return {"outputMatrix": compose(translate if use[0] else np.zeros(3),
+                                        rot if use[1] else np.eye(3),
+                                        scale if use[2] else np.ones(3),
+                                        shear if use[3] else np.zeros(3))}
+
+    def eval_blendMatrix(self, node):
+        base = self.matrix(node, "inputMatrix")
+        envelope = self.value(node, "envelope", 1.0)
+        translate, rot, scale, shear = decompose(base)
+        quat = matrix_to_quat(rot)
+        for i in self.get_indices(node, "target"):
+            target = "target[{}]".format(i)
+            tTranslate, tRot, tScale, tShear = decompose(
+                self.matrix(node, "{}.targetMatrix".format(target)))
+            weight = self.value(node, "{}.weight".format(target), 1.0) * envelope
+            wts = [np.asarray(weight * self.value(node, "{}.{}Weight".format(target, c), 1.0))
+                   for c in ["translate", "rotate", "scale", "shear"]]
+            # Each target layers over the result of the ones before it
+            translate = translate + (tTranslate - translate) * wts[0][..., None]
+            quat = slerp(quat, matrix_to_quat(tRot), wts[1])
+            scale = scale + (tScale - scale) * wts[2][..., None]
+            shear = shear + (tShear - shear) * wts[3][..., None]
+        return {"outputMatrix": compose(translate, quat_to_matrix(quat), scale, shear)}
+
+    def eval_multDoubleLinear(self, node):
+        return {"output": self.value(node, "input1", 0.0) * self.value(node, "input2", 1.0)}
+
+    def eval_multiplyDivide(self, node):
+        op = int(self.value(node, "operation", 1))
+        input1 = self.vector(node, "input1", [0, 0, 0])
+        input2 = self.vector(node, "input2", [1, 1, 1])
+        if op == 1:
+            return {"output": input1 * input2}
+        if op == 2:
+            return {"output": input1 / input2}
+        if op == 3:
+            return {"output": np.power(input1, input2)}
+        return {"output": input1}
+
+    def eval_plusMinusAverage(self, node):
+        op = int(self.value(node, "operation", 1))
+        values = [np.asarray(self.value(node, "input1D[{}]".format(i), 0.0), dtype=float)
+                  for i in self.get_indices(node, "input1D")]
+        vectors = [self.vector(node, "input3D[{}].input3D".format(i), [0, 0, 0], "xyz")
+                   for i in self.get_indices(node, "input3D")]
+        outputs = {}
+        for attr, inputs, empty in [("output1D", values, np.asarray(0.0)),
+                                    ("output3D", vectors, np.zeros(3))]:
+            if not inputs or op == 0:
+                outputs[attr] = inputs[0] if inputs else empty
+            elif op == 2:
+                outputs[attr] = inputs[0] - sum(inputs[1:])
+            else:
+                total = sum(inputs)
+                outputs[attr] = total / len(inputs) if op == 3 else total
+        return outputs
+
+    def eval_clamp(self, node):
+        value = self.vector(node, "input", [0, 0, 0], "RGB")
+        low = self.vector(node, "min", [0, 0, 0], "RGB")
+        high = self.vector(node, "max", [0, 0, 0], "RGB")
+        return {"output": np.minimum(np.maximum(value, low), high)}
+
+    def eval_condition(self, node):
+        first = np.asarray(self.value(node, "firstTerm", 0.0))
+        second = np.asarray(self.value(node, "secondTerm", 0.0))
+        tests = [np.equal, np.not_equal, np.greater, np.greater_equal, np.less,
+                 np.less_equal]
+        test = tests[int(self.value(node, "operation", 0))](first, second)
+        colorTrue = self.vector(node, "colorIfTrue", [0, 0, 0], "RGB")
+        colorFalse = self.vector(node, "colorIfFalse", [1, 1, 1], "RGB")
+        return {"outColor": np.where(test[..., None], colorTrue, colorFalse)}
+
+    def eval_blendTwoAttr(self, node):
+        blender = np.asarray(self.value(node, "attributesBlender", 0.0))
+        input0 = np.asarray(self.value(node, "input[0]", 0.0))
+        input1 = np.asarray(self.value(node, "input[1]", 0.0))
+        return {"output": input0 + (input1 - input0) * blender}
+
+    def eval_distanceBetween(self, node):
+        point1 = self.vector(node, "point1", [0, 0, 0])
+        point2 = self.vector(node, "point2", [0, 0, 0])
+        # Points are brought into the space of their matrices first
+        points = []
+        for point, attr in [(point1, "inMatrix1"), (point2, "inMatrix2")]:
+            mtrx = self.matrix(node, attr)
+            points.append(np.matmul(point[..., None, :], mtrx[..., :3, :3])[..., 0, :] +
+                          mtrx[..., 3, :3])
+        point1, point2 = points
+        return {"distance": np.linalg.norm(point2 - point1, axis=-1)}
+
+    def eval_inverseMatrix(self, node):
+        return {"outputMatrix": np.linalg.inv(self.matrix(node, "inputMatrix"))}
+
+    def eval_aimMatrix(self, node):
+        translate, rot, scale, shear = decompose(self.matrix(node, "inputMatrix"))
+        primary = self.vector(node, "primaryInputAxis", [1, 0, 0])
+        secondary = self.vector(node, "secondaryInputAxis", [0, 1, 0])
+        aim = self.matrix(node, "primaryTargetMatrix")[..., 3, :3] - translate
+        if int(self.value(node, "secondaryMode", 0)) == 1:
+            up = self.matrix(node, "secondaryTargetMatrix")[..., 3, :3] - translate
+        else:
+            # Without a secondary target the input's own axis is kept as close as it can
+            up = np.matmul(secondary[..., None, :], rot)[..., 0, :]
+
+        def frame(first, second):
+            first = first / np.linalg.norm(first, axis=-1, keepdims=True)
+            second = second - np.sum(second * first, -1, keepdims=True) * first
+            second = second / np.linalg.norm(second, axis=-1, keepdims=True)
+            return np.stack(np.broadcast_arrays(first, second, np.cross(first, second)), -2)
+
+        # Rotate the input axes onto the aim and up directions (row vectors)
+        local = frame(primary, secondary)
+        world = frame(aim, up)
+        rot = np.matmul(np.swapaxes(local, -1, -2), world)
+        return {"outputMatrix": np.matmul(compose(translate, rot, scale, np.zeros(3)),
+                                          self.matrix(node, "postSpaceMatrix"))}
@@ -0,0 +1,476 @@
+###########################################################################################
+#
+#   Title: FKIK Tools
+#
+#   Descritpion: Builds FK and IK joint chains from a bind chain and blends them back
+#       onto it with matrix nodes. Every bind joint gets a single blendMatrix driving its
+#       offsetParentMatrix (the local matrices of its FK and IK joints blended by the
+#       switch attribute), so a chain costs one node per joint however long it is
+#
+#    Instructions: select the root joint of your bind chain, initialize the FKIK class
+#       (var = FKIK()) and run var.mk_fkik(). The FK and IK chains are named after the
+#       bind joints (arm01_bind becomes arm01_FK and arm01_IK) and the blend is switched
+#       by the fkIk attribute of a switch controller (0 is FK, 1 is IK)
+#
+#       - var.mk_fkik(start, end) builds the chain between two joints instead of the
+#           selection
+#       - FKIK(switch="settings_ctrl", attr="armFkIk") uses an existing controller (the
+#           attribute is added if it's missing), otherwise an arm01_FKIK_ctrl transform
+#           is created
+#       - var.build([(start, end), ...]) builds many chains at once, all switched by the
+#           same controller attribute
+#       - give it a buildtools.BuildPlan (var.plan = BuildPlan()) to create every blend
+#           and connection in one transaction
+#       - the bind joints' translate, rotate and jointOrient are zeroed since their
+#           offsetParentMatrix carries the whole local transform. Keep the FK and IK
+#           roots under the bind root's parent, a chain whose roots were moved elsewhere
+#           blends their world matrices through one more multMatrix
+#       - var.mk_fkik(start, end, ctrl, pole) also solves the last three joints of the
+#           chain (upper, lower and end) with an analytic two-bone IK built from utility
+#           nodes instead of an ikHandle: the law of cosines on the root to controller
+#           distance gives the bend, an aimMatrix aims the upper joint with the
+#           controller and pole directions it solved as its aim and up axes, and one
+#           fourByFourMatrix bends the lower joint. The results feed the IK side of the
+#           blends directly. The joints have to aim down X and bend about Z with the
+#           pole on +Y, the bone lengths are the rest translateX of the lower and end
+#           joints
+#       - FKIK(stretch=True) stretches the bones past full reach (stretch attribute on
+#           the controller), FKIK(soft=True) eases into full reach over the controller's
+#           softness distance, FKIK(orient=True) orients the end joint like the
+#           controller instead of keeping its rest orientation. All three are off by
+#           default: like an ikHandle with a pole vector, the default solve only bends
+#           the limb, and each option adds nodes to every limb
+#
+###########################################################################################
+
+import math
+
+import maya.cmds as mc
+from . import matrixconstrainttools as mt
+
+SWITCH_ATTR = "fkIk"
+OPM = ".offsetParentMatrix"
+LOCAL = ".matrix"
+PIM = ".parentInverseMatrix[0]"
+STRETCH_ATTR = "stretch"
+SOFT_ATTR = "softness"
+OFFSET_ATTR = "ikOffset"
+# Keeps the solve away from the singular straight and folded poses
+REACH_EPS = 1e-6
+SOFT_MIN = 1e-4
+SOFT_EXP_MIN = -50.0
+STRETCH_MAX = 1000.0
+
+
+class FKIK(mt.Matrix):
+    """
+    Blends FK and IK joint chains onto a bind chain with one blendMatrix per joint
+    """
+
+    def __init__(self, switch=None, attr=SWITCH_ATTR, stretch=False, soft=False,
+                 orient=False):
+        mt.Matrix.__init__(self, mo=False)
+        self.switch = switch
+        self.attr = attr
+        self.stretch = stretch
+        self.soft = soft
+        self.orient = orient
+        self.chains = []
+
+    def get_root(self, jnt=None):
+        """
+        Get the root of the joint chain your joint (or the selected joint) belongs to
+        """
+        if jnt is None:
+            sel = mc.ls(sl=True, type="joint")
+            if not sel:
+                return mc.error("Please select a joint of your bind chain")
+            jnt = sel[0]
+
+        parent = mc.listRelatives(jnt, p=True, type="joint")
+        while parent is not None:
+            # Walk up until the parent isn't a joint anymore
+            jnt = parent[0]
+            parent = mc.listRelatives(jnt, p=True, type="joint")
+        return jnt
+
+    def get_chain(self, start, end=None):
+        """
+        List the joints from the start joint down to the end joint (or down the first
+        child joints until the chain ends)
+        """
+        if end is not None:
+            chain = [end]
+            while chain[-1] != start:
+                parent = mc.listRelatives(chain[-1], p=True, type="joint")
+                if parent is None:
+                    return mc.error("{} isn't below {}".format(end, start))
+                chain.append(parent[0])
+            return chain[::-1]
+
+        chain = [start]
+        children = mc.listRelatives(start, c=True, type="joint")
+        while children is not None:
+            if len(children) > 1:
+                self.warning("{} branches, following {}".format(chain[-1], children[0]))
+            chain.append(children[0])
+            children = mc.listRelatives(children[0], c=True, type="joint")
+        return chain
+
+    def get_name(self, jnt, suffix):
+        """
+        Name an FK, IK or FKIK item after its bind joint
+        """
+        if jnt.endswith(mt.BIND):
+            jnt = jnt[:-len(mt.BIND)]
+        return "{}{}".format(jnt, suffix)
+
+    def mk_joint_chains(self, chain):
+        """
+        Duplicate the bind chain into an FK and an IK chain (joints that already exist
+        are kept)
+        """
+        chains = {}
+        for suffix in [mt.FK, mt.IK]:
+            dups = []
+            for i, jnt in enumerate(chain):
+                dup = self.get_name(jnt, suffix)
+                if not mc.objExists(dup):
+                    # Only the joint itself, its children get duplicated one by one
+                    dup = mc.duplicate(jnt, po=True, n=dup)[0]
+                    if i > 0:
+                        mc.parent(dup, dups[-1])
+                dups.append(dup)
+            chains[suffix] = dups
+        return chains[mt.FK], chains[mt.IK]
+
+    def get_switch(self, chain):
+        """
+        Get the switch attribute, creating the controller and attribute if needed
+        """
+        if self.switch is None:
+            self.switch = mc.createNode(
+                "transform", n=self.get_name(chain[0], "{}_ctrl".format(mt.FKIK)))
+        switchAttr = "{}.{}".format(self.switch, self.attr)
+        if not self.obj_exists(switchAttr):
+            self.add_attr(self.switch, self.attr, "FK IK", attrType="double")
+        return switchAttr
+
+    def get_root_outs(self, bind, fk, ik):
+        """
+        Get the matrices blended into the bind root: local matrices if all three roots
+        share a parent, world matrices otherwise
+        """
+        parents = [mc.listRelatives(jnt, p=True) for jnt in [bind, fk, ik]]
+        if parents[0] == parents[1] == parents[2]:
+            return "{}{}".format(fk, LOCAL), "{}{}".format(ik, LOCAL), None
+        return "{}{}".format(fk, mt.WM), "{}{}".format(ik, mt.WM), parents[0]
+
+    def mk_blend(self, bind, fkOut, ikOut, switchAttr, parent=None):
+        """
+        Create the blendMatrix that drives a bind joint from its FK and IK matrices
+        """
+        blend = self.get_name(bind, mt.FKIK)
+        if self.node_exists(blend):
+            # Check to make sure blendMatrix node doesn't already exist
+            return blend
+
+        self.mk_node("blendMatrix", blend)
+        self.conn(fkOut, "{}.inputMatrix".format(blend), f=True)
+        self.conn(ikOut, "{}.target[0].targetMatrix".format(blend), f=True)
+        self.conn(switchAttr, "{}.target[0].weight".format(blend))
+
+        out = "{}.outputMatrix".format(blend)
+        if parent is not None:
+            # World space blends are brought back under the bind root's parent
+            multM = self.mk_node("multMatrix", "{}_multM".format(blend))
+            self.conn(out, "{}.matrixIn[0]".format(multM))
+            self.conn("{}.worldInverseMatrix[0]".format(parent[0]),
+                      "{}.matrixIn[1]".format(multM))
+            out = "{}.matrixSum".format(multM)
+        self.conn(out, "{}{}".format(bind, OPM), f=True)
+
+        # The offsetParentMatrix now carries the whole local transform
+        self.set_attr("{}{}".format(bind, mt.POS_ATTR), 0, 0, 0)
+        self.set_attr("{}{}".format(bind, mt.ROT_ATTR), 0, 0, 0)
+        self.set_attr("{}.jointOrient".format(bind), 0, 0, 0)
+        return blend
+
+    def get_length(self, jnt):
+        """
+        Get the rest length of the bone ending at a joint
+        """
+        pos = mc.getAttr("{}{}".format(jnt, mt.POS_ATTR))[0]
+        return math.sqrt(sum([value * value for value in pos]))
+
+    def get_ctrl_attr(self, ctrl, attr, value):
+        """
+        Get a keyable attribute of the IK controller, adding it if it's missing
+        """
+        ctrlAttr = "{}.{}".format(ctrl, attr)
+        if not self.obj_exists(ctrlAttr):
+            self.add_attr(ctrl, attr, attrType="double")
+            self.set_attr(ctrlAttr, value)
+        return ctrlAttr
+
+    def mk_soft(self, name, dist, total, ctrl):
+        """
+        Ease the reach into full extension over the softness distance:
+        d > L - s becomes L - s * e^((L - s - d) / s)
+        """
+        softAttr = self.get_ctrl_attr(ctrl, SOFT_ATTR, 0.0)
+        soft = self.mk_shared_node("clamp", "{}_softDist".format(name),
+                                   {"inputR": softAttr},
+                                   {"minR": SOFT_MIN, "maxR": total})
+        soft = "{}.outputR".format(soft)
+        start = self.mk_shared_node("plusMinusAverage", "{}_softStart".format(name),
+                                    {"input1D[1]": soft},
+                                    {"operation": 2, "input1D[0]": total})
+        start = "{}.output1D".format(start)
+        over = self.mk_shared_node("plusMinusAverage", "{}_softOver".format(name),
+                                   {"input1D[0]": start, "input1D[1]": dist},
+                                   {"operation": 2})
+        ratio = self.mk_shared_node("multiplyDivide", "{}_softRatio".format(name),
+                                    {"input1X": "{}.output1D".format(over), "input2X": soft},
+                                    {"operation": 2})
+        # Short of the soft zone the exponent grows with 1 / softness and overflows, and
+        # past e^SOFT_EXP_MIN the fall is too small to matter
+        ratio = self.mk_shared_node("clamp", "{}_softRatioClamp".format(name),
+                                    {"inputR": "{}.outputX".format(ratio)},
+                                    {"minR": SOFT_EXP_MIN, "maxR": 0.0})
+        exp = self.mk_shared_node("multiplyDivide", "{}_softExp".format(name),
+                                  {"input2X": "{}.outputR".format(ratio)},
+                                  {"operation": 3, "input1X": math.e})
+        fall = self.mk_shared_node("multiplyDivide", "{}_softFall".format(name),
+                                   {"input1X": soft, "input2X": "{}.outputX".format(exp)},
+                                   {"operation": 1})
+        eased = self.mk_shared_node("plusMinusAverage", "{}_softReach".format(name),
+                                    {"input1D[1]": "{}.outputX".format(fall)},
+                                    {"operation": 2, "input1D[0]": total})
+        # Only past the start of the soft zone
+        cond = self.mk_shared_node("condition", "{}_soft".format(name),
+                                   {"firstTerm": dist, "secondTerm": start,
+                                    "colorIfTrueR": "{}.output1D".format(eased),
+                                    "colorIfFalseR": dist},
+                                   {"operation": 2})
+        return "{}.outColorR".format(cond)
+
+    def mk_stretch(self, name, dist, reach, ctrl, lengths):
+        """
+        Scale the bone lengths past full reach, blended by the stretch attribute
+        """
+        stretchAttr = self.get_ctrl_attr(ctrl, STRETCH_ATTR, 1.0)
+        ratio = self.mk_shared_node("multiplyDivide", "{}_stretchRatio".format(name),
+                                    {"input1X": dist, "input2X": reach},
+                                    {"operation": 2})
+        grow = self.mk_shared_node("clamp", "{}_stretchClamp".format(name),
+                                   {"inputR": "{}.outputX".format(ratio)},
+                                   {"minR": 1.0, "maxR": STRETCH_MAX})
+        blend = self.mk_shared_node("blendTwoAttr", "{}_stretch".format(name),
+                                    {"input[1]": "{}.outputR".format(grow),
+                                     "attributesBlender": stretchAttr},
+                                    {"input[0]": 1.0})
+        scale = "{}.output".format(blend)
+        stretched = self.mk_shared_node("multiplyDivide", "{}_stretched".format(name),
+                                        {"input1X": scale, "input1Y": scale},
+                                        {"operation": 1, "input2X": lengths[0],
+                                         "input2Y": lengths[1]})
+        return "{}.outputX".format(stretched), "{}.outputY".format(stretched)
+
+    def mk_end_orient(self, name, end, ctrl, lowerWIM, endPos):
+        """
+        Orient the end joint like the controller (relative to the bind lower joint, so
+        no inverseMatrix is needed), keeping the translation of the end position matrix
+        """
+        offsetAttr = "{}.{}".format(ctrl, OFFSET_ATTR)
+        if not self.obj_exists(offsetAttr):
+            # The rest orientation of the end joint relative to the controller
+            offset = (self.get_matrix(end, mt.WM) *
+                      self.get_matrix(ctrl, ".worldInverseMatrix[0]"))
+            self.add_attr(ctrl, OFFSET_ATTR)
+            self.set_attr(offsetAttr, *[offset[i] for i in range(16)], type="matrix")
+        local = self.mk_shared_node("multMatrix", "{}_endOrient".format(name),
+                                    {"matrixIn[0]": offsetAttr,
+                                     "matrixIn[1]": "{}{}".format(ctrl, mt.WM),
+                                     "matrixIn[2]": lowerWIM})
+        rot = self.mk_shared_node("pickMatrix", "{}_endRot".format(name),
+                                  {"inputMatrix": "{}.matrixSum".format(local)},
+                                  {"useTranslate": False})
+        out = self.mk_shared_node("multMatrix", "{}_end".format(name),
+                                  {"matrixIn[0]": "{}.outputMatrix".format(rot),
+                                   "matrixIn[1]": endPos})
+        return "{}.matrixSum".format(out)
+
+    def mk_two_bone(self, result, ctrl, pole):
+        """
+        Solve the last three joints of a chain with an analytic two-bone IK network and
+        feed the solved local matrices to their blends. Returns the output plugs
+        """
+        if len(result["bind"]) < 3:
+            return self.warning("{} needs at least three joints for a two-bone IK".format(
+                result["bind"][0]))
+        upper, lower, end = result["ik"][-3:]
+        name = self.get_name(result["bind"][-3], "{}_solve".format(mt.IK))
+        upperLen = self.get_length(lower)
+        lowerLen = self.get_length(end)
+        total = upperLen + lowerLen
+        rootWM = "{}{}".format(upper, mt.WM)
+        ctrlWM = "{}{}".format(ctrl, mt.WM)
+
+        dist = self.mk_shared_node("distanceBetween", "{}_dist".format(name),
+                                   {"inMatrix1": rootWM, "inMatrix2": ctrlWM})
+        dist = "{}.distance".format(dist)
+        reachIn = dist
+        if self.soft:
+            reachIn = self.mk_soft(name, dist, total, ctrl)
+        reach = self.mk_shared_node(
+            "clamp", "{}_reach".format(name), {"inputR": reachIn},
+            {"minR": abs(upperLen - lowerLen) * (1.0 + REACH_EPS) + REACH_EPS,
+             "maxR": total * (1.0 - REACH_EPS)})
+        reach = "{}.outputR".format(reach)
+
+        # Law of cosines: the upper bone leaves the root to controller line at an angle
+        # with cos = d / 2a + (a^2 - b^2) / 2ad, the lower bone turns from it by an angle
+        # with cos = (d cos - a) / b and sin = -d sin / b
+        terms = self.mk_shared_node(
+            "multiplyDivide", "{}_terms".format(name),
+            {"input2X": reach, "input1Y": reach, "input1Z": reach},
+            {"operation": 2,
+             "input1X": (upperLen * upperLen - lowerLen * lowerLen) / (2.0 * upperLen),
+             "input2Y": 2.0 * upperLen, "input2Z": lowerLen})
+        cosU = self.mk_shared_node("plusMinusAverage", "{}_cos".format(name),
+                                   {"input1D[0]": "{}.outputX".format(terms),
+                                    "input1D[1]": "{}.outputY".format(terms)},
+                                   {"operation": 1})
+        cosU = "{}.output1D".format(cosU)
+        cosSq = self.mk_shared_node("multiplyDivide", "{}_cosSq".format(name),
+                                    {"input1X": cosU},
+                                    {"operation": 3, "input2X": 2.0})
+        sinSq = self.mk_shared_node("plusMinusAverage", "{}_sinSq".format(name),
+                                    {"input1D[1]": "{}.outputX".format(cosSq)},
+                                    {"operation": 2, "input1D[0]": 1.0})
+        sinU = self.mk_shared_node("multiplyDivide", "{}_sin".format(name),
+                                   {"input1X": "{}.output1D".format(sinSq)},
+                                   {"operation": 3, "input2X": 0.5})
+        sinU = "{}.outputX".format(sinU)
+        scaled = self.mk_shared_node(
+            "multiplyDivide", "{}_scaled".format(name),
+            {"input1X": sinU, "input1Y": cosU, "input1Z": sinU,
+             "input2X": "{}.outputZ".format(terms), "input2Y": "{}.outputZ".format(terms)},
+            {"operation": 1, "input2Z": -1.0})
+        lowerDir = self.mk_shared_node(
+            "plusMinusAverage", "{}_lowerDir".format(name),
+            {"input3D[0].input3Dx": "{}.outputY".format(scaled),
+             "input3D[1].input3Dy": "{}.outputX".format(scaled)},
+            {"operation": 2, "input3D[1].input3Dx": upperLen / lowerLen})
+        cosL = "{}.output3Dx".format(lowerDir)
+        sinL = "{}.output3Dy".format(lowerDir)
+        negL = "{}.outputX".format(scaled)
+        negU = "{}.outputZ".format(scaled)
+
+        upperPos = upperLen
+        endPos = lowerLen
+        if self.stretch:
+            upperPos, endPos = self.mk_stretch(name, dist, reach, ctrl,
+                                               [upperLen, lowerLen])
+
+        # The upper bone is aimed with the controller's direction in its own frame as
+        # the aim axis, and the pole's as the up axis
+        upperInputs = {"inputMatrix": rootWM,
+                       "primaryTargetMatrix": ctrlWM,
+                       "secondaryTargetMatrix": "{}{}".format(pole, mt.WM),
+                       "primaryInputAxisX": cosU, "primaryInputAxisY": negU,
+                       "secondaryInputAxisX": sinU, "secondaryInputAxisY": cosU}
+        if not (result["world"] and upper == result["ik"][0]):
+            # The blend wants the upper joint's local matrix
+            upperInputs["postSpaceMatrix"] = "{}{}".format(upper, PIM)
+        upperOut = self.mk_shared_node("aimMatrix", "{}_upper".format(name), upperInputs,
+                                       {"primaryMode": 1, "secondaryMode": 1})
+        lowerInputs = {"in00": cosL, "in01": sinL, "in10": negL, "in11": cosL}
+        lowerValues = {}
+        (lowerInputs if self.stretch else lowerValues)["in30"] = upperPos
+        lowerOut = self.mk_shared_node("fourByFourMatrix", "{}_lower".format(name),
+                                       lowerInputs, lowerValues)
+        outs = ["{}.outputMatrix".format(upperOut), "{}.output".format(lowerOut),
+                "{}{}".format(end, LOCAL)]
+
+        solved = outs[:2]
+        if self.stretch or self.orient:
+            # Otherwise the IK joint's rest matrix already is the solved one
+            endInputs = {}
+            endValues = {}
+            # Without stretch it only depends on the bone length, so limbs of the same
+            # size share it
+            (endInputs if self.stretch else endValues)["in30"] = endPos
+            if not self.orient:
+                rest = mc.getAttr("{}{}".format(end, LOCAL))
+                endValues.update([("in{}{}".format(i // 4, i % 4), rest[i])
+                                  for i in range(12)])
+            endMtrx = self.mk_shared_node("fourByFourMatrix", "{}_endPos".format(name),
+                                          endInputs, endValues)
+            outs[2] = "{}.output".format(endMtrx)
+            if self.orient:
+                outs[2] = self.mk_end_orient(
+                    name, end, ctrl, "{}.worldInverseMatrix[0]".format(result["bind"][-2]),
+                    outs[2])
+            solved = outs
+
+        for out, blend in zip(solved, result["blends"][-3:]):
+            self.conn(out, "{}.target[0].targetMatrix".format(blend), f=True)
+        self.save_registry()
+        return dict(zip(["upper", "lower", "end"], outs))
+
+    def mk_fkik(self, start=None, end=None, ctrl=None, pole=None):
+        """
+        Build the FK and IK chains of a bind chain and blend them onto it, solving the
+        IK side from a controller and a pole if they're given
+        """
+        if start is None:
+            start = self.get_root()
+        chain = self.get_chain(start, end)
+
+        for jnt in chain:
+            opmAttr = "{}{}".format(jnt, OPM)
+            if self.is_connected(opmAttr):
+                # Make sure the bind joints aren't already driven
+                return self.warning("{} is already receiving an incoming connection.".format(opmAttr))
+
+        fkChain, ikChain = self.mk_joint_chains(chain)
+        switchAttr = self.get_switch(chain)
+
+        blends = []
+        world = False
+        for i, jnt in enumerate(chain):
+            parent = None
+            if i == 0:
+                fkOut, ikOut, parent = self.get_root_outs(jnt, fkChain[0], ikChain[0])
+                world = parent is not None
+            else:
+                fkOut = "{}{}".format(fkChain[i], LOCAL)
+                ikOut = "{}{}".format(ikChain[i], LOCAL)
+            blends.append(self.mk_blend(jnt, fkOut, ikOut, switchAttr, parent))
+
+        result = {"bind": chain, "fk": fkChain, "ik": ikChain, "blends": blends,
+                  "switch": switchAttr, "world": world}
+        if ctrl is not None and pole is not None:
+            result["solver"] = self.mk_two_bone(result, ctrl, pole)
+        self.chains.append(result)
+        return result
+
+    def build(self, chains):
+        """
+        Build many chains under the same switch attribute, chains are start joints or
+        (start, end) pairs, (start, end, ctrl, pole) also solves the IK side
+        """
+        # Save the registry once for all the chains (unless the caller saves it later)
+        deferSave = self.deferSave
+        self.deferSave = True
+        results = []
+        for chain in chains:
+            if not isinstance(chain, (list, tuple)):
+                chain = (chain,)
+            results.append(self.mk_fkik(*chain))
+
+        self.deferSave = deferSave
+        self.save_registry()
+        return results
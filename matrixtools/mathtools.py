@@ -0,0 +1,74 @@
+###########################################################################################
+#
+#   Title: Math Tools
+#
+#   Descritpion: The one matrix decomposition and composition every tool that works out
+#       matrix values without Maya uses (the evaltools evaluator and the headless
+#       stand-in), so they split and build matrices the same way decomposeMatrix,
+#       pickMatrix and blendMatrix do
+#
+#    Instructions: pass a matrix as rows (m[row][col], row vectors like Maya):
+#           translate, rot, scale, shear = decompose(rows)
+#           rows = compose(translate, rot, scale, shear)
+#
+#       - the elements can be plain floats (one matrix) or numpy arrays (a whole batch
+#           of matrices at once), only arithmetic is used on them so both work and
+#           numpy is never imported here
+#       - rot is a 3x3 rotation as rows, translate, scale and shear have 3 values
+#       - shear is (xy, xz, yz), the order decomposeMatrix.outputShear uses
+#
+###########################################################################################
+
+
+def dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def normalize(v):
+    """
+    Split a vector into its length and direction (a zero vector keeps a zero direction)
+    """
+    length = dot(v, v) ** 0.5
+    # Adding the comparison works for floats and arrays alike
+    safe = length + (length == 0)
+    return length, [v[0] / safe, v[1] / safe, v[2] / safe]
+
+
+def determinant(rot):
+    return (rot[0][0] * (rot[1][1] * rot[2][2] - rot[1][2] * rot[2][1]) -
+            rot[0][1] * (rot[1][0] * rot[2][2] - rot[1][2] * rot[2][0]) +
+            rot[0][2] * (rot[1][0] * rot[2][1] - rot[1][1] * rot[2][0]))
+
+
+def decompose(m):
+    """
+    Split a matrix into translate, rotation rows, scale and shear the way
+    decomposeMatrix does (scale, then shear, then rotate, then translate)
+    """
+    x, y, z = [list(m[r][:3]) for r in range(3)]
+    sx, xn = normalize(x)
+    xy = dot(xn, y)
+    sy, yn = normalize([y[i] - xy * xn[i] for i in range(3)])
+    xz = dot(xn, z)
+    yz = dot(yn, z)
+    sz, zn = normalize([z[i] - xz * xn[i] - yz * yn[i] for i in range(3)])
+
+    # A negative determinant means one axis is mirrored, carry it in the scale
+    sign = 1 - 2 * (determinant([xn, yn, zn]) < 0)
+    rot = [[v * sign for v in row] for row in [xn, yn, zn]]
+    scale = [sx * sign, sy * sign, sz * sign]
+    shear = [xy / (sy + (sy == 0)), xz / (sz + (sz == 0)), yz / (sz + (sz == 0))]
+    return list(m[3][:3]), rot, scale, shear
+
+
+def compose(translate, rot, scale, shear):
+    """
+    Build matrix rows from translate, rotation rows, scale and shear
+    """
+    # scale * shear, the lower triangle decompose() took the shear from
+    sh = [[scale[0], 0.0, 0.0],
+          [scale[1] * shear[0], scale[1], 0.0],
+          [scale[2] * shear[1], scale[2] * shear[2], scale[2]]]
+    rows = [[sh[r][0] * rot[0][c] + sh[r][1] * rot[1][c] + sh[r][2] * rot[2][c]
+             for c in range(3)] + [0.0] for r in range(3)]
+    return rows + [list(translate) + [1.0]]
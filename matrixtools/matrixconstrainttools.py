@@ -0,0 +1,1569 @@
+###########################################################################################
+#
+#   Title: Matrix Constraint Tools
+#   Version 2.1
+#   Author: Steve Addeo
+#   Created: April 15, 2020
+#   Last Updated: August 04, 2020
+#
+#   Descritpion: Utilizes Maya's matrix nodes to apply various constraint solutions that
+#       are faster and lead to less clutter in your outliner
+#
+#    Instructions: all the constraints have the option to maintain offset or not and default
+#       to the more logical option based on what you're trying to do. You can define this
+#       function when you initialize the class (mo=True) or (mo=False)
+#
+#       Constraints - Works like your typical Maya constraint nodes. Select your driver
+#           (or dirvers) object(s), initialize the Constraint class (var =
+#           Constraint(mo=True)), then run your desited constraint:
+#               - var.parent(), var.point(), var.orient(), and var.scale()
+#
+#           Add opm=True (var = Constraint(mo=True, opm=True)) to drive the driven object's
+#           offsetParentMatrix directly instead of going through a decompose matrix and a
+#           parent group (parent and point constraints only)
+#
+#           Add blendMtrx=True (var = Constraint(mo=True, blendMtrx=True)) to combine
+#           multiple drivers with a single blendMatrix node. Each driver after the first
+#           gets a weight attribute on the driven object that blends it over the ones
+#           before it (the defaults average all drivers evenly)
+#
+#       Blend Colors - works similarly to the regular constraints (maintain offset defaults
+#           to False) but allows you to control the weighting for one or two drivers. Same
+#            approach as constraint class. Initialize the BlendColor class (var =
+#            BlendColors(mo=False)), then run your command:
+#               - var.parent(), var.point(), var.orient(), and var.scale()
+#
+#           Pass a list of driven objects (var.parent(drivers, [jnt1, jnt2, ...])) to
+#           blend a whole chain between the same drivers in one call: each driver gets a
+#           single decomposeMatrix and every blendColor node is driven by one shared
+#           blend attribute (on the first driven object, or BlendColor(blender=
+#           "ctrl.ikFk") to use a controller's attribute)
+#
+#      Rivets - an alternative to using follicles, the Rivet class generates a locator or
+#           series of locators that are constrained to a nurbs surface and can act as the
+#           parent for an object you want to stick to a given surface. Simply select your
+#           nurbsSurface, initialize the Rivet class (var = Rivet()), then run your
+#           command:
+#               - var.mk_rivet(name, u=0.0, v=0.5) and you can set the u & v values
+#               - set_rivets(rivets) set a number of rivets to evenly distribute evenly
+#                   along the u values of the nurbs surface
+#                   (or evenly in world space with Rivet(arcLen=True), through a cached
+#                   arc length table of the surface's middle iso-curve)
+#               - rivet_objects(objs, surface) rivets each object at the closest point of
+#                   the surface and parents it under its rivet. The closest points all
+#                   come from one cached spatial index of the surface (spatialtools)
+#
+#           Initialize with pin=True (var = Rivet(pin=True)) to drive every rivet on a
+#           surface from a single uvPin node instead of three nodes per rivet
+#
+#       Shared nodes - offset multMatrix, decompose matrix, quatToEuler and rivet nodes
+#           are looked up by their actual inputs in a registry stored on the
+#           "matrix_registry" network node, so identical networks get reused and
+#           different ones never collide by name
+#
+#       Batches - builds many constraints at once without using the selection. Initialize
+#           the ConstraintBatch class (var = ConstraintBatch()), add your specs with
+#           var.add(drivers, driven, conType="parent", mo=True, opm=False, blendMtrx=False)
+#           and run var.build(), which returns a result for each spec:
+#               - conType can be "parent", "point", "orient", "scale" or the blendColor
+#                   versions "bcParent", "bcPoint", "bcOrient", "bcScale"
+#               - pass a buildtools.BuildPlan (ConstraintBatch(plan=BuildPlan())) to create
+#                   all the utility nodes and connections in one transaction (a spec
+#                   that maintains its offset from an object an earlier spec drives
+#                   flushes what came before it first, so the offset is measured from
+#                   where that object ends up)
+#               - pass a NodeRegistry (ConstraintBatch(registry=reg)) to share one registry
+#                   with other builders
+#
+#       Sessions - run any build inside a sessiontools.BuildSession to record it as one
+#           undo chunk with refresh and evaluation graph rebuilds suspended. Builders
+#           don't touch the selection while a session is open
+#
+#       Reconcile - rerun any build with a reconciling plan (var.plan =
+#           BuildPlan(reconcile=True), or ConstraintBatch(plan=BuildPlan(reconcile=True)))
+#           to compare the network it wants with the one in the scene and only apply the
+#           nodes, values and connections that are missing or changed. Existing rivets,
+#           rivet groups and parent groups are reused
+#
+###########################################################################################
+
+
+import hashlib
+import json
+
+import maya.cmds as mc
+
+from . import sessiontools as ss
+
+
+def omm(values):
+    """
+    Get an OpenMaya MMatrix of a matrix value. OpenMaya is only imported the first time
+    a matrix is needed, not when the tools are loaded
+    """
+    from maya.api.OpenMaya import MMatrix
+    return MMatrix(values)
+
+
+# Suffix variables
+POS = "_pos"
+ROT = "_rot"
+SCL = "_scale"
+GRP = "_grp"
+BC = "_bc"
+RIV = "_riv"
+BIND = "_bind"
+FK = "_FK"
+IK = "_IK"
+FKIK = "_FKIK"
+
+# Attribute variables
+POS_ATTR = ".translate"
+ROT_ATTR = ".rotate"
+SCL_ATTR = ".scale"
+OUT = ".output"
+MTRXIN = ".inputMatrix"
+WM = ".worldMatrix[0]"
+NML = ".normal"
+TANU = ".tangentU"
+TANV = ".tangentV"
+VECTORS = ["X", "Y", "Z"]
+ROTATE_ORDERS = ["xyz", "yzx", "zxy", "xzy", "yxz", "zyx"]
+# Decompose output and driven attribute of each blendColor channel
+BC_CHANNELS = {POS: (".outputTranslate", POS_ATTR),
+               ROT: (".outputRotate", ROT_ATTR),
+               SCL: (".outputScale", SCL_ATTR)}
+BLENDER_ATTR = "blend"
+
+# Scene node that stores the shared node registry
+REGISTRY = "matrix_registry"
+REGISTRY_ATTR = ".entries"
+
+
+class NodeRegistry:
+    """
+    Scene-persistent table of utility nodes keyed by their actual inputs, so identical
+    networks get shared and different ones never collide by name
+    """
+
+    def __init__(self, reconcile=False):
+        self.entries = {}
+        self.existing = {}
+        self.owners = {}
+        self.existingOwners = {}
+        self.dirty = False
+        self.load()
+        if reconcile:
+            # Shared nodes get recorded again and matched with the scene's ones by key
+            self.existing = self.entries
+            self.entries = {}
+            self.existingOwners = self.owners
+            self.owners = {}
+
+    def load(self):
+        """
+        Read the registry from the scene and drop entries whose nodes were deleted
+        """
+        self.entries = {}
+        self.owners = {}
+        if not mc.objExists(REGISTRY):
+            return self.entries
+
+        entries = json.loads(mc.getAttr("{}{}".format(REGISTRY, REGISTRY_ATTR)) or "{}")
+        owners = {}
+        if "owners" in entries:
+            # Registries saved before nodes had owners are only the table of entries
+            owners = entries["owners"]
+            entries = entries["entries"]
+        names = set(entries.values())
+        for nodes in owners.values():
+            names.update(nodes)
+        if names:
+            # One ls call validates every node in the registry
+            found = set(mc.ls(list(names)) or [])
+            for key, node in entries.items():
+                if node in found:
+                    self.entries[key] = node
+            for owner, nodes in owners.items():
+                self.owners[owner] = [node for node in nodes if node in found]
+        return self.entries
+
+    def save(self):
+        """
+        Write the registry to the scene if it changed
+        """
+        if not self.dirty:
+            return
+        if not mc.objExists(REGISTRY):
+            mc.createNode("network", n=REGISTRY)
+            mc.addAttr(REGISTRY, ln=REGISTRY_ATTR[1:], dt="string")
+        mc.setAttr("{}{}".format(REGISTRY, REGISTRY_ATTR),
+                   json.dumps({"entries": self.entries, "owners": self.owners},
+                              sort_keys=True), type="string")
+        self.dirty = False
+
+    def get_key(self, nodeType, inputs, values=None):
+        """
+        Hash a node type with its incoming plugs and constant values
+        """
+        items = [nodeType]
+        for attr in sorted(inputs):
+            items.append("{}<{}".format(attr, inputs[attr]))
+        values = values or {}
+        for attr in sorted(values):
+            value = values[attr]
+            if isinstance(value, (list, tuple)):
+                value = ",".join(["{:.6f}".format(v) for v in value])
+            elif isinstance(value, float):
+                value = "{:.6f}".format(value)
+            items.append("{}={}".format(attr, value))
+        return hashlib.md5("|".join(items).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Get the node registered for a key (or None)
+        """
+        return self.entries.get(key)
+
+    def add(self, key, node):
+        """
+        Register a node
+        """
+        self.entries[key] = node
+        self.dirty = True
+
+    def own(self, owner, nodes):
+        """
+        Record the utility nodes built for an object (its owner), so a reconcile of the
+        object knows which nodes it may delete
+        """
+        owned = self.owners.get(owner, [])
+        nodes = [node for node in nodes if node not in owned]
+        if nodes:
+            self.owners[owner] = owned + nodes
+            self.dirty = True
+
+    def get_owned(self, owner):
+        """
+        Get the nodes recorded for an object before a reconcile started
+        """
+        return self.existingOwners.get(owner, [])
+
+    def discard(self, nodes):
+        """
+        Drop every entry pointing at one of the given nodes
+        """
+        for key, node in list(self.entries.items()):
+            if node in nodes:
+                del self.entries[key]
+                self.dirty = True
+        for owner, owned in list(self.owners.items()):
+            if [node for node in owned if node in nodes]:
+                self.owners[owner] = [node for node in owned if node not in nodes]
+                self.dirty = True
+
+    def rename(self, names):
+        """
+        Swap planned node names for the names they received once a build plan is
+        flushed
+        """
+        for key, node in self.entries.items():
+            self.entries[key] = names.get(node, node)
+        for owner, nodes in self.owners.items():
+            self.owners[owner] = [names.get(node, node) for node in nodes]
+
+    def flushed(self, names):
+        """
+        Rename the planned nodes once a build plan is flushed, then save
+        """
+        self.rename(names)
+        if self.existing or self.existingOwners:
+            # Keep the scene's entries the build didn't touch
+            entries = dict(self.existing)
+            entries.update(self.entries)
+            self.entries = entries
+            owners = dict(self.existingOwners)
+            owners.update(self.owners)
+            self.owners = owners
+            self.existing = {}
+            self.existingOwners = {}
+        self.save()
+
+
+class Matrix:
+    def __init__(self, mo):
+        self.mo = mo
+        self.drivers = []
+        self.driven = []
+        self.driverOuts = {}
+        self.warnings = []
+        self.batch = None
+        self.plan = None
+        self.registry = None
+        self.deferSave = False
+        self.owner = None
+        self.owned = []
+
+    def get_driver_driven(self, drivers=None, driven=None):
+        """
+        Create parent groups and returns a list of your diven object
+        as well as your driver (pass drivers and driven to skip the selection)
+        """
+        self.owned = []
+        if driven is not None:
+            self.set_driver_driven(drivers, driven)
+            self.owner = self.driven[0]
+            return self.drivers, self.driven[0]
+
+        objs = mc.ls(sl=True)
+
+        if not len(objs) >= 2 and len(self.driven) == 0:
+            # Check to make sure at least two objects are selected
+            return mc.error("Please select your driver objects and a driven object")
+
+        driversChk = set(self.drivers)
+        drivenChk = set(self.driven)
+
+        for i, obj in enumerate(objs, 1):
+            # Sort each selected object so the last object selected is the driven object
+            if not mc.objectType(obj) == "transform":
+                pass
+
+            if i == len(objs) and len(self.driven) == 0:
+                # If the driven list is empty, put the last object selected in that list
+                self.driven.append(obj)
+                drivenChk.add(obj)
+            elif obj not in driversChk and obj not in drivenChk:
+                # If the object isn't already part of the drivers list, put it there
+                self.drivers.append(obj)
+                driversChk.add(obj)
+
+        self.owner = self.driven[0]
+        return self.drivers, self.driven[0]
+
+    def set_driver_driven(self, drivers, driven):
+        """
+        Explicitly define your driver objects and driven object without relying
+        on the current selection
+        """
+        if not isinstance(drivers, (list, tuple)):
+            drivers = [drivers]
+
+        self.driverOuts = {}
+        self.drivers = []
+        for driver in drivers:
+            # Skip duplicates and the driven object itself
+            if driver != driven and driver not in self.drivers:
+                self.drivers.append(driver)
+        self.driven = [driven]
+
+        return self.drivers, self.driven[0]
+
+    def is_reconcile(self):
+        """
+        Check if the build is recorded in a reconciling plan
+        """
+        return self.plan is not None and self.plan.reconcile
+
+    def node_exists(self, node):
+        """
+        Check if a utility node exists. A reconcile records the whole network again, so
+        only nodes it already recorded count
+        """
+        if self.is_reconcile():
+            return self.plan.has(node)
+        return self.obj_exists(node)
+
+    def obj_exists(self, obj):
+        """
+        Check if an object exists, using the batch's lookup table when one is active
+        """
+        if self.plan is not None and self.plan.has(obj):
+            return True
+        if self.batch is None:
+            return mc.objExists(obj)
+        return self.batch.obj_exists(obj)
+
+    def is_connected(self, attr):
+        """
+        Check if an attribute is receiving an incoming connection (or will be once the
+        build plan is flushed)
+        """
+        if self.plan is not None:
+            if self.plan.is_connected(attr):
+                return True
+            if self.plan.reconcile or self.plan.has(attr.split(".")[0]):
+                # Node only exists in the plan so it can't have scene connections (and a
+                # reconcile replaces them anyway)
+                return False
+        return mc.connectionInfo(attr, id=1)
+
+    def get_matrix(self, obj, attr):
+        """
+        Get a matrix attribute value, shared across a batch for driver objects
+        """
+        if self.batch is None:
+            return omm(mc.getAttr("{}{}".format(obj, attr)))
+        return self.batch.get_matrix(obj, attr)
+
+    def mk_node(self, nodeType, name, utility=True):
+        """
+        Create a utility node (or a regular node) and register it with the active batch
+        """
+        if self.plan is not None and nodeType != "transform":
+            # Transforms get parented and matched right away so they're never deferred
+            node = self.plan.mk_node(nodeType, name)
+        elif utility:
+            node = mc.shadingNode(nodeType, asUtility=True, n=name)
+        else:
+            node = mc.createNode(nodeType, n=name)
+        if self.batch is not None:
+            self.batch.add_node(node)
+        if self.owner is not None and nodeType != "transform":
+            self.owned.append(node)
+        return node
+
+    def add_attr(self, node, longName, niceName=None, attrType="matrix"):
+        """
+        Add a dynamic attribute to a node (or record it in the build plan)
+        """
+        attr = "{}.{}".format(node, longName)
+        if self.plan is not None:
+            self.plan.add_attr(node, longName, attrType, niceName)
+        elif attrType == "matrix":
+            mc.addAttr(node, ln=longName, nn=niceName or longName, at=attrType)
+        else:
+            mc.addAttr(node, ln=longName, nn=niceName or longName, at=attrType, k=True)
+        if self.batch is not None:
+            self.batch.exists.add(attr)
+        return attr
+
+    def set_attr(self, attr, *values, **kwargs):
+        """
+        Set an attribute value (or record it in the build plan)
+        """
+        if self.plan is None:
+            return mc.setAttr(attr, *values, **kwargs)
+        value = values[0] if len(values) == 1 else list(values)
+        self.plan.set_attr(attr, value, kwargs.get("type"))
+
+    def conn(self, src, dst, f=False):
+        """
+        Connect two attributes (or record the connection in the build plan)
+        """
+        if self.plan is None:
+            return mc.connectAttr(src, dst, f=f)
+        self.plan.connect(src, dst, f)
+
+    def get_registry(self):
+        """
+        Get the shared node registry (one per batch, otherwise one per operation)
+        """
+        if self.batch is not None:
+            return self.batch.registry
+        if self.registry is None:
+            self.registry = NodeRegistry(self.is_reconcile())
+        return self.registry
+
+    def own_nodes(self):
+        """
+        Record the utility nodes the operation built or reused under its driven object.
+        A reconcile of the object may delete the ones an earlier build of it made
+        """
+        if self.owner is None:
+            return
+        registry = self.get_registry()
+        registry.own(self.owner, self.owned)
+        if self.is_reconcile():
+            self.plan.own(registry.get_owned(self.owner))
+        self.owner = None
+        self.owned = []
+
+    def save_registry(self):
+        """
+        Store the registry on the scene once an operation is done
+        """
+        self.own_nodes()
+        if self.registry is None or self.batch is not None or self.deferSave:
+            return
+        if self.plan is not None:
+            # Saved once the plan is flushed and nodes have their final names
+            if self.registry.flushed not in self.plan.callbacks:
+                self.plan.callbacks.append(self.registry.flushed)
+        else:
+            self.registry.save()
+        self.registry = None
+
+    def mk_shared_node(self, nodeType, name, inputs, values=None):
+        """
+        Get the node of this type that's fed by exactly these inputs and values, only
+        creating (and registering) it if no identical node exists yet
+        """
+        registry = self.get_registry()
+        key = registry.get_key(nodeType, inputs, values)
+        node = registry.get(key)
+        if node is not None:
+            if self.owner is not None:
+                self.owned.append(node)
+            return node
+
+        node = self.mk_node(nodeType, name)
+        if self.is_reconcile() and registry.existing.get(key):
+            # Let the reconcile reuse the scene node with these exact inputs
+            self.plan.match(node, registry.existing[key])
+        for attr in sorted(inputs):
+            self.conn(inputs[attr], "{}.{}".format(node, attr), f=True)
+        values = values or {}
+        for attr in sorted(values):
+            self.set_attr("{}.{}".format(node, attr), values[attr])
+        registry.add(key, node)
+
+        return node
+
+    def select(self, *objs):
+        """
+        Select objects for the user (skipped while a build session is open)
+        """
+        if ss.get_session() is None:
+            mc.select(*objs, r=True)
+
+    def mk_joint(self, name, parent=None, radius=1.0, ro="xyz"):
+        """
+        Create a joint. Outside a build session mc.joint puts it under the selected joint,
+        inside one it goes under parent (or the world) without touching the selection
+        """
+        if ss.get_session() is None:
+            return mc.joint(n=name, rad=radius, roo=ro)
+        flags = {"n": name, "ss": True}
+        if parent:
+            # cmds rejects a flag given None
+            flags["p"] = parent
+        jnt = mc.createNode("joint", **flags)
+        mc.setAttr("{}.radius".format(jnt), radius)
+        mc.setAttr("{}.rotateOrder".format(jnt), ROTATE_ORDERS.index(ro))
+        return jnt
+
+    def warning(self, msg):
+        """
+        Store a warning and notify the user (batches report them per item instead)
+        """
+        self.warnings.append(msg)
+        if self.batch is None:
+            mc.warning(msg)
+
+    def mk_parent_grp(self, obj):
+        """
+        Create a parent_grp and transfer objects transform attributes
+        """
+        parent = mc.listRelatives(obj, p=True)
+        grp = self.mk_node("transform", "{}{}".format(obj, GRP), utility=False)
+        mc.matchTransform(grp, obj)
+        if parent is not None:
+            mc.parent(grp, parent[0])
+        mc.parent(obj, grp)
+        return grp
+
+    def set_offset(self):
+        """
+        Create a multMatrix that calculates the offset of the driven object to preserve
+        its transformation attributes
+        """
+        multMList = []
+        for driver in self.drivers:
+            offsetList = []
+            offsetAttr = "{}{}.{}Offset".format(self.driven[0], GRP, driver)
+            drivenGrpWIM = "{}{}.worldInverseMatrix".format(
+                self.driven[0], GRP)
+            dOut = "{}{}".format(driver, WM)
+
+            # Keep figuring out mult matrix setup
+            if not self.obj_exists(offsetAttr):
+                self.add_attr("{}{}".format(self.driven[0], GRP), "{}Offset".format(
+                    driver), "{} Offset".format(driver))
+            # get the offset matrix value
+            drivenWM = omm(mc.getAttr("{}{}".format(self.driven[0], WM)))
+            driverWIM = self.get_matrix(driver, ".worldInverseMatrix")
+            # define the offset tramsformation (driven.worldMatrix * driver.inverseMatrix)
+            # so that offset * driver.worldMatrix gives back the driven's world matrix
+            offsetM = drivenWM * driverWIM
+            # set offset matrix value
+            for item in offsetM:
+                offsetList.append(item)
+            self.set_attr(offsetAttr, *offsetList, type="matrix")
+
+            # Create (or reuse) the multMatrix node fed by this offset, driver and group
+            multM = self.mk_shared_node(
+                "multMatrix", "{}_{}_multM".format(driver, self.driven[0]),
+                {"matrixIn[0]": offsetAttr, "matrixIn[1]": dOut, "matrixIn[2]": drivenGrpWIM})
+            self.driverOuts[driver] = "{}.matrixSum".format(multM)
+
+            multMList.append(multM)
+
+        return multMList
+
+    def mk_decomposition(self, obj, mtrx):
+        """
+        Create a decompose matrix for a matrix attribute that will directly drive the
+        driven object (any existing decompose of the same attribute is reused)
+        """
+        return self.mk_shared_node(
+            "decomposeMatrix", "{}_decM".format(obj), {MTRXIN[1:]: mtrx})
+
+
+class Constraint(Matrix):
+    def __init__(self, mo, opm=False, blendMtrx=False):
+        Matrix.__init__(self, mo)
+        self.opm = opm
+        self.blendMtrx = blendMtrx
+
+    def get_driver_out(self, driver):
+        """
+        Get the matrix attribute a driver feeds into the constraint network
+        """
+        if driver in self.driverOuts:
+            # If offset is maintained, driver will need to pass through a multMatrix node first
+            return self.driverOuts[driver]
+        return "{}{}".format(driver, WM)
+
+    def get_combine_out(self, mtrxType, addMtrx):
+        """
+        Get the output attribute of the node combining your drivers
+        """
+        if mtrxType == "switch":
+            return "{}{}".format(addMtrx, OUT)
+        if self.blendMtrx is True:
+            return "{}.outputMatrix".format(addMtrx)
+        return "{}.matrixSum".format(addMtrx)
+
+    def mk_blend(self, dst):
+        """
+        Create a wtAddMatrix node to combine matrix values of all your driver objects
+        that can either be averaged together or create a blend
+        """
+        blend = "{}_blend".format(self.driven[0])
+        if self.node_exists(blend):
+            # Check to make sure wtAddMatrix (blend) node doesn't already exist
+            return blend
+
+        # Create a wtAddMatrix (blend) node
+        self.mk_node("wtAddMatrix", blend)
+
+        for i, driver in enumerate(self.drivers):
+            # Connect each driver to the wtAddMatrix node
+            dOut = self.get_driver_out(driver)
+            self.conn(
+                dOut, "{}.wtMatrix[{}].matrixIn".format(blend, i), f=True)
+
+        if dst is not None:
+            # Connct your blended matrix values to the decompose matrix node
+            self.conn("{}.matrixSum".format(blend), dst, f=True)
+
+        return blend
+
+    def mk_switch(self, dst):
+        """
+        Create a choice node to combine matrix values of all your driver objects that
+        will be switched between
+        """
+        switch = "{}_switch".format(self.driven[0])
+        if self.node_exists(switch):
+            # Check to make sure choice (switch) node doesn't already exist
+            return switch
+
+        # Create a choice (switch) node
+        self.mk_node("choice", switch)
+
+        for i, driver in enumerate(self.drivers):
+            dOut = self.get_driver_out(driver)
+            self.conn(dOut, "{}.input[{}]".format(switch, i), f=True)
+
+        if dst is not None:
+            # Connct your switch to the decompose matrix node
+            self.conn("{}{}".format(switch, OUT), dst, f=True)
+
+        return switch
+
+    def mk_blend_mtrx(self, dst, attrs):
+        """
+        Create a single blendMatrix node that layers each driver object over the ones
+        before it, weighted by an attribute per driver on the driven object
+        """
+        driven = self.driven[0]
+        blend = "{}_blendMtrx".format(driven)
+        if self.node_exists(blend):
+            # Check to make sure blendMatrix node doesn't already exist
+            return blend
+
+        self.mk_node("blendMatrix", blend)
+        # The first driver is the base every other driver blends over
+        self.conn(self.get_driver_out(self.drivers[0]),
+                  "{}.inputMatrix".format(blend), f=True)
+
+        for i, driver in enumerate(self.drivers[1:]):
+            target = "{}.target[{}]".format(blend, i)
+            wtAttr = "{}.{}Weight".format(driven, driver)
+            if not self.obj_exists(wtAttr):
+                self.add_attr(driven, "{}Weight".format(driver),
+                              "{} Weight".format(driver), attrType="double")
+            # Layered weights of 1/2, 1/3, 1/4... average every driver evenly
+            self.set_attr(wtAttr, 1.0 / (i + 2))
+
+            self.conn(self.get_driver_out(driver),
+                      "{}.targetMatrix".format(target), f=True)
+            self.conn(wtAttr, "{}.weight".format(target))
+
+            # Only blend the channels the constraint drives (scale and shear are never
+            # averaged so there's nothing to shear)
+            self.set_attr("{}.translateWeight".format(target), int(POS in attrs))
+            self.set_attr("{}.rotateWeight".format(target), int(ROT in attrs))
+            self.set_attr("{}.scaleWeight".format(target), 0)
+            self.set_attr("{}.shearWeight".format(target), 0)
+
+        if dst is not None:
+            self.conn("{}.outputMatrix".format(blend), dst, f=True)
+
+        return blend
+
+    def mk_combine(self, mtrxType, dst, attrs):
+        """
+        Combine the matrices of all your driver objects with the requested node type
+        """
+        if mtrxType == "switch":
+            return self.mk_switch(dst)
+        if self.blendMtrx is True:
+            return self.mk_blend_mtrx(dst, attrs)
+        return self.mk_blend(dst)
+
+    def set_avg_blend(self, blender):
+        """
+        Create a value for evenly applying weighting for each driver object
+        """
+        if not len(self.drivers) > 1 or self.blendMtrx is True:
+            # blendMatrix nodes carry their own weights
+            return
+
+        val = "{}_wtVal".format(self.driven[0])
+        if self.node_exists(val):
+            # Check to make sure object exists
+            return val
+
+        # Create a multiply node to generate a blend value
+        self.mk_node("multDoubleLinear", val)
+        # Set the first value to 1/(number of drivers)
+        self.set_attr("{}.input1".format(val), 1.0 / len(self.drivers))
+        # Set the second valuse to 1 (so dissapointing Maya doesn't have a simple value node)
+        self.set_attr("{}.input2".format(val), 1)
+
+        for i, driver in enumerate(self.drivers):
+            self.conn("{}{}".format(val, OUT),
+                      "{}.wtMatrix[{}].weightIn".format(blender, i))
+
+        return val
+
+    def set_opm_offset(self, driver, drivenWM, parent):
+        """
+        Create a multMatrix that brings a driver into the driven object's parent space,
+        folding in the offset when it's maintained
+        """
+        driven = self.driven[0]
+        if self.mo is False and parent is None:
+            # World space drivers can feed the offsetParentMatrix as they are
+            return "{}{}".format(driver, WM)
+
+        inputs = []
+        if self.mo is True:
+            offsetAttr = "{}.{}Offset".format(driven, driver)
+            if not self.obj_exists(offsetAttr):
+                self.add_attr(driven, "{}Offset".format(driver),
+                              "{} Offset".format(driver))
+            # define the offset tramsformation (driven.worldMatrix * driver.inverseMatrix)
+            offsetM = drivenWM * self.get_matrix(driver, ".worldInverseMatrix")
+            self.set_attr(offsetAttr, *list(offsetM), type="matrix")
+            inputs.append(offsetAttr)
+
+        inputs.append("{}{}".format(driver, WM))
+        if parent is not None:
+            # The parent's inverse replaces the parent group used by the decompose network
+            inputs.append("{}.worldInverseMatrix[0]".format(parent))
+
+        # Objects sharing a parent and following a driver without an offset share a node
+        multM = self.mk_shared_node(
+            "multMatrix", "{}_{}_multM".format(driver, driven),
+            dict([("matrixIn[{}]".format(i), plug) for i, plug in enumerate(inputs)]))
+        self.driverOuts[driver] = "{}.matrixSum".format(multM)
+
+        return self.driverOuts[driver]
+
+    def set_opm_constraint(self, mtrxType, attrs):
+        """
+        Create a Matrix Constraint network that drives the offsetParentMatrix of your
+        driven object directly (no decompose, quatToEuler or parent group)
+        """
+        driven = self.driven[0]
+        opmAttr = "{}.offsetParentMatrix".format(driven)
+        chanAttrs = {POS: POS_ATTR, ROT: ROT_ATTR, SCL: SCL_ATTR}
+
+        for drivenAttr in [opmAttr] + ["{}{}".format(driven, chanAttrs[a]) for a in attrs]:
+            if self.is_connected(drivenAttr):
+                # Make sure driven object isn't already receiving a connection
+                return self.warning("{} is already receiving an incoming connection.".format(drivenAttr))
+
+        parent = mc.listRelatives(driven, p=True)
+        parent = parent[0] if parent is not None else None
+        drivenWM = omm(mc.getAttr("{}{}".format(driven, WM)))
+
+        dOuts = []
+        for driver in self.drivers:
+            dOuts.append(self.set_opm_offset(driver, drivenWM, parent))
+
+        # Filter out the channels the constraint doesn't drive
+        pick = self.mk_node("pickMatrix", "{}_pick".format(driven))
+        self.set_attr("{}.useScale".format(pick), 0)
+        self.set_attr("{}.useShear".format(pick), 0)
+        if ROT not in attrs:
+            self.set_attr("{}.useRotate".format(pick), 0)
+        self.conn("{}.outputMatrix".format(pick), opmAttr)
+
+        addMtrx = None
+        if len(self.drivers) > 1:
+            addMtrx = self.mk_combine(mtrxType, "{}.inputMatrix".format(pick), attrs)
+        else:
+            self.conn(dOuts[0], "{}.inputMatrix".format(pick), f=True)
+
+        for attr in attrs:
+            # The driven channels now live in the offsetParentMatrix so they're zeroed out
+            self.set_attr("{}{}".format(driven, chanAttrs[attr]), 0, 0, 0)
+            if attr == ROT and mc.objectType(driven) == "joint":
+                self.set_attr("{}.jointOrient".format(driven), 0, 0, 0)
+
+        return addMtrx
+
+    def set_constraint(self, mtrxType, attrs, drivers=None, driven=None):
+        """
+        Create your Matrix Constraint network
+        """
+        self.get_driver_driven(drivers, driven)
+
+        # An offsetParentMatrix is applied after the driven object's own transforms so
+        # only constraints that drive translation can live there (orient and scale
+        # constraints keep the decompose network)
+        if self.opm is True and POS in attrs and SCL not in attrs:
+            return self.set_opm_constraint(mtrxType, attrs)
+
+        if self.mo is True:
+            grp = "{}{}".format(self.driven[0], GRP)
+            parent = mc.listRelatives(self.driven[0], p=True)
+            if parent is None or parent[0] != grp:
+                # Check to see if your driven object has a parent group and, if not, give it one
+                self.mk_parent_grp(self.driven[0])
+            self.set_offset()
+
+        if len(self.drivers) > 1:
+            # If more than one driver is needed, we'll have to combine their world matrices
+            addMtrx = self.mk_combine(mtrxType, None, attrs)
+            dOut = self.get_combine_out(mtrxType, addMtrx)
+        else:
+            # Single driver setups can connect directly to the decompose matrix node
+            dOut = self.get_driver_out(self.drivers[0])
+        dec = self.mk_decomposition(self.driven[0], dOut)
+
+        for attr in attrs:
+            # Connect specified attributes to your driven object
+            if attr == POS:
+                mtrxAttr = "{}.outputTranslate".format(dec)
+                drivenAttr = "{}{}".format(self.driven[0], POS_ATTR)
+            if attr == ROT:
+                # We first need to make a quatToEuler node to match rotational ordera
+                ro = mc.getAttr("{}.rotateOrder".format(self.driven[0]))
+                q2e = self.mk_shared_node(
+                    "quatToEuler", "{}_q2e".format(self.driven[0]),
+                    {"inputQuat": "{}.outputQuat".format(dec)}, {"inputRotateOrder": ro})
+                mtrxAttr = "{}.outputRotate".format(q2e)
+                drivenAttr = "{}{}".format(self.driven[0], ROT_ATTR)
+            if attr == SCL:
+                mtrxAttr = "{}.outputScale".format(dec)
+                drivenAttr = "{}{}".format(self.driven[0], SCL_ATTR)
+
+            if not self.is_connected(drivenAttr):
+                # Make sure driven object isn't already receiving a connection...
+                self.conn(mtrxAttr, drivenAttr)
+            else:
+                # ... or notify the user if it does
+                return self.warning("{} is already receiving an incoming connection.".format(drivenAttr))
+
+        if len(self.drivers) > 1:
+            return addMtrx
+
+    def parent(self, drivers=None, driven=None):
+        """
+        Create a matrix Parent Constraint
+        """
+        const = self.set_constraint("blend", [POS, ROT], drivers, driven)
+        self.set_avg_blend(const)
+        self.save_registry()
+        return const
+
+    def point(self, drivers=None, driven=None):
+        """
+        Create a matrix Point Constraint
+        """
+        const = self.set_constraint("blend", [POS], drivers, driven)
+        self.set_avg_blend(const)
+        self.save_registry()
+        return const
+
+    def orient(self, drivers=None, driven=None):
+        """
+        Create a matrix Orient Constraint
+        """
+        const = self.set_constraint("blend", [ROT], drivers, driven)
+        self.set_avg_blend(const)
+        self.save_registry()
+        return const
+
+    def scale(self, drivers=None, driven=None):
+        """
+        Create a matrix Scale Constraint
+        """
+        self.get_driver_driven(drivers, driven)
+        if len(self.drivers) >= 2:
+            return self.warning("driven objects can only be scale constrained to one driver")
+        const = self.set_constraint("blend", [SCL], drivers, driven)
+        self.set_avg_blend(const)
+        self.save_registry()
+        return const
+
+
+class BlendColor(Matrix):
+    def __init__(self, blender=None):
+        Matrix.__init__(self, mo=False)
+        self.blender = blender
+        self.channels = {}
+
+    def mk_bc(self, attr):
+        """
+        Create a blendColor node for each attr driving the driven object
+        """
+        bc = "{}{}{}".format(self.driven[0], attr, BC)
+
+        if not self.node_exists(bc):
+            # Check to make sure blendColor node doesn't exist
+            self.mk_node("blendColors", bc, utility=False)
+
+        self.set_attr(bc + ".color1", 0, 0, 0)
+        self.set_attr(bc + ".color2", 0, 0, 0)
+        # Remember what the node blends instead of reading it back from its name
+        self.channels[bc] = (attr, self.driven[0])
+
+        return bc
+
+    def get_blender(self):
+        """
+        Get the attribute driving the blender of every blendColor node, adding it (to
+        the first driven object if no node was given) when it's missing
+        """
+        if self.blender is None:
+            self.blender = self.driven[0]
+        if "." not in self.blender:
+            self.blender = "{}.{}".format(self.blender, BLENDER_ATTR)
+        if not self.obj_exists(self.blender):
+            node, attr = self.blender.split(".", 1)
+            self.add_attr(node, attr, attrType="double")
+            # Same default as the blender of a blendColor node
+            self.set_attr(self.blender, 0.5)
+        return self.blender
+
+    def conn_matrix(self, mtrx, bc):
+        """
+        Connect the decompose matrix node to blendColor inputs
+        """
+        mAttr = BC_CHANNELS[self.channels[bc][0]][0]
+        for i, m in enumerate(mtrx, 1):
+            # For each decomposeMatrix node, connect to blendColor node
+            self.conn("{}{}".format(m, mAttr),
+                      "{}.color{}".format(bc, i))
+
+    def conn_bc(self, bc):
+        """
+        Connect the blendColor node to the driven attribute (and to the shared blender)
+        """
+        attr, driven = self.channels[bc]
+        self.conn("{}{}".format(bc, OUT),
+                  "{}{}".format(driven, BC_CHANNELS[attr][1]))
+        if self.blender is not None:
+            self.conn(self.blender, "{}.blender".format(bc), f=True)
+
+    def mk_bcs(self, attrs, mtrxList):
+        """
+        Create and connect the blendColor nodes of the driven object
+        """
+        bcList = []
+        for attr in attrs:
+            # Create a blendColor node for each attribute you want to drive
+            bcList.append(self.mk_bc(attr))
+
+        for bc in bcList:
+            # Connect decomposeMatrix nodes to driven object through blendColor node
+            self.conn_matrix(mtrxList, bc)
+            self.conn_bc(bc)
+        return bcList
+
+    def set_constraint(self, attrs, drivers=None, driven=None):
+        """
+        Create a matrix constraint setup using blendColor nodes (a list of driven
+        objects blends all of them between the same drivers)
+        """
+        if isinstance(driven, (list, tuple)):
+            return self.set_multi_constraint(attrs, drivers, driven)
+
+        mtrxList = []
+
+        self.get_driver_driven(drivers, driven)
+        if len(self.drivers) > 2:
+            # Check to make sure there aren't more than two drivers
+            return self.warning("blendColor constraints can't have mroe than two drivers")
+
+        for driver in self.drivers:
+            # Create (or reuse) a decomposeMatrix node for each driver
+            dec = self.mk_decomposition(driver, "{}{}".format(driver, WM))
+            mtrxList.append(dec)
+
+        if self.blender is not None:
+            self.get_blender()
+        bcList = self.mk_bcs(attrs, mtrxList)
+
+        self.save_registry()
+        return bcList
+
+    def set_multi_constraint(self, attrs, drivers, drivens):
+        """
+        Blend many driven objects between the same drivers, sharing one decomposeMatrix
+        per driver and one blender attribute
+        """
+        if drivers is None:
+            drivers = mc.ls(sl=True)
+        if not isinstance(drivers, (list, tuple)):
+            drivers = [drivers]
+        if len(drivens) == 0:
+            return self.warning("No driven objects to blend")
+        if len(drivers) > 2:
+            return self.warning("blendColor constraints can't have mroe than two drivers")
+        for driven in drivens:
+            if driven in drivers:
+                return self.warning("{} can't drive itself".format(driven))
+
+        self.set_driver_driven(drivers, drivens[0])
+        mtrxList = [self.mk_decomposition(driver, "{}{}".format(driver, WM))
+                    for driver in self.drivers]
+        self.get_blender()
+
+        bcList = []
+        for driven in drivens:
+            self.driven = [driven]
+            bcList.extend(self.mk_bcs(attrs, mtrxList))
+
+        self.save_registry()
+        return bcList
+
+    def parent(self, drivers=None, driven=None):
+        """
+        Create a matrix-based blendColor Parent Constraint
+        """
+        bcs = self.set_constraint([POS, ROT], drivers, driven)
+        return bcs
+
+    def point(self, drivers=None, driven=None):
+        """
+        Create a matrix-based blendColor Point Constraint
+        """
+        bcs = self.set_constraint([POS], drivers, driven)
+        return bcs
+
+    def orient(self, drivers=None, driven=None):
+        """
+        Create a matrix-based blendColor Orient Constraint
+        """
+        bcs = self.set_constraint([ROT], drivers, driven)
+        return bcs
+
+    def scale(self, drivers=None, driven=None):
+        """
+        Create a matrix-based blendColor Scale Constraint
+        """
+        bcs = self.set_constraint([SCL], drivers, driven)
+        return bcs
+
+
+class ConstraintBatch:
+    """
+    Build many constraints from explicit specs in a single pass without touching the
+    selection. Existence checks and driver matrices are shared across the whole batch
+    and every spec reports its own result instead of aborting the build
+    """
+
+    def __init__(self, specs=None, plan=None, registry=None):
+        self.plan = plan
+        self.specs = []
+        self.results = []
+        self.exists = set()
+        self.missing = set()
+        self.matrices = {}
+        self.created = []
+        self.builders = {}
+        self.registry = registry
+
+        for spec in specs or []:
+            self.add(*spec)
+
+    def add(self, drivers, driven, conType="parent", mo=True, opm=False, blendMtrx=False):
+        """
+        Add a (drivers, driven, conType, mo, opm, blendMtrx) spec to the batch
+        """
+        if not isinstance(drivers, (list, tuple)):
+            drivers = [drivers]
+        self.specs.append((list(drivers), driven, conType, mo, opm, blendMtrx))
+
+    def add_node(self, node):
+        """
+        Register a node created while the batch is building
+        """
+        self.exists.add(node)
+        self.missing.discard(node)
+        self.created.append(node)
+
+    def obj_exists(self, obj):
+        """
+        Check an object against the batch lookup tables, querying Maya only once per name
+        """
+        if obj in self.exists:
+            return True
+        if obj in self.missing:
+            return False
+        if mc.objExists(obj):
+            self.exists.add(obj)
+            return True
+        self.missing.add(obj)
+        return False
+
+    def get_matrix(self, obj, attr):
+        """
+        Get a matrix attribute value once per object for the whole batch
+        """
+        key = "{}{}".format(obj, attr)
+        if key not in self.matrices:
+            self.matrices[key] = omm(mc.getAttr(key))
+        return self.matrices[key]
+
+    def prefetch(self):
+        """
+        Look up every object the batch could read or reuse with a single ls call
+        """
+        names = set()
+        for drivers, driven, conType, mo, opm, blendMtrx in self.specs:
+            names.update(drivers)
+            names.add(driven)
+            for suffix in [GRP, "_blend", "_blendMtrx", "_switch", "_wtVal", "_pick"]:
+                # Shared multMatrix and decompose nodes are looked up in the registry instead
+                names.add("{}{}".format(driven, suffix))
+
+        if not names:
+            # An empty ls call would list the whole scene
+            return
+
+        found = set(mc.ls(list(names)) or [])
+        self.exists.update(found)
+        self.missing.update(names - found)
+
+    def check_spec(self, drivers, driven, conType):
+        """
+        Return an error message for a spec that can't be built, or None if it's valid
+        """
+        if conType not in BATCH_TYPES:
+            return "Unknown constraint type: {}".format(conType)
+        if len(drivers) == 0:
+            return "{} has no driver objects".format(driven)
+        for obj in drivers + [driven]:
+            if not self.obj_exists(obj):
+                return "{} does not exist".format(obj)
+        if driven in drivers:
+            return "{} can't drive itself".format(driven)
+        if conType == "scale" and len(drivers) >= 2:
+            return "driven objects can only be scale constrained to one driver"
+        if conType.startswith("bc") and len(drivers) > 2:
+            return "blendColor constraints can't have more than two drivers"
+        return None
+
+    def get_builder(self, conType, mo, opm, blendMtrx):
+        """
+        Get a reusable Constraint or BlendColor object for a given type
+        """
+        cls, method = BATCH_TYPES[conType]
+        if cls is Constraint:
+            key = (cls, mo, opm, blendMtrx)
+        else:
+            key = (cls, False, False, False)
+        if key not in self.builders:
+            builder = cls(mo, opm, blendMtrx) if cls is Constraint else cls()
+            builder.batch = self
+            builder.plan = self.plan
+            self.builders[key] = builder
+        return self.builders[key], method
+
+    def is_pending(self, obj, pending):
+        """
+        Check if an object (or one of its parents) is driven by a spec that's still
+        waiting in the plan, so its scene pose isn't the one it will end up with
+        """
+        while obj is not None:
+            if obj in pending:
+                return True
+            parent = mc.listRelatives(obj, p=True)
+            obj = parent[0] if parent is not None else None
+        return False
+
+    def flush_plan(self, final=True):
+        """
+        Create what the plan recorded so far, through the backend of any earlier flush
+        so the whole batch still undoes in one step. The registry is only saved (and a
+        reconcile stops matching the scene's entries) once the last spec is flushed
+        """
+        if final:
+            self.plan.callbacks.append(self.registry.flushed)
+        else:
+            self.plan.callbacks.append(self.registry.rename)
+        names = self.plan.flush(self.plan.backend)
+        self.exists.update(names.values())
+        # The flushed networks move their driven objects
+        self.matrices = {}
+
+    def build(self):
+        """
+        Build every spec in the batch and return a result dictionary per spec
+        """
+        self.results = []
+        self.prefetch()
+        if self.registry is None:
+            self.registry = NodeRegistry(self.plan is not None and self.plan.reconcile)
+        pending = set()
+
+        for drivers, driven, conType, mo, opm, blendMtrx in self.specs:
+            result = {"drivers": drivers, "driven": driven, "type": conType, "mo": mo,
+                      "opm": opm, "blendMtrx": blendMtrx, "status": "ok", "message": "",
+                      "nodes": []}
+            self.results.append(result)
+
+            error = self.check_spec(drivers, driven, conType)
+            if error is not None:
+                # Skip the spec and report it rather than stopping the batch
+                result["status"] = "error"
+                result["message"] = error
+                continue
+
+            builder, method = self.get_builder(conType, mo, opm, blendMtrx)
+            if builder.mo is True and pending and any(
+                    [self.is_pending(obj, pending) for obj in drivers + [driven]]):
+                # The offset has to be measured from where an earlier spec puts its objects
+                self.flush_plan(final=False)
+                pending = set()
+            builder.warnings = []
+            self.created = []
+            try:
+                getattr(builder, method)(drivers, driven)
+            except RuntimeError as e:
+                result["status"] = "error"
+                result["message"] = str(e)
+            else:
+                if builder.warnings:
+                    result["status"] = "warning"
+                    result["message"] = "; ".join(builder.warnings)
+            result["nodes"] = self.created
+            if self.plan is not None and result["status"] != "error":
+                pending.add(driven)
+
+            if builder.mo is False:
+                # Snapping a driven object can move other drivers, so stop trusting cached matrices
+                self.matrices = {}
+
+        if self.plan is not None:
+            # Create every recorded node and connection in one transaction
+            self.flush_plan()
+        else:
+            self.registry.save()
+
+        return self.results
+
+
+class Rivet(Matrix):
+    def __init__(self, mo=False, pin=False, arcLen=False):
+        Matrix.__init__(self, mo)
+        self.pin = pin
+        self.arcLen = arcLen
+        self.pinIndices = {}
+        self.lenTable = None
+
+    def get_driver(self, surface=None):
+        """
+        Set selected surface (or the given one) as your driver object
+        """
+        obj = [surface] if surface is not None else mc.ls(sl=True)
+        if not len(obj) == 1:
+            # Can only work with one driver object
+            if len(obj) == 0:
+                return mc.warning("No objects selected")
+            if len(obj) >= 2:
+                return mc.warning("Too many objects selected")
+
+        if len(self.drivers) == 0:
+            # Object should be the first (or only) object in drivers
+            self.drivers.append(obj[0])
+        else:
+            self.drivers[0] = obj[0]
+
+        for o in obj:
+            parent = mc.listRelatives(o, p=True)
+            grp = "{}{}".format(o, GRP)
+            if parent is None or parent[0] != grp:
+                # Check to see if object has a parent group and, if not, give it one
+                self.mk_parent_grp(o)
+
+        return obj[0]
+
+    def get_pt_surface(self, riv, u, v):
+        """
+        Create a pointOnSurface node for your driver surface
+        """
+        shape = mc.listRelatives(self.drivers[0], s=True)[0]
+        if not mc.objectType(shape) == "nurbsSurface":
+            # Check to make sure incomming geo is a nurbs surface
+            return mc.warning("Driver object needs to be a nurbsSurface")
+
+        # Rivets sitting at the same uv share their pointOnSurfaceInfo node
+        ptSurf = self.mk_shared_node(
+            "pointOnSurfaceInfo", "{}_ptSurf".format(riv),
+            {"inputSurface": "{}.worldSpace[0]".format(shape)},
+            {"parameterU": u, "parameterV": v})
+
+        return ptSurf
+
+    def mk_4x4_mtrx(self, ptSurf):
+        """
+        Create a matrix that defines the world space of a rivet
+        """
+        attrs = [NML, TANU, TANV, ".position"]
+        inputs = {}
+
+        for i, attr in enumerate(attrs):
+            # Make a connection for each matrix attribute...
+            for j, v in enumerate(VECTORS):
+                # ...and vector directions per attribute
+                if attr == TANU or attr == TANV:
+                    v = v.lower()
+
+                inputs["in{}{}".format(i, j)] = "{}{}{}".format(ptSurf, attr, v)
+
+        mtrx = self.mk_shared_node(
+            "fourByFourMatrix", ptSurf.replace("ptSurf", "mtrx"), inputs)
+        return mtrx
+
+    def mk_pin(self):
+        """
+        Create (or reuse) a single uvPin node that pins any number of rivets to your
+        driver surface
+        """
+        shape = mc.listRelatives(self.drivers[0], s=True)[0]
+        if not mc.objectType(shape) == "nurbsSurface":
+            # Check to make sure incomming geo is a nurbs surface
+            return mc.warning("Driver object needs to be a nurbsSurface")
+
+        # Match the rivet matrices (normal on X, tangentU on Y) and raw uv parameters
+        pin = self.mk_shared_node(
+            "uvPin", "{}_uvPin".format(self.drivers[0]),
+            {"deformedGeometry": "{}.worldSpace[0]".format(shape)},
+            {"normalAxis": 0, "tangentAxis": 1, "normalizedIsoParms": 0})
+
+        if pin not in self.pinIndices:
+            # Carry on after any coordinates an earlier build already added
+            indices = None
+            if self.plan is None or not self.plan.has(pin):
+                indices = mc.getAttr("{}.coordinate".format(pin), mi=True)
+            self.pinIndices[pin] = max(indices) + 1 if indices else 0
+
+        return pin
+
+    def mk_pin_rivet(self, name, u=0.0, v=0.5, exists=False):
+        """
+        Create a rivet driven by the next coordinate of the surface's uvPin node
+        """
+        driverDecM = self.mk_decomposition(
+            self.drivers[0], "{}{}".format(self.drivers[0], WM))
+        pin = self.mk_pin()
+        if pin is None:
+            return
+        i = self.pinIndices[pin]
+        self.pinIndices[pin] = i + 1
+
+        riv = name if exists else mc.spaceLocator(n=name)[0]
+        self.set_attr("{}.inheritsTransform".format(riv), 0)
+
+        self.set_attr("{}.coordinate[{}].coordinateU".format(pin, i), u)
+        self.set_attr("{}.coordinate[{}].coordinateV".format(pin, i), v)
+        self.conn("{}.outputMatrix[{}]".format(pin, i),
+                  "{}.offsetParentMatrix".format(riv))
+        self.conn("{}.outputScale".format(
+            driverDecM), "{}{}".format(riv, SCL_ATTR))
+
+        self.save_registry()
+        return riv
+
+    def mk_rivet(self, name, u=0.0, v=0.5):
+        """
+        Create a rivet based on a defined uValue and vVaule
+        """
+        exists = self.obj_exists(name)
+        if exists and not self.is_reconcile():
+            return name
+
+        if len(self.drivers) == 0:
+            self.get_driver()
+
+        if self.pin is True:
+            # One uvPin node serves every rivet instead of three nodes per rivet
+            return self.mk_pin_rivet(name, u, v, exists)
+
+        # The driver's decompose matrix is shared by every rivet on the surface
+        driverDecM = self.mk_decomposition(
+            self.drivers[0], "{}{}".format(self.drivers[0], WM))
+
+        # A reconcile records the network of rivets that already exist again
+        riv = name if exists else mc.spaceLocator(n=name)[0]
+        self.set_attr("{}.inheritsTransform".format(riv), 0)
+
+        # Create the nodes
+        ptSurf = self.get_pt_surface(riv, u, v)
+        mtrx = self.mk_4x4_mtrx(ptSurf)
+        decM = self.mk_decomposition(riv, "{}{}".format(mtrx, OUT))
+
+        # Connect the nodes
+        self.conn("{}.outputTranslate".format(
+            decM), "{}{}".format(riv, POS_ATTR))
+        self.conn("{}.outputRotate".format(
+            decM), "{}{}".format(riv, ROT_ATTR))
+        self.conn("{}.outputScale".format(
+            driverDecM), "{}{}".format(riv, SCL_ATTR))
+
+        self.save_registry()
+        return riv
+
+    def get_riv_grp(self):
+        """
+        Get the rivet group of the driver surface, the rivets already in it and whether
+        it existed (reruns reuse the group and leave its rivets alone)
+        """
+        rivGrp = "{}{}{}".format(self.drivers[0], RIV, GRP)
+        if mc.objExists(rivGrp):
+            return rivGrp, set(mc.listRelatives(rivGrp, c=True) or []), True
+        return self.mk_node("transform", rivGrp, utility=False), set(), False
+
+    def get_length_table(self, v=0.5):
+        """
+        Get the arc length table of the driver surface's iso-curve at v
+        """
+        table = self.lenTable
+        if table is None or table.v != v or not table.is_current():
+            from . import spatialtools as st
+            table = st.get_length_table(self.drivers[0], v)
+            self.lenTable = table
+        return table
+
+    def set_rivets(self, rivets, surface=None):
+        """
+        Create a given number of rivets set eavenly across the Uvalue of a nurbsSurface
+        (or across its length with arcLen) on the selected surface or the given one
+        """
+        rivList = []
+        self.get_driver(surface)
+        if self.arcLen is True:
+            # Every rivet's u comes from one walk over the surface's length table
+            uVals = self.get_length_table().spaced_params(rivets)
+        # Save the registry once for all the rivets (unless the caller saves it later)
+        deferSave = self.deferSave
+        self.deferSave = True
+        rivGrp, grouped, grpExists = self.get_riv_grp()
+
+        for rivet, i in enumerate(range(rivets), 1):
+            # Create a locator and matrix constraint network
+            if self.arcLen is True:
+                uVal = uVals[rivet - 1]
+            elif rivet == 1:
+                uVal = 0
+            elif rivet == rivets:
+                uVal = 1
+            else:
+                uVal = i / (rivets - 1.0)
+
+            # Create the rivet
+            riv = self.mk_rivet("{}{}{}".format(
+                self.drivers[0], RIV, str(rivet).zfill(2)), uVal)
+            if riv not in grouped:
+                mc.parent(riv, rivGrp)
+            rivList.append(riv)
+
+        if not grpExists:
+            # Organize the outliner
+            mc.parent(rivGrp, "{}{}".format(self.drivers[0], GRP))
+
+        self.deferSave = deferSave
+        self.save_registry()
+        return rivList
+
+    def rivet_objects(self, objs=None, surface=None, parent=True, samples=None):
+        """
+        Create a rivet at the closest point of the surface for each object (or the
+        selected objects, surface selected last) and parent the objects under them
+        """
+        from . import spatialtools as st
+        if objs is None:
+            objs = mc.ls(sl=True)
+            if surface is None and objs:
+                surface = objs.pop()
+        if not objs:
+            return mc.warning("No objects to rivet")
+        self.get_driver(surface)
+
+        # Every object is looked up in the same cached index of the surface
+        index = st.get_index(self.drivers[0], samples or st.SAMPLES)
+        points = [mc.xform(obj, q=True, ws=True, t=True) for obj in objs]
+        params = index.closest_params(points)
+
+        rivList = []
+        deferSave = self.deferSave
+        self.deferSave = True
+        rivGrp, grouped, grpExists = self.get_riv_grp()
+        for obj, (u, v) in zip(objs, params):
+            riv = self.mk_rivet("{}{}".format(obj, RIV), u, v)
+            if riv not in grouped:
+                mc.parent(riv, rivGrp)
+            if parent and mc.listRelatives(obj, p=True) != [riv]:
+                mc.parent(obj, riv)
+            rivList.append(riv)
+
+        if not grpExists:
+            # Organize the outliner
+            mc.parent(rivGrp, "{}{}".format(self.drivers[0], GRP))
+
+        self.deferSave = deferSave
+        self.save_registry()
+        return rivList
+
+
+# Constraint types available to ConstraintBatch specs
+BATCH_TYPES = {
+    "parent": (Constraint, "parent"),
+    "point": (Constraint, "point"),
+    "orient": (Constraint, "orient"),
+    "scale": (Constraint, "scale"),
+    "bcParent": (BlendColor, "parent"),
+    "bcPoint": (BlendColor, "point"),
+    "bcOrient": (BlendColor, "orient"),
+    "bcScale": (BlendColor, "scale"),
+}
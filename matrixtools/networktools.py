@@ -0,0 +1,244 @@
+###########################################################################################
+#
+#   Title: Network Tools
+#
+#   Descritpion: Saves the utility node networks the matrix and ribbon tools build
+#       (_multM, _decM, _blend, _switch, _bc, _ptSurf, _mtrx... nodes, the offset and
+#       weight attributes they read and every connection) to a compact spec, and
+#       recreates them from it in one batched pass instead of rerunning the builders
+#
+#    Instructions: capture the networks of a built rig and store them:
+#           spec = capture()
+#           save(spec, path)
+#
+#       then after the scene was rebuilt (the drivers, driven objects and surfaces
+#       exist again but their networks don't):
+#           rebuild(load(path))
+#
+#       - capture(nodes) only captures the given utility nodes
+#       - check(spec) lists the outside objects the spec needs that aren't in the scene
+#       - rebuild(spec, plan) flushes through your own buildtools.BuildPlan (and so its
+#           backend)
+#       - the node registry entries (and owners) of the captured nodes are restored with
+#           them
+#
+###########################################################################################
+
+import json
+
+import maya.cmds as mc
+from matrixtools import buildtools as bt
+from matrixtools import matrixconstrainttools as mt
+
+VERSION = 1
+IDENTITY = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+# Attributes the builders set per node type and their defaults (None is always stored)
+NODE_ATTRS = {"multMatrix": [],
+              "wtAddMatrix": [],
+              "choice": [("selector", 0)],
+              "decomposeMatrix": [("inputRotateOrder", 0)],
+              "quatToEuler": [("inputRotateOrder", 0)],
+              "blendColors": [("blender", 0.5), ("color1", [1.0, 0.0, 0.0]),
+                              ("color2", [0.0, 0.0, 1.0])],
+              "fourByFourMatrix": [("in{}{}".format(r, c), float(r == c))
+                                   for r in range(4) for c in range(4)],
+              "pickMatrix": [("useTranslate", True), ("useRotate", True),
+                             ("useScale", True), ("useShear", True)],
+              "blendMatrix": [("envelope", 1.0)],
+              "multDoubleLinear": [("input1", 0.0), ("input2", 1.0)],
+              "pointOnSurfaceInfo": [("parameterU", None), ("parameterV", None),
+                                     ("turnOnPercentage", False)],
+              "uvPin": [("normalAxis", None), ("tangentAxis", None),
+                        ("normalizedIsoParms", None)]}
+# Multi attributes per node type and the children stored for every index ([] stores
+# the element itself)
+MULTI_ATTRS = {"multMatrix": [("matrixIn", [])],
+               "wtAddMatrix": [("wtMatrix", ["matrixIn", "weightIn"])],
+               "blendMatrix": [("target", ["targetMatrix", "weight", "translateWeight",
+                                           "rotateWeight", "scaleWeight", "shearWeight"])],
+               "uvPin": [("coordinate", ["coordinateU", "coordinateV"])]}
+
+
+def get_value(plug):
+    """
+    Read a plug as (value, valueType), unwrapping the single item list cmds returns for
+    compound values
+    """
+    value = mc.getAttr(plug)
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], tuple):
+        return list(value[0]), None
+    if isinstance(value, list) and len(value) == 16:
+        return [float(v) for v in value], "matrix"
+    return value, None
+
+
+def is_default(value, default):
+    """
+    Check if a captured value is the node's default and can be left out
+    """
+    if default is None:
+        return False
+    if isinstance(default, list):
+        return isinstance(value, list) and all(
+            [abs(v - d) < 1e-9 for v, d in zip(value, default)])
+    if isinstance(value, list):
+        return False
+    return abs(float(value) - float(default)) < 1e-9
+
+
+def get_plugs(node, nodeType):
+    """
+    List the plugs of a node worth storing, with their defaults
+    """
+    plugs = [("{}.{}".format(node, attr), default)
+             for attr, default in NODE_ATTRS.get(nodeType, [])]
+    for multi, children in MULTI_ATTRS.get(nodeType, []):
+        for i in mc.getAttr("{}.{}".format(node, multi), mi=True) or []:
+            element = "{}.{}[{}]".format(node, multi, i)
+            if not children:
+                plugs.append((element, IDENTITY))
+            plugs.extend([("{}.{}".format(element, child), None) for child in children])
+    return plugs
+
+
+def capture(nodes=None):
+    """
+    Capture every utility node network in the scene (or just the given nodes) as a
+    spec: nodes, outside attributes, values, connections, registry entries and the
+    objects that own the nodes
+    """
+    if nodes is None:
+        nodes = mc.ls(type=list(NODE_ATTRS)) or []
+    nodeTypes = dict([(node, mc.nodeType(node)) for node in nodes])
+
+    conns = {}
+    for node in nodes:
+        # Conversion nodes come back on their own when the connection is remade
+        plugs = mc.listConnections(node, s=True, d=False, c=True, p=True, scn=True) or []
+        for dst, src in zip(plugs[::2], plugs[1::2]):
+            conns[dst] = src
+        plugs = mc.listConnections(node, s=False, d=True, c=True, p=True, scn=True) or []
+        for src, dst in zip(plugs[::2], plugs[1::2]):
+            conns[dst] = src
+
+    attrs = []
+    values = []
+    dynamic = {}
+    for src in sorted(set(conns.values())):
+        obj, sep, attr = src.partition(".")
+        if obj in nodeTypes:
+            continue
+        if obj not in dynamic:
+            dynamic[obj] = set(mc.listAttr(obj, ud=True) or [])
+        if attr in dynamic[obj]:
+            # Offsets and weights live on the outside objects, keep them and their value
+            attrType = mc.getAttr(src, type=True)
+            attrType = "matrix" if attrType == "matrix" else "double"
+            attrs.append([obj, attr, attrType,
+                          mc.attributeQuery(attr, node=obj, niceName=True)])
+            value, valueType = get_value(src)
+            values.append([src, value, valueType])
+
+    for node in nodes:
+        for plug, default in get_plugs(node, nodeTypes[node]):
+            if plug in conns:
+                continue
+            value, valueType = get_value(plug)
+            if not is_default(value, default):
+                values.append([plug, value, valueType])
+
+    registry = {}
+    nodeRegistry = mt.NodeRegistry()
+    for key, node in nodeRegistry.entries.items():
+        if node in nodeTypes:
+            registry[key] = node
+    owners = {}
+    for owner, owned in nodeRegistry.owners.items():
+        owned = [node for node in owned if node in nodeTypes]
+        if owned:
+            owners[owner] = owned
+
+    return {"version": VERSION,
+            "nodes": [[node, nodeTypes[node]] for node in nodes],
+            "attrs": attrs,
+            "values": values,
+            "conns": sorted([[src, dst] for dst, src in conns.items()]),
+            "registry": registry,
+            "owners": owners}
+
+
+def save(spec, path):
+    """
+    Write a spec to a JSON file
+    """
+    with open(path, "w") as f:
+        json.dump(spec, f, separators=(",", ":"), sort_keys=True)
+
+
+def load(path):
+    """
+    Read a spec from a JSON file
+    """
+    with open(path) as f:
+        spec = json.load(f)
+    if spec.get("version") != VERSION:
+        raise RuntimeError("{} isn't a version {} network spec".format(path, VERSION))
+    return spec
+
+
+def check(spec):
+    """
+    List the outside objects a spec connects to that don't exist
+    """
+    nodes = set([node for node, nodeType in spec["nodes"]])
+    objs = set()
+    for src, dst in spec["conns"]:
+        for plug in [src, dst]:
+            obj = plug.partition(".")[0]
+            if obj not in nodes:
+                objs.add(obj)
+    objs = sorted(objs)
+    found = set(mc.ls(objs) or []) if objs else set()
+    return [obj for obj in objs if obj not in found]
+
+
+def rebuild(spec, plan=None):
+    """
+    Recreate the networks of a spec in one batched pass and return the names the nodes
+    received
+    """
+    missing = check(spec)
+    if missing:
+        raise RuntimeError("Missing objects: {}".format(", ".join(missing)))
+
+    if plan is None:
+        plan = bt.BuildPlan()
+    names = {}
+    for node, nodeType in spec["nodes"]:
+        names[node] = plan.mk_node(nodeType, node)
+
+    def resolve(plug):
+        node, sep, attr = plug.partition(".")
+        return "{}.{}".format(names.get(node, node), attr)
+
+    for obj, longName, attrType, niceName in spec["attrs"]:
+        if not mc.objExists("{}.{}".format(obj, longName)):
+            # Outside objects that survived the rebuild keep their attributes
+            plan.add_attr(obj, longName, attrType, niceName)
+    for plug, value, valueType in spec["values"]:
+        plan.set_attr(resolve(plug), value, valueType)
+    for src, dst in spec["conns"]:
+        plan.connect(resolve(src), resolve(dst), True)
+
+    registry = mt.NodeRegistry()
+    for key, node in spec.get("registry", {}).items():
+        registry.add(key, names.get(node, node))
+    for owner, owned in spec.get("owners", {}).items():
+        registry.own(owner, [names.get(node, node) for node in owned])
+    if registry.dirty:
+        plan.callbacks.append(registry.flushed)
+
+    # Everything is created in one transaction
+    actual = plan.flush()
+    return dict([(node, actual.get(name, name)) for node, name in names.items()])
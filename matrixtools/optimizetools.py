@@ -0,0 +1,440 @@
+###########################################################################################
+#
+#   Title: Optimize Tools
+#
+#   Descritpion: Cleans up the utility node networks the matrix and ribbon tools build
+#       so fewer nodes get evaluated every frame. Runs on a built rig or on a
+#       buildtools.BuildPlan before it's flushed:
+#           - multDoubleLinear nodes with constant inputs (the _wtVal of an averaged
+#               blend) are folded into the values they feed, and ones multiplying by 1 are
+#               bypassed
+#           - a divide of 1 by a power with a constant exponent (the volume preservation
+#               of a Ribbon) becomes the power node with the exponent negated
+#           - constant identity stages of a multMatrix (the offset of a driver that
+#               already sat on the driven object) are dropped, and a multMatrix left with
+#               a single stage is bypassed. Only unconnected settable attributes count as
+#               constants (the graph's is_settable()), outputs and attributes that move an
+#               object like offsetParentMatrix are always kept
+#           - decomposeMatrix nodes reading the same plug are merged into one
+#
+#    Instructions: optimize every network in the scene:
+#           var = Optimizer()
+#           var.optimize()
+#
+#       - Optimizer(plan) optimizes a BuildPlan in place (run it after the builders and
+#           before plan.flush())
+#       - Optimizer(backend, nodes) only looks at the given nodes or works through
+#           another backend (the headless Scene or a LocalGraph)
+#       - registry entries of removed or rewired nodes are dropped from the scene's
+#           NodeRegistry, pass Optimizer(target, registry=reg) to use another one (the
+#           one the builders shared, or the one of the graph being optimized). Without
+#           one only the scene and plans flushed into it forget their entries
+#       - var.optimize() returns a report of the nodes, connections and values it
+#           removed or set
+#       - var.undo() reverts the whole pass in one step
+#       - offsets that get dropped are identity, a driven object moved afterwards needs
+#           its constraint rebuilt to maintain a new offset
+#
+###########################################################################################
+
+import maya.cmds as mc
+
+from matrixtools import buildtools as bt
+from matrixtools import matrixconstrainttools as mt
+
+# Nodes the optimizer looks at
+NODE_TYPES = ["multDoubleLinear", "multiplyDivide", "multMatrix", "decomposeMatrix"]
+IDENTITY = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+# Defaults of the attributes the optimizer reads, for plugs a plan never set
+DEFAULTS = {("multDoubleLinear", "input1"): 0.0,
+            ("multDoubleLinear", "input2"): 1.0,
+            ("multiplyDivide", "operation"): 1,
+            ("multiplyDivide", "input1X"): 0.0,
+            ("multiplyDivide", "input2X"): 1.0,
+            ("decomposeMatrix", "inputRotateOrder"): 0}
+MULTIPLY = 1
+DIVIDE = 2
+POWER = 3
+
+
+def get_attr(plug):
+    """
+    Get the attribute of a plug without its indices (node.matrixIn[2] is matrixIn)
+    """
+    return plug.partition(".")[2].split("[")[0].split(".")[0]
+
+
+def is_value(value, target, tolerance=1e-9):
+    """
+    Check if a value is known and equal to a target
+    """
+    return value is not None and bt.is_equal(value, target, tolerance)
+
+
+class PlanGraph:
+    """
+    Lets the optimizer edit a BuildPlan before it's flushed through the same calls it
+    uses on a flush backend
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def get_nodes(self):
+        """
+        Get every planned node
+        """
+        return [name for name, nodeType in self.plan.nodes]
+
+    def get_type(self, node):
+        """
+        Get the type of a planned node (None if it isn't planned)
+        """
+        return dict(self.plan.nodes).get(node)
+
+    def get_source(self, plug):
+        """
+        Get the plug the plan connects into a plug
+        """
+        return self.plan.dests.get(plug)
+
+    def get_inputs(self, node):
+        """
+        Get every (source, destination) connection the plan makes into a node
+        """
+        return [(src, dst) for src, dst, force in self.plan.conns
+                if dst.partition(".")[0] == node]
+
+    def get_outputs(self, node):
+        """
+        Get every plug the plan connects a node into
+        """
+        return [dst for src, dst, force in self.plan.conns if src.partition(".")[0] == node]
+
+    def get_value(self, plug):
+        """
+        Get the last value the plan sets on a plug, or the attribute default
+        """
+        for dst, value, valueType in reversed(self.plan.values):
+            if dst == plug:
+                return value
+        node, sep, attr = plug.partition(".")
+        return DEFAULTS.get((self.get_type(node), attr))
+
+    def is_settable(self, plug):
+        """
+        Check if a plug is a dynamic attribute the plan adds (anything else is either a
+        planned node's output or lives in the scene and can't be read from the plan)
+        """
+        return self.plan.has(plug)
+
+    def set_attr(self, plug, value, valueType=None):
+        """
+        Replace the value the plan sets on a plug
+        """
+        self.plan.values = [item for item in self.plan.values if item[0] != plug]
+        self.plan.set_attr(plug, value, valueType)
+
+    def connect(self, src, dst, force=False):
+        """
+        Replace the connection the plan makes into a plug
+        """
+        self.plan.conns = [conn for conn in self.plan.conns if conn[1] != dst]
+        self.plan.connect(src, dst, force)
+
+    def disconnect(self, src, dst):
+        """
+        Drop a planned connection
+        """
+        self.plan.conns = [conn for conn in self.plan.conns
+                           if conn[0] != src or conn[1] != dst]
+        if self.plan.dests.get(dst) == src:
+            del self.plan.dests[dst]
+
+    def delete(self, node):
+        """
+        Drop a planned node with its values and connections
+        """
+        prefix = "{}.".format(node)
+        self.plan.nodes = [item for item in self.plan.nodes if item[0] != node]
+        self.plan.planned.discard(node)
+        self.plan.values = [item for item in self.plan.values
+                            if not item[0].startswith(prefix)]
+        self.plan.conns = [conn for conn in self.plan.conns
+                           if not conn[0].startswith(prefix) and not conn[1].startswith(prefix)]
+        for dst, src in list(self.plan.dests.items()):
+            if dst.startswith(prefix) or src.startswith(prefix):
+                del self.plan.dests[dst]
+
+    def commit(self):
+        """
+        Nothing to apply, the plan is edited in place
+        """
+        pass
+
+
+class Optimizer:
+    """
+    Folds constants and removes no-op utility nodes from a built rig or a BuildPlan
+    """
+
+    def __init__(self, target=None, nodes=None, registry=None):
+        self.plan = None
+        if isinstance(target, bt.BuildPlan):
+            self.plan = target
+            self.graph = PlanGraph(target)
+        elif target is None:
+            self.graph = bt.ModifierBackend()
+        else:
+            self.graph = target
+        self.nodes = nodes
+        self.registry = registry
+        self.removed = set()
+        self.touched = set()
+        self.report = {}
+
+    def get_nodes(self):
+        """
+        Get the nodes to optimize per type
+        """
+        if self.nodes is None:
+            if self.plan is not None:
+                nodes = self.graph.get_nodes()
+            else:
+                nodes = mc.ls(type=NODE_TYPES) or []
+        else:
+            nodes = self.nodes
+        byType = dict([(nodeType, []) for nodeType in NODE_TYPES])
+        for node in nodes:
+            nodeType = self.graph.get_type(node)
+            if nodeType in byType:
+                byType[nodeType].append(node)
+        return byType
+
+    def count_conns(self, nodes):
+        """
+        Count the connections touching any of the given nodes that still exist
+        """
+        dsts = set()
+        for node in nodes:
+            if node in self.removed:
+                continue
+            dsts.update([bt.norm_plug(dst) for src, dst in self.graph.get_inputs(node)])
+            dsts.update([bt.norm_plug(dst) for dst in self.graph.get_outputs(node)])
+        return len(dsts)
+
+    def get_constant(self, plug):
+        """
+        Get the value of an unconnected plug (None if something drives it)
+        """
+        if self.graph.get_source(plug) is not None:
+            return None
+        return self.graph.get_value(plug)
+
+    def move_outputs(self, node, src=None):
+        """
+        Connect whatever a node drives to another plug (the same attribute of another
+        node when src is a node name)
+        """
+        for dst in self.graph.get_outputs(node):
+            plug = self.graph.get_source(dst)
+            if src is None or "." in src:
+                new = src
+            else:
+                new = "{}.{}".format(src, plug.partition(".")[2])
+            self.graph.connect(new, dst, True)
+
+    def remove(self, node):
+        """
+        Delete a node the optimizer made redundant
+        """
+        self.graph.delete(node)
+        self.removed.add(node)
+        self.touched.add(node)
+
+    def fold_mult_linear(self, node):
+        """
+        Fold a multDoubleLinear with constant inputs into the values it feeds, or bypass
+        it when it multiplies by 1
+        """
+        in1 = "{}.input1".format(node)
+        in2 = "{}.input2".format(node)
+        value1 = self.get_constant(in1)
+        value2 = self.get_constant(in2)
+        if value1 is not None and value2 is not None:
+            value = float(value1) * float(value2)
+            for dst in self.graph.get_outputs(node):
+                self.graph.disconnect(self.graph.get_source(dst), dst)
+                self.graph.set_attr(dst, value)
+                self.report["values"] += 1
+        elif is_value(value1, 1.0):
+            self.move_outputs(node, self.graph.get_source(in2))
+        elif is_value(value2, 1.0):
+            self.move_outputs(node, self.graph.get_source(in1))
+        else:
+            return False
+        self.remove(node)
+        return True
+
+    def fold_reciprocal_power(self, node):
+        """
+        Turn 1 / (x ^ e) into x ^ -e when the power node only feeds this divide
+        """
+        if not is_value(self.get_constant("{}.operation".format(node)), DIVIDE):
+            return False
+        if not is_value(self.get_constant("{}.input1X".format(node)), 1.0):
+            return False
+        src = self.graph.get_source("{}.input2X".format(node))
+        if src is None or get_attr(src) != "outputX":
+            return False
+        pwr = src.partition(".")[0]
+        if self.graph.get_type(pwr) != "multiplyDivide" or pwr in self.removed:
+            return False
+        if not is_value(self.get_constant("{}.operation".format(pwr)), POWER):
+            return False
+        exponent = self.get_constant("{}.input2X".format(pwr))
+        if exponent is None or len(self.graph.get_outputs(pwr)) != 1:
+            return False
+        outs = self.graph.get_outputs(node)
+        if [dst for dst in outs if get_attr(self.graph.get_source(dst)) != "outputX"]:
+            # Only the X channel is folded
+            return False
+
+        self.graph.set_attr("{}.input2X".format(pwr), -float(exponent))
+        self.report["values"] += 1
+        self.move_outputs(node, src)
+        self.touched.add(pwr)
+        self.remove(node)
+        return True
+
+    def drop_identity_stages(self, node):
+        """
+        Drop the constant identity inputs of a multMatrix, bypassing it if a single
+        stage is left
+        """
+        stages = []
+        for src, dst in self.graph.get_inputs(node):
+            if get_attr(dst) != "matrixIn":
+                continue
+            index = int(dst.partition("[")[2].partition("]")[0])
+            stages.append((index, src, dst))
+        stages.sort()
+
+        keep = []
+        for index, src, dst in stages:
+            if not self.graph.is_settable(src) or self.graph.get_source(src) is not None:
+                keep.append(src)
+            elif not is_value(self.graph.get_value(src), IDENTITY, 1e-6):
+                keep.append(src)
+        if not keep or len(keep) == len(stages):
+            return False
+
+        for index, src, dst in stages:
+            self.graph.disconnect(src, dst)
+        self.report["stages"] += len(stages) - len(keep)
+        if len(keep) == 1:
+            # A single matrix passes through as it is
+            self.move_outputs(node, keep[0])
+            self.remove(node)
+        else:
+            for i, src in enumerate(keep):
+                self.graph.connect(src, "{}.matrixIn[{}]".format(node, i))
+            self.touched.add(node)
+        return True
+
+    def merge_decompositions(self, nodes):
+        """
+        Merge decomposeMatrix nodes reading the same plug into the first one
+        """
+        kept = {}
+        merged = 0
+        for node in nodes:
+            if node in self.removed:
+                continue
+            src = self.graph.get_source("{}.inputMatrix".format(node))
+            if src is None:
+                continue
+            order = self.graph.get_source("{}.inputRotateOrder".format(node))
+            if order is None:
+                order = self.get_constant("{}.inputRotateOrder".format(node))
+            key = (bt.norm_plug(src), str(order))
+            if key not in kept:
+                kept[key] = node
+                continue
+            self.move_outputs(node, kept[key])
+            self.remove(node)
+            merged += 1
+        return merged
+
+    def optimize(self):
+        """
+        Run every pass and return a report of what was removed
+        """
+        self.removed = set()
+        self.touched = set()
+        self.report = {"nodes": 0, "connections": 0, "values": 0, "folded": 0,
+                       "stages": 0, "merged": 0}
+        byType = self.get_nodes()
+        allNodes = [node for nodeType in NODE_TYPES for node in byType[nodeType]]
+        before = self.count_conns(allNodes)
+
+        # Every pass reads the graph its previous pass left, so each gets committed
+        for node in byType["multDoubleLinear"]:
+            self.report["folded"] += self.fold_mult_linear(node)
+        for node in byType["multiplyDivide"]:
+            self.report["folded"] += self.fold_reciprocal_power(node)
+        self.graph.commit()
+
+        for node in byType["multMatrix"]:
+            self.drop_identity_stages(node)
+        self.graph.commit()
+
+        self.report["merged"] = self.merge_decompositions(byType["decomposeMatrix"])
+        self.graph.commit()
+
+        self.forget()
+        self.report["nodes"] = len(self.removed)
+        self.report["connections"] = before - self.count_conns(allNodes)
+        return self.report
+
+    def get_registry(self):
+        """
+        Get the node registry to update (None when the graph isn't the scene and no
+        registry was passed)
+        """
+        if self.registry is not None:
+            return self.registry
+        if self.plan is not None or isinstance(self.graph, bt.ModifierBackend):
+            return mt.NodeRegistry()
+        return None
+
+    def forget(self):
+        """
+        Drop the registry entries of the nodes that were removed or rewired so builders
+        don't reuse them by their old inputs
+        """
+        if not self.touched:
+            return
+        if self.plan is None:
+            registry = self.get_registry()
+            if registry is not None:
+                registry.discard(self.touched)
+                registry.save()
+            return
+
+        touched = set(self.touched)
+
+        def flushed(names):
+            registry = self.get_registry()
+            registry.discard(set([names.get(node, node) for node in touched]))
+            registry.save()
+        # Runs after the builders' registries were saved by the flush
+        self.plan.callbacks.append(flushed)
+
+    def undo(self):
+        """
+        Revert the last optimization in one step
+        """
+        if self.plan is None:
+            self.graph.undo()
@@ -0,0 +1,388 @@
+###########################################################################################
+#
+#   Title: Parallel Tools
+#
+#   Descritpion: Checks how well a built rig suits Maya's parallel evaluation manager.
+#       The dependency graph of the rig (connections plus the DAG parenting every
+#       transform inherits) is searched for cycles, long serial chains, fan-in hotspots
+#       and patterns that break scheduling or add dirty propagation, and every node gets
+#       a cost estimate so the critical path (the chain the scheduler can never run in
+#       parallel) can be compared between rig variants
+#
+#    Instructions: analyze the whole scene:
+#           var = Analyzer()
+#           report = var.analyze()
+#           print(var.summary())
+#
+#       - Analyzer(nodes=[...]) only starts from the given nodes (whatever they connect
+#           to is still part of the graph)
+#       - Analyzer(plan) or Analyzer(localGraph) analyzes a recorded buildtools.BuildPlan
+#           or LocalGraph instead of the scene (only the connections are known there, so
+#           the DAG and deformer patterns aren't checked)
+#       - compare(reportA, reportB) gives the difference between two variants
+#       - the costs are relative (a decomposeMatrix is 1), not milliseconds
+#
+###########################################################################################
+
+import maya.cmds as mc
+
+from matrixtools import buildtools as bt
+
+# Relative evaluation cost per node type
+COSTS = {"multMatrix": 0.3,
+         "wtAddMatrix": 0.3,
+         "choice": 0.1,
+         "decomposeMatrix": 1.0,
+         "composeMatrix": 0.8,
+         "quatToEuler": 0.4,
+         "blendColors": 0.2,
+         "fourByFourMatrix": 0.3,
+         "pickMatrix": 0.3,
+         "blendMatrix": 1.2,
+         "aimMatrix": 1.2,
+         "inverseMatrix": 0.5,
+         "multDoubleLinear": 0.1,
+         "multiplyDivide": 0.2,
+         "plusMinusAverage": 0.2,
+         "blendTwoAttr": 0.1,
+         "unitConversion": 0.1,
+         "condition": 0.1,
+         "clamp": 0.1,
+         "reverse": 0.1,
+         "distanceBetween": 0.3,
+         "curveInfo": 2.0,
+         "pointOnSurfaceInfo": 2.5,
+         "uvPin": 2.0,
+         "transform": 1.0,
+         "joint": 1.2,
+         "ikHandle": 4.0,
+         "ikEffector": 0.5,
+         "poleVectorConstraint": 1.0,
+         "nurbsCurve": 2.0,
+         "nurbsSurface": 4.0,
+         "mesh": 6.0,
+         "skinCluster": 20.0,
+         "blendShape": 10.0,
+         "cluster": 5.0,
+         "nonLinear": 8.0,
+         "expression": 5.0}
+DEFAULT_COST = 1.0
+# Extra cost per input of the nodes that loop over a multi attribute
+INPUT_COSTS = {"multMatrix": 0.3,
+               "wtAddMatrix": 0.4,
+               "blendMatrix": 0.6,
+               "uvPin": 1.5,
+               "skinCluster": 2.0,
+               "blendShape": 2.0}
+DEFORMER_TYPES = ["skinCluster", "blendShape", "cluster", "nonLinear", "ffd", "wire",
+                  "wrap", "deltaMush", "tension", "sculpt"]
+SHAPE_TYPES = ["mesh", "nurbsSurface", "nurbsCurve", "subdiv", "lattice"]
+HANDLE_TYPES = ["clusterHandle", "deformBend", "deformTwist", "deformSquash", "deformSine",
+                "deformWave", "deformFlare"]
+TRANSFORM_TYPES = ["transform", "joint"]
+# Nodes the evaluation manager can't schedule freely
+SERIAL_TYPES = {"expression": "expressions can run any command, so they evaluate serially"}
+CHAIN_LIMIT = 8
+FAN_IN_LIMIT = 8
+
+
+def get_cost(nodeType, inputs=0):
+    """
+    Estimate what a node of this type costs to evaluate with this many input nodes
+    """
+    return COSTS.get(nodeType, DEFAULT_COST) + INPUT_COSTS.get(nodeType, 0.0) * inputs
+
+
+def compare(before, after):
+    """
+    Get the difference of the totals of two reports (after - before)
+    """
+    keys = ["nodes", "connections", "cost", "cycles", "chains", "fanIn", "patterns"]
+    diff = {}
+    for key in keys:
+        a = before[key]
+        b = after[key]
+        if isinstance(a, list):
+            a = len(a)
+            b = len(b)
+        diff[key] = b - a
+    diff["critical"] = after["critical"]["cost"] - before["critical"]["cost"]
+    diff["depth"] = after["critical"]["depth"] - before["critical"]["depth"]
+    return diff
+
+
+class Analyzer:
+    """
+    Finds what keeps a rig's dependency graph from evaluating in parallel
+    """
+
+    def __init__(self, target=None, nodes=None):
+        self.target = target
+        self.nodes = nodes
+        self.types = {}
+        self.succ = {}
+        self.pred = {}
+        self.parents = {}
+        self.conns = 0
+        self.report = {}
+
+    def add_node(self, node, nodeType=None):
+        """
+        Add a node to the graph, looking its type up in the scene if it isn't known
+        """
+        if node not in self.types:
+            if nodeType is None and self.target is None:
+                nodeType = mc.nodeType(node)
+            self.types[node] = nodeType
+            self.succ[node] = set()
+            self.pred[node] = set()
+
+    def add_edge(self, src, dst):
+        """
+        Add a dependency between two nodes
+        """
+        self.add_node(src)
+        self.add_node(dst)
+        self.succ[src].add(dst)
+        self.pred[dst].add(src)
+
+    def from_scene(self):
+        """
+        Read the connections and parenting of the scene (or of the given nodes)
+        """
+        nodes = self.nodes if self.nodes is not None else mc.ls()
+        for node in nodes:
+            self.add_node(node)
+        for node in nodes:
+            plugs = mc.listConnections(node, s=False, d=True, c=True, p=True) or []
+            for src, dst in zip(plugs[::2], plugs[1::2]):
+                if src.endswith(".message"):
+                    # Message connections are relationships, nothing evaluates them
+                    continue
+                self.add_edge(node, dst.partition(".")[0])
+                self.conns += 1
+            parent = mc.listRelatives(node, p=True)
+            if parent:
+                # Children (and shapes) depend on the world matrix of their parent
+                self.parents[node] = parent[0]
+                self.add_edge(parent[0], node)
+
+    def from_graph(self):
+        """
+        Read the nodes and connections of a BuildPlan or a LocalGraph
+        """
+        if isinstance(self.target, bt.BuildPlan):
+            nodes = self.target.nodes
+            conns = [(src, dst) for src, dst, force in self.target.conns]
+        else:
+            nodes = self.target.nodes.items()
+            conns = [(src, dst) for dst, src in self.target.conns.items()]
+        for node, nodeType in nodes:
+            if self.nodes is None or node in self.nodes:
+                self.add_node(node, nodeType)
+        for src, dst in conns:
+            self.add_edge(src.partition(".")[0], dst.partition(".")[0])
+            self.conns += 1
+
+    def get_cost(self, node):
+        """
+        Estimate what a node costs to evaluate
+        """
+        return get_cost(self.types[node], len(self.pred[node]))
+
+    def get_components(self):
+        """
+        Split the graph into strongly connected components (Tarjan's algorithm), every
+        component comes after all the ones it drives
+        """
+        index = {}
+        low = {}
+        stack = []
+        onStack = set()
+        comps = []
+        for root in sorted(self.types):
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            onStack.add(root)
+            work = [(root, iter(sorted(self.succ[root])))]
+            while work:
+                node, items = work[-1]
+                for nxt in items:
+                    if nxt not in index:
+                        index[nxt] = low[nxt] = len(index)
+                        stack.append(nxt)
+                        onStack.add(nxt)
+                        work.append((nxt, iter(sorted(self.succ[nxt]))))
+                        break
+                    elif nxt in onStack:
+                        low[node] = min(low[node], index[nxt])
+                else:
+                    work.pop()
+                    if work:
+                        prev = work[-1][0]
+                        low[prev] = min(low[prev], low[node])
+                    if low[node] == index[node]:
+                        comp = []
+                        while True:
+                            item = stack.pop()
+                            onStack.discard(item)
+                            comp.append(item)
+                            if item == node:
+                                break
+                        comps.append(sorted(comp))
+        return comps
+
+    def find_cycles(self, comps):
+        """
+        Get every cycle (a component of more than one node or a node feeding itself)
+        """
+        return [comp for comp in comps
+                if len(comp) > 1 or comp[0] in self.succ[comp[0]]]
+
+    def get_critical(self, comps, costs):
+        """
+        Get the most expensive path through the graph (cycles count as one step costing
+        all their nodes)
+        """
+        owner = {}
+        for i, comp in enumerate(comps):
+            for node in comp:
+                owner[node] = i
+
+        best = [0.0] * len(comps)
+        nextComp = [None] * len(comps)
+        # Components come sinks first, so everything downstream is already solved
+        for i, comp in enumerate(comps):
+            cost = sum([costs[node] for node in comp])
+            tail = 0.0
+            for node in comp:
+                for nxt in self.succ[node]:
+                    j = owner[nxt]
+                    if j != i and best[j] > tail:
+                        tail = best[j]
+                        nextComp[i] = j
+            best[i] = cost + tail
+
+        if not comps:
+            return {"cost": 0.0, "depth": 0, "path": []}
+        i = max(range(len(comps)), key=lambda k: best[k])
+        total = best[i]
+        path = []
+        while i is not None:
+            path.append(comps[i][0] if len(comps[i]) == 1 else comps[i])
+            i = nextComp[i]
+        return {"cost": total, "depth": len(path), "path": path}
+
+    def find_chains(self):
+        """
+        Get the serial chains (nodes feeding exactly one node that only they feed)
+        longer than CHAIN_LIMIT
+        """
+        def linked(node, nxt):
+            return len(self.succ[node]) == 1 and len(self.pred[nxt]) == 1
+
+        chains = []
+        for node in sorted(self.types):
+            preds = list(self.pred[node])
+            if len(preds) == 1 and linked(preds[0], node):
+                # Not the start of a chain
+                continue
+            chain = [node]
+            while len(self.succ[chain[-1]]) == 1:
+                nxt = list(self.succ[chain[-1]])[0]
+                if not linked(chain[-1], nxt) or nxt in chain:
+                    break
+                chain.append(nxt)
+            if len(chain) > CHAIN_LIMIT:
+                chains.append(chain)
+        return chains
+
+    def find_fan_in(self):
+        """
+        Get the nodes waiting on more than FAN_IN_LIMIT other nodes, most inputs first
+        """
+        hotspots = [(node, len(self.pred[node])) for node in self.types
+                    if len(self.pred[node]) > FAN_IN_LIMIT]
+        return sorted(hotspots, key=lambda item: (-item[1], item[0]))
+
+    def find_patterns(self):
+        """
+        Get the nodes set up in ways that break scheduling or add dirty propagation as
+        (node, kind, message)
+        """
+        patterns = []
+        for node in sorted(self.types):
+            nodeType = self.types[node]
+            parent = self.parents.get(node)
+            if nodeType in SERIAL_TYPES:
+                patterns.append((node, "serial", SERIAL_TYPES[nodeType]))
+            elif nodeType in HANDLE_TYPES and parent in self.parents:
+                patterns.append((parent, "handle", "deformer handle parented under {}, "
+                                 "moving it dirties the deformed geometry through the "
+                                 "hierarchy".format(self.parents[parent])))
+            elif nodeType in TRANSFORM_TYPES and parent is not None and not mc.getAttr(
+                    "{}.inheritsTransform".format(node)):
+                patterns.append((node, "inherits", "inheritsTransform is off under {}, "
+                                 "which still dirties it every time it moves".format(parent)))
+            elif nodeType in DEFORMER_TYPES:
+                for shape in sorted(self.pred[node]):
+                    if self.types[shape] not in SHAPE_TYPES:
+                        continue
+                    stacked = [src for src in self.pred[shape]
+                               if self.types[src] in DEFORMER_TYPES]
+                    if stacked and node not in self.pred[shape]:
+                        patterns.append((node, "stacked", "reads {} which {} deforms, so "
+                                         "both deformer stacks evaluate one after the "
+                                         "other".format(shape, ", ".join(sorted(stacked)))))
+        return patterns
+
+    def analyze(self):
+        """
+        Build the dependency graph and return the report
+        """
+        self.types = {}
+        self.succ = {}
+        self.pred = {}
+        self.parents = {}
+        self.conns = 0
+        if self.target is None:
+            self.from_scene()
+        else:
+            self.from_graph()
+
+        costs = dict([(node, self.get_cost(node)) for node in self.types])
+        comps = self.get_components()
+        self.report = {"nodes": len(self.types),
+                       "connections": self.conns,
+                       "cost": sum(costs.values()),
+                       "critical": self.get_critical(comps, costs),
+                       "cycles": self.find_cycles(comps),
+                       "chains": self.find_chains(),
+                       "fanIn": self.find_fan_in(),
+                       "patterns": self.find_patterns() if self.target is None else [],
+                       "costs": costs}
+        return self.report
+
+    def summary(self):
+        """
+        Describe the last report in a few lines
+        """
+        report = self.report or self.analyze()
+        critical = report["critical"]
+        lines = ["{} nodes, {} connections, total cost {:.1f}".format(
+                     report["nodes"], report["connections"], report["cost"]),
+                 "critical path: cost {:.1f} over {} steps ({:.0%} of the total)".format(
+                     critical["cost"], critical["depth"],
+                     critical["cost"] / report["cost"] if report["cost"] else 0.0)]
+        for cycle in report["cycles"]:
+            lines.append("cycle: {}".format(" -> ".join(cycle)))
+        for chain in report["chains"]:
+            lines.append("serial chain of {}: {} ... {}".format(
+                len(chain), chain[0], chain[-1]))
+        for node, count in report["fanIn"]:
+            lines.append("fan-in: {} waits on {} nodes".format(node, count))
+        for node, kind, message in report["patterns"]:
+            lines.append("{}: {} {}".format(kind, node, message))
+        return "\n".join(lines)
@@ -0,0 +1,132 @@
+###########################################################################################
+#
+#   Title: Session Tools
+#
+#   Descritpion: Runs a build inside a session that takes away the overhead Maya adds to
+#       every command: the undo queue records the whole build as one chunk (or nothing
+#       at all), the viewport stops refreshing and the evaluation manager stops
+#       rebuilding its graph after each connection. The builders (Constraint, BlendColor,
+#       Rivet, Ribbon, FKIK) also skip their selection side effects while a session is
+#       active. Everything is put back when the session ends, even if the build fails
+#
+#    Instructions: wrap any build in a BuildSession:
+#           with sessiontools.BuildSession() as session:
+#               matrixtools.Ribbon("arm").build_ribbon_rig()
+#           print(session.report())
+#
+#       - BuildSession(undo=False) turns the undo queue off instead of grouping the build
+#           into one chunk (faster, but the build can't be undone)
+#       - BuildSession(refresh=True) or BuildSession(evaluation=True) leave the viewport
+#           or the evaluation manager alone
+#       - session.elapsed holds the seconds spent inside the session
+#       - sessions can be nested, only the outermost one changes and restores anything
+#
+###########################################################################################
+
+from timeit import default_timer
+
+import maya.cmds as mc
+
+# Sessions currently open, the outermost first
+ACTIVE = []
+
+
+def get_session():
+    """
+    Get the build session that's currently open, if any
+    """
+    return ACTIVE[-1] if ACTIVE else None
+
+
+class BuildSession:
+    """
+    Suspends undo, refresh and evaluation graph rebuilds for the duration of a build
+    """
+
+    def __init__(self, name="matrixBuild", undo=True, refresh=False, evaluation=False):
+        self.name = name
+        self.undo = undo
+        self.refresh = refresh
+        self.evaluation = evaluation
+        self.restore = []
+        self.start = None
+        self.elapsed = 0.0
+        self.failed = False
+
+    def __enter__(self):
+        self.start = default_timer()
+        self.restore = []
+        outer = get_session() is not None
+        ACTIVE.append(self)
+        if outer:
+            # The outermost session already set everything up
+            return self
+
+        try:
+            self.suspend_undo()
+            if not self.refresh:
+                mc.refresh(suspend=True)
+                self.restore.append(lambda: mc.refresh(suspend=False))
+            if not self.evaluation:
+                self.suspend_evaluation()
+        except Exception:
+            # Leave nothing half suspended
+            self.resume()
+            ACTIVE.remove(self)
+            raise
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        ACTIVE.remove(self)
+        self.failed = excType is not None
+        try:
+            self.resume()
+        finally:
+            self.elapsed = default_timer() - self.start
+        # Errors are reported, not swallowed
+        return False
+
+    def suspend_undo(self):
+        """
+        Group the build into one undo chunk, or turn the undo queue off
+        """
+        if not mc.undoInfo(q=True, state=True):
+            return
+        if self.undo:
+            mc.undoInfo(openChunk=True, chunkName=self.name)
+            self.restore.append(lambda: mc.undoInfo(closeChunk=True))
+        else:
+            mc.undoInfo(stateWithoutFlush=False)
+            self.restore.append(lambda: mc.undoInfo(stateWithoutFlush=True))
+
+    def suspend_evaluation(self):
+        """
+        Switch the evaluation manager to DG mode so it doesn't rebuild its graph after
+        every connection. Switching back rebuilds it once
+        """
+        mode = mc.evaluationManager(q=True, mode=True)[0]
+        if mode == "off":
+            return
+        mc.evaluationManager(mode="off")
+        self.restore.append(lambda: mc.evaluationManager(mode=mode))
+
+    def resume(self):
+        """
+        Put back everything the session changed, in reverse order. Every step is tried
+        even if one fails
+        """
+        error = None
+        while self.restore:
+            try:
+                self.restore.pop()()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def report(self):
+        """
+        Describe how long the session took
+        """
+        return "{} {}: {:.3f}s".format(self.name, "failed" if self.failed else "built",
+                                       self.elapsed)
@@ -0,0 +1,345 @@
+###########################################################################################
+#
+#   Title: Spatial Tools
+#
+#   Descritpion: Finds the closest surface parameters of many points at once. A
+#       nurbsSurface is sampled on a uv grid (SAMPLES points per span) into a KD-tree,
+#       every point starts from its STARTS nearest samples which are refined on the
+#       surface itself with a few Gauss-Newton steps, the closest result wins. The index
+#       of a surface is cached and only rebuilt once its CVs (or its transform) change,
+#       so placing hundreds of rivets costs one sampling pass and a tree lookup each
+#
+#    Instructions: get the uv of points on a surface:
+#           index = get_index("surface")
+#           uvs = index.closest_params([(1, 0, 2), (3, 0, 1)])
+#
+#       - get_index(surface, samples=8) samples more densely (surfaces with spans that
+#           fold back on themselves need it to start every point on the right side)
+#       - clear_cache() drops every cached index, clear_cache(surface) only that one
+#       - Rivet.rivet_objects(objs, surface) uses this to rivet objects where they are
+#
+#       Length tables - the iso-curve of a surface at a given v is sampled once
+#           (LENGTH_SAMPLES points per span) into a table of arc length per u parameter,
+#           cached and rebuilt like the index. It turns world space distances along the
+#           surface into u parameters:
+#           table = get_length_table("surface", v=0.5)
+#           uVals = table.spaced_params(10)
+#
+#       - table.length is the length of the iso-curve, table.params_at(lengths) gets
+#           the u of many distances in one walk over the table
+#       - Rivet(arcLen=True).set_rivets(rivets) spaces rivets evenly in world space
+#
+###########################################################################################
+
+import bisect
+import math
+
+import maya.cmds as mc
+import maya.api.OpenMaya as om
+
+SAMPLES = 4
+# Nearest samples refined per point, the closest result wins
+STARTS = 4
+REFINE_STEPS = 8
+TOLERANCE = 1e-7
+# Cached SurfaceIndex per surface shape
+CACHE = {}
+LENGTH_SAMPLES = 4
+# Cached LengthTable per (surface shape, v)
+LENGTH_CACHE = {}
+
+
+def get_shape(surface):
+    """
+    Get the nurbsSurface shape of a surface transform (or the shape itself)
+    """
+    if mc.nodeType(surface) == "nurbsSurface":
+        return surface
+    shapes = mc.listRelatives(surface, s=True, type="nurbsSurface")
+    if not shapes:
+        return mc.error("{} isn't a nurbsSurface".format(surface))
+    return shapes[0]
+
+
+def get_index(surface, samples=SAMPLES):
+    """
+    Get the cached index of a surface, rebuilding it if the surface changed since
+    """
+    shape = get_shape(surface)
+    index = CACHE.get(shape)
+    if index is not None and index.samples == samples and index.is_current():
+        return index
+    index = SurfaceIndex(shape, samples)
+    CACHE[shape] = index
+    return index
+
+
+def get_length_table(surface, v=0.5, samples=LENGTH_SAMPLES):
+    """
+    Get the cached length table of a surface's iso-curve at v, rebuilding it if the
+    surface changed since
+    """
+    shape = get_shape(surface)
+    table = LENGTH_CACHE.get((shape, v))
+    if table is not None and table.samples == samples and table.is_current():
+        return table
+    table = LengthTable(shape, v, samples)
+    LENGTH_CACHE[(shape, v)] = table
+    return table
+
+
+def clear_cache(surface=None):
+    """
+    Drop the cached index and length tables of a surface, or of every surface
+    """
+    if surface is None:
+        CACHE.clear()
+        LENGTH_CACHE.clear()
+    else:
+        shape = get_shape(surface)
+        CACHE.pop(shape, None)
+        for key in [key for key in LENGTH_CACHE if key[0] == shape]:
+            del LENGTH_CACHE[key]
+
+
+def get_fn(shape):
+    """
+    Get a function set of a nurbsSurface shape
+    """
+    return om.MFnNurbsSurface(om.MSelectionList().add(shape).getDagPath(0))
+
+
+def get_key(fn):
+    """
+    Get the world space CV positions of a surface, to tell when it changed
+    """
+    return tuple([round(cv[i], 6) for cv in fn.cvPositions(om.MSpace.kWorld)
+                  for i in range(3)])
+
+
+def is_current(cached):
+    """
+    Check if a cached index or table still matches its surface (looked up again, the
+    shape could have been deleted and rebuilt under the same name)
+    """
+    return mc.objExists(cached.shape) and get_key(get_fn(cached.shape)) == cached.key
+
+
+def dist_sq(a, b):
+    """
+    Get the squared distance between two points
+    """
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+class KDTree:
+    """
+    Nearest neighbour lookups in a set of 3D points
+    """
+
+    def __init__(self, points):
+        self.points = points
+        # [point index, split axis, left node, right node], -1 for no child
+        self.nodes = []
+        self.root = self.build(list(range(len(points))))
+
+    def build(self, indices):
+        """
+        Split the points at the median of their widest axis and return the node index
+        """
+        if not indices:
+            return -1
+        pts = self.points
+        extents = [max([pts[i][axis] for i in indices]) - min([pts[i][axis] for i in indices])
+                   for axis in range(3)]
+        axis = extents.index(max(extents))
+        indices.sort(key=lambda i: pts[i][axis])
+        mid = len(indices) // 2
+
+        node = len(self.nodes)
+        self.nodes.append([indices[mid], axis, -1, -1])
+        self.nodes[node][2] = self.build(indices[:mid])
+        self.nodes[node][3] = self.build(indices[mid + 1:])
+        return node
+
+    def nearest(self, point, count=1):
+        """
+        Get the indices of the count points closest to a point, closest first
+        """
+        # (squared distance, index) of the best points so far, sorted
+        best = []
+        bestDist = float("inf")
+        # (node, squared distance to the node's side of the split)
+        stack = [(self.root, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if node < 0 or bound >= bestDist:
+                continue
+            index, axis, left, right = self.nodes[node]
+            dist = dist_sq(point, self.points[index])
+            if dist < bestDist:
+                bisect.insort(best, (dist, index))
+                if len(best) > count:
+                    best.pop()
+                if len(best) == count:
+                    bestDist = best[-1][0]
+            diff = point[axis] - self.points[index][axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # The near side is searched first so the far side is usually skipped
+            stack.append((far, diff * diff))
+            stack.append((near, 0.0))
+        return [index for dist, index in best]
+
+
+class SurfaceIndex:
+    """
+    A sampled nurbsSurface that finds the closest parameters of points
+    """
+
+    def __init__(self, shape, samples=SAMPLES):
+        self.shape = shape
+        self.samples = samples
+        self.fn = get_fn(shape)
+        self.key = get_key(self.fn)
+        self.rangeU = self.fn.knotDomainInU
+        self.rangeV = self.fn.knotDomainInV
+
+        self.params = []
+        points = []
+        stepsU = self.fn.numSpansInU * samples
+        stepsV = self.fn.numSpansInV * samples
+        for i in range(stepsU + 1):
+            u = self.rangeU[0] + (self.rangeU[1] - self.rangeU[0]) * i / float(stepsU)
+            for j in range(stepsV + 1):
+                v = self.rangeV[0] + (self.rangeV[1] - self.rangeV[0]) * j / float(stepsV)
+                pos = self.fn.getPointAtParam(u, v, om.MSpace.kWorld)
+                self.params.append((u, v))
+                points.append((pos[0], pos[1], pos[2]))
+        self.tree = KDTree(points)
+
+    def is_current(self):
+        """
+        Check if the surface still matches the index
+        """
+        return is_current(self)
+
+    def refine(self, point, u, v):
+        """
+        Move a parameter guess to the closest point on the surface (Gauss-Newton steps
+        on the distance, kept inside the surface's domain)
+        """
+        for step in range(REFINE_STEPS):
+            pos, dU, dV = self.fn.getDerivativesAtParam(u, v, om.MSpace.kWorld)
+            diff = [pos[i] - point[i] for i in range(3)]
+            uu = sum([dU[i] * dU[i] for i in range(3)])
+            uv = sum([dU[i] * dV[i] for i in range(3)])
+            vv = sum([dV[i] * dV[i] for i in range(3)])
+            gu = sum([diff[i] * dU[i] for i in range(3)])
+            gv = sum([diff[i] * dV[i] for i in range(3)])
+            det = uu * vv - uv * uv
+            if abs(det) < 1e-12:
+                # Degenerate spot (a pole or a collapsed edge), keep the guess
+                break
+            du = (uv * gv - vv * gu) / det
+            dv = (uv * gu - uu * gv) / det
+            newU = min(max(u + du, self.rangeU[0]), self.rangeU[1])
+            newV = min(max(v + dv, self.rangeV[0]), self.rangeV[1])
+            done = abs(newU - u) < TOLERANCE and abs(newV - v) < TOLERANCE
+            u = newU
+            v = newV
+            if done:
+                break
+        return u, v
+
+    def closest_param(self, point):
+        """
+        Get the (u, v) of the surface point closest to a world space point
+        """
+        best = None
+        bestDist = float("inf")
+        for sample in self.tree.nearest(point, STARTS):
+            # Nearby samples can sit on another fold of the surface, refine them all
+            u, v = self.refine(point, *self.params[sample])
+            dist = dist_sq(point, self.fn.getPointAtParam(u, v, om.MSpace.kWorld))
+            if dist < bestDist:
+                best = (u, v)
+                bestDist = dist
+        return best
+
+    def closest_params(self, points):
+        """
+        Get the closest (u, v) of every point in one pass over the index
+        """
+        return [self.closest_param(point) for point in points]
+
+
+class LengthTable:
+    """
+    Arc length along the iso-curve of a nurbsSurface at every sampled u parameter
+    """
+
+    def __init__(self, shape, v=0.5, samples=LENGTH_SAMPLES):
+        self.shape = shape
+        self.v = v
+        self.samples = samples
+        self.fn = get_fn(shape)
+        self.key = get_key(self.fn)
+        rangeU = self.fn.knotDomainInU
+        rangeV = self.fn.knotDomainInV
+        # v is a fraction of the surface's v range like the rivets' v values
+        param = rangeV[0] + (rangeV[1] - rangeV[0]) * v
+
+        self.params = []
+        self.lengths = []
+        steps = self.fn.numSpansInU * samples
+        prev = None
+        length = 0.0
+        for i in range(steps + 1):
+            u = rangeU[0] + (rangeU[1] - rangeU[0]) * i / float(steps)
+            pos = self.fn.getPointAtParam(u, param, om.MSpace.kWorld)
+            if prev is not None:
+                length += math.sqrt(dist_sq(pos, prev))
+            self.params.append(u)
+            self.lengths.append(length)
+            prev = pos
+        self.length = length
+
+    def is_current(self):
+        """
+        Check if the surface still matches the table
+        """
+        return is_current(self)
+
+    def params_at(self, lengths):
+        """
+        Get the u parameter at every distance along the iso-curve, sorting the
+        distances so the whole list is resolved in one walk over the table
+        """
+        params = [None] * len(lengths)
+        seg = 1
+        last = len(self.lengths) - 1
+        for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            length = min(max(lengths[i], 0.0), self.length)
+            while seg < last and self.lengths[seg] < length:
+                seg += 1
+            start = self.lengths[seg - 1]
+            span = self.lengths[seg] - start
+            frac = (length - start) / span if span > 0 else 0.0
+            params[i] = self.params[seg - 1] + (self.params[seg] - self.params[seg - 1]) * frac
+        return params
+
+    def param_at(self, length):
+        """
+        Get the u parameter a distance along the iso-curve
+        """
+        return self.params_at([length])[0]
+
+    def spaced_params(self, count):
+        """
+        Get the u parameters of count points spaced evenly in world space along the
+        iso-curve, ends included
+        """
+        if count < 2:
+            return self.params_at([0.0] * count)
+        step = self.length / (count - 1.0)
+        return self.params_at([i * step for i in range(count)])
@@ -0,0 +1,241 @@
+###########################################################################################
+#
+#   Title: Spec Tools
+#
+#   Descritpion: Builds many ribbons and matrix constraints from a single declarative
+#       spec. Instead of building one ribbon after the other, every stage runs across
+#       all the rigs before moving on (all proxies, then all surfaces, then all rivets,
+#       then all skins...) and the math that doesn't need Maya (proxy positions, ribbon
+#       widths and skin weights) is worked out up front, once per ribbon layout
+#
+#    Instructions: write a JSON (or YAML, if PyYAML is installed) spec:
+#           {"ribbons": [{"name": "spine", "jointNum": 7, "driverJointNum": 3,
+#                         "primaryAxis": "Y", "pin": true, "translate": [0, 100, 0],
+#                         "rotate": [0, 0, 0], "lengths": [15, 15]}],
+#            "constraints": [{"drivers": ["chest_ctl"], "driven": "spine_tip_driver_jnt",
+#                             "type": "parent", "mo": true}]}
+#
+#       then build it (var = Pipeline(load_spec(path))) with var.build(), which returns
+#       a result for every ribbon and constraint plus the time spent in each stage
+#
+#       - lengths are the distances between driver proxies along the primary axis
+#           (defaults to 10 each) and translate/rotate place the base proxy
+#       - constraints take the same options as ConstraintBatch specs and are built
+#           once all the ribbons exist
+#       - Pipeline(spec, plan=True) creates every utility node and connection in one
+#           transaction through a buildtools.BuildPlan (or pass your own BuildPlan).
+#           Pipeline(spec, plan=True, backend=scene) flushes it into another backend
+#           instead of Maya's modifiers (the headless Scene or a LocalGraph)
+#       - the widths and weight tables worked out up front are handed to the ribbons,
+#           which use them instead of measuring or looking them up again
+#
+###########################################################################################
+
+import json
+from timeit import default_timer
+
+import maya.cmds as mc
+from matrixtools import buildtools as bt
+from matrixtools import matrixconstrainttools as mt
+from matrixtools import ribbontools as rt
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+AXES = ["X", "Y", "Z"]
+# Stage name and the Ribbon methods it runs for every ribbon, in build_ribbon_rig order
+STAGES = [("surfaces", ["mk_ribbon", "mk_len_crv"]),
+          ("rivets", ["mk_rig"]),
+          ("deformers", ["mk_twist"]),
+          ("drivers", ["mk_driver_joints", "mv_ribbon", "orient_to_axis"]),
+          ("skins", ["skin_to_drivers"]),
+          ("finish", ["align_to_proxies", "set_preserve_vol"])]
+
+
+def load_spec(path):
+    """
+    Read a JSON or YAML spec file
+    """
+    with open(path) as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError("PyYAML is needed to read {}".format(path))
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def check_spec(spec):
+    """
+    List everything wrong with a spec (an empty list means it can be built)
+    """
+    errors = []
+    names = set()
+    for i, rib in enumerate(spec.get("ribbons", [])):
+        name = rib.get("name")
+        if not name:
+            errors.append("ribbon {} has no name".format(i))
+            continue
+        if name in names:
+            errors.append("{} is used by more than one ribbon".format(name))
+        names.add(name)
+        jointNum = rib.get("jointNum", 3)
+        driverJointNum = rib.get("driverJointNum", 2)
+        if jointNum < 3 or driverJointNum < 2:
+            errors.append("{} needs a minimum of 2 drivers and 3 joints".format(name))
+        if rib.get("primaryAxis", "X") not in AXES:
+            errors.append("{} has an invalid primaryAxis".format(name))
+        lengths = rib.get("lengths")
+        if lengths is not None and len(lengths) != driverJointNum - 1:
+            errors.append("{} needs {} lengths".format(name, driverJointNum - 1))
+
+    for i, con in enumerate(spec.get("constraints", [])):
+        if not con.get("drivers") or not con.get("driven"):
+            errors.append("constraint {} needs drivers and a driven object".format(i))
+        if con.get("type", "parent") not in mt.BATCH_TYPES:
+            errors.append("constraint {} has an unknown type: {}".format(i, con.get("type")))
+    return errors
+
+
+def precompute(rib):
+    """
+    Work out everything about a ribbon spec that doesn't need Maya. Ribbons sharing a
+    layout share one memoized weight table
+    """
+    jointNum = rib.get("jointNum", 3)
+    driverJointNum = rib.get("driverJointNum", 2)
+    spans = (jointNum - 1) * (driverJointNum - 1)
+    lengths = [float(l) for l in rib.get("lengths") or [10.0] * (driverJointNum - 1)]
+
+    return {"name": rib["name"], "spans": spans, "lengths": lengths,
+            "width": sum(lengths),
+            "weights": rt.get_weight_table(spans, driverJointNum)}
+
+
+class Pipeline:
+    """
+    Builds every ribbon and constraint of a spec one stage at a time
+    """
+
+    def __init__(self, spec, plan=False, backend=None):
+        self.spec = spec
+        if plan is True:
+            plan = bt.BuildPlan(backend)
+        self.plan = plan or None
+        self.registry = None
+        self.ribbons = []
+        self.results = {}
+        self.timings = {}
+
+    def run_precompute(self):
+        """
+        Precompute every ribbon. It's a few sums and table lookups, so it runs in
+        Maya's own process
+        """
+        return [precompute(rib) for rib in self.spec.get("ribbons", [])]
+
+    def mk_proxies(self, data):
+        """
+        Create the proxies of every ribbon and put them in place
+        """
+        for rib, item in zip(self.spec.get("ribbons", []), data):
+            result = {"name": rib["name"], "status": "ok", "message": "", "joints": []}
+            self.results[rib["name"]] = result
+            try:
+                ribbon = rt.Ribbon(rib["name"], rib.get("jointNum", 3),
+                                   rib.get("driverJointNum", 2),
+                                   rib.get("primaryAxis", "X"), rib.get("pin", False))
+            except RuntimeError as e:
+                result["status"] = "error"
+                result["message"] = str(e)
+                continue
+
+            axis = ribbon.primaryAxis
+            base = ribbon.proxies[0]
+            if "translate" in rib:
+                mc.setAttr("{}.translate".format(base), *rib["translate"])
+            if "rotate" in rib:
+                mc.setAttr("{}.rotate".format(base), *rib["rotate"])
+            for prxy, length in zip(ribbon.proxies[1:], item["lengths"]):
+                mc.setAttr("{}.translate{}".format(prxy, axis), length)
+
+            # The precomputed values replace the ribbon's own lookups
+            ribbon.width = item["width"]
+            ribbon.weights = item["weights"]
+            # Every builder shares one registry that's saved once at the end
+            ribbon.plan = self.plan
+            ribbon.registry = self.registry
+            ribbon.deferSave = True
+            self.ribbons.append(ribbon)
+
+    def run_stage(self, methods):
+        """
+        Run one stage's methods for every ribbon that hasn't failed yet
+        """
+        for ribbon in self.ribbons:
+            result = self.results[ribbon.name]
+            if result["status"] == "error":
+                continue
+            try:
+                for method in methods:
+                    if ribbon.ribbon:
+                        # Each ribbon's steps expect their own ribbon to be selected
+                        ribbon.select(ribbon.ribbon)
+                    getattr(ribbon, method)()
+            except RuntimeError as e:
+                result["status"] = "error"
+                result["message"] = "{}: {}".format(method, e)
+
+    def mk_constraints(self):
+        """
+        Build every constraint of the spec as one batch
+        """
+        batch = mt.ConstraintBatch(plan=self.plan, registry=self.registry)
+        for con in self.spec.get("constraints", []):
+            batch.add(con["drivers"], con["driven"], con.get("type", "parent"),
+                      con.get("mo", True), con.get("opm", False), con.get("blendMtrx", False))
+        return batch.build()
+
+    def time_stage(self, name, func, *args):
+        """
+        Run a stage and record how long it took
+        """
+        start = default_timer()
+        value = func(*args)
+        self.timings[name] = default_timer() - start
+        return value
+
+    def build(self):
+        """
+        Build the whole spec and return the results of every ribbon and constraint
+        """
+        errors = check_spec(self.spec)
+        if errors:
+            raise RuntimeError("; ".join(errors))
+
+        self.ribbons = []
+        self.results = {}
+        self.timings = {}
+        self.registry = mt.NodeRegistry()
+
+        data = self.time_stage("precompute", self.run_precompute)
+        self.time_stage("proxies", self.mk_proxies, data)
+        for name, methods in STAGES:
+            self.time_stage(name, self.run_stage, methods)
+
+        for ribbon in self.ribbons:
+            self.results[ribbon.name]["joints"] = ribbon.joints
+
+        conResults = []
+        if self.spec.get("constraints"):
+            # The batch flushes the plan (if any) and saves the shared registry
+            conResults = self.time_stage("constraints", self.mk_constraints)
+        elif self.plan is not None:
+            self.plan.callbacks.append(self.registry.flushed)
+            self.time_stage("flush", self.plan.flush)
+        else:
+            self.registry.save()
+
+        return {"ribbons": [self.results[rib["name"]] for rib in self.spec.get("ribbons", [])],
+                "constraints": conResults, "timings": self.timings}
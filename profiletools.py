@@ -0,0 +1,218 @@
+###########################################################################################
+#
+#   Title: Profile Tools
+#
+#   Descritpion: Opt-in profiling of the cmds calls the tools make. While active, the mc
+#       module of matrixconstrainttools, ribbontools and fkiktools is swapped for a proxy
+#       that times every call and attributes it to the builder methods it was made from
+#       (mk_ribbon, mk_rig, set_preserve_vol...)
+#
+#    Instructions: wrap any build in a Profiler:
+#           with profiletools.Profiler() as prof:
+#               matrixtools.Ribbon("arm").build_ribbon_rig()
+#           print(prof.report())
+#
+#       - prof.get_methods() gives calls and time per builder method, both for the calls
+#           it made itself and including the methods it called
+#       - prof.save_json(path) exports the methods and every call stack
+#       - prof.save_folded(path) exports the stacks in the folded format flame graph
+#           tools (flamegraph.pl, speedscope, inferno) read
+#
+###########################################################################################
+
+import inspect
+import json
+import os
+import sys
+from timeit import default_timer
+
+MODULES = ["matrixtools.matrixconstrainttools", "matrixtools.ribbontools",
+           "matrixtools.fkiktools"]
+
+
+class CmdsProxy:
+    """
+    Stands in for maya.cmds, timing every command and handing it to a profiler
+    """
+
+    def __init__(self, cmds, profiler):
+        self.cmds = cmds
+        self.profiler = profiler
+        self.wrappers = {}
+
+    def __getattr__(self, cmd):
+        if cmd not in self.wrappers:
+            self.wrappers[cmd] = self.mk_wrapper(cmd)
+        return self.wrappers[cmd]
+
+    def mk_wrapper(self, cmd):
+        """
+        Wrap a single command
+        """
+        func = getattr(self.cmds, cmd)
+        if not callable(func):
+            return func
+        profiler = self.profiler
+
+        def wrapper(*args, **kwargs):
+            start = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(cmd, default_timer() - start)
+        wrapper.__name__ = cmd
+        return wrapper
+
+
+class Profiler:
+    """
+    Collects cmds calls per builder method call stack
+    """
+
+    def __init__(self, modules=None):
+        self.modules = modules or MODULES
+        self.files = {}
+        self.originals = {}
+        self.names = {}
+        self.stacks = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """
+        Swap the mc module of every profiled module that has been imported
+        """
+        for name in self.modules:
+            module = sys.modules.get(name)
+            if module is None or name in self.originals:
+                continue
+            self.originals[name] = module.mc
+            module.mc = CmdsProxy(module.mc, self)
+            self.files[self.get_path(module.__file__)] = name
+
+    def stop(self):
+        """
+        Put the original mc modules back
+        """
+        for name, cmds in self.originals.items():
+            sys.modules[name].mc = cmds
+        self.originals = {}
+
+    def clear(self):
+        """
+        Forget everything recorded so far
+        """
+        self.stacks = {}
+
+    def get_path(self, path):
+        """
+        Compare source and compiled files by their path without extension
+        """
+        return os.path.abspath(path).rsplit(".", 1)[0]
+
+    def get_name(self, frame):
+        """
+        Name a frame after the class that defines its method (Rivet.mk_rivet even when
+        called on a Ribbon), or after its module for plain functions. Frames outside the
+        profiled modules return None
+        """
+        code = frame.f_code
+        if code in self.names:
+            return self.names[code]
+
+        module = self.files.get(self.get_path(code.co_filename))
+        name = None
+        if module is not None:
+            name = "{}.{}".format(module, code.co_name)
+            obj = frame.f_locals.get("self")
+            # getmro also walks old-style classes on Python 2
+            for cls in inspect.getmro(obj.__class__) if obj is not None else []:
+                func = cls.__dict__.get(code.co_name)
+                if getattr(func, "__code__", None) is code:
+                    name = "{}.{}".format(cls.__name__, code.co_name)
+                    break
+        self.names[code] = name
+        return name
+
+    def record(self, cmd, elapsed):
+        """
+        Add a call to the stack of builder methods it was made from
+        """
+        stack = ["mc.{}".format(cmd)]
+        frame = sys._getframe(1)
+        while frame is not None:
+            name = self.get_name(frame)
+            if name is not None:
+                stack.append(name)
+            frame = frame.f_back
+        stack = tuple(reversed(stack))
+
+        entry = self.stacks.setdefault(stack, [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def get_methods(self):
+        """
+        Get the calls and time per builder method. "calls" and "time" include everything
+        the method's callees did, "selfCalls" and "selfTime" only its own cmds calls
+        """
+        methods = {}
+        for stack, (count, elapsed) in self.stacks.items():
+            callers = stack[:-1]
+            for name in set(callers):
+                # Recursion must not count the same call twice
+                stats = methods.setdefault(name, {"calls": 0, "time": 0.0, "selfCalls": 0,
+                                                  "selfTime": 0.0, "cmds": {}})
+                stats["calls"] += count
+                stats["time"] += elapsed
+            if callers:
+                stats = methods[callers[-1]]
+                stats["selfCalls"] += count
+                stats["selfTime"] += elapsed
+                stats["cmds"][stack[-1]] = stats["cmds"].get(stack[-1], 0) + count
+        return methods
+
+    def report(self, limit=20):
+        """
+        Format the most expensive builder methods as a table
+        """
+        methods = self.get_methods()
+        lines = ["{:<40} {:>8} {:>10} {:>8} {:>10}".format(
+            "method", "calls", "time (ms)", "self", "self (ms)")]
+        for name in sorted(methods, key=lambda n: -methods[n]["time"])[:limit]:
+            m = methods[name]
+            lines.append("{:<40} {:>8} {:>10.2f} {:>8} {:>10.2f}".format(
+                name, m["calls"], m["time"] * 1000, m["selfCalls"], m["selfTime"] * 1000))
+        return "\n".join(lines)
+
+    def to_dict(self):
+        """
+        Everything recorded, ready to be written as JSON
+        """
+        stacks = [{"stack": list(stack), "calls": count, "time": elapsed}
+                  for stack, (count, elapsed) in sorted(self.stacks.items())]
+        return {"methods": self.get_methods(), "stacks": stacks}
+
+    def to_folded(self, weight="time"):
+        """
+        Format the stacks as folded lines ("a;b;c value"), weighted by microseconds or
+        by number of calls
+        """
+        lines = []
+        for stack, (count, elapsed) in sorted(self.stacks.items()):
+            value = int(round(elapsed * 1e6)) if weight == "time" else count
+            lines.append("{} {}".format(";".join(stack), value))
+        return "\n".join(lines)
+
+    def save_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1, sort_keys=True)
+
+    def save_folded(self, path, weight="time"):
+        with open(path, "w") as f:
+            f.write(self.to_folded(weight) + "\n")
@@ -0,0 +1,59 @@
+"""
+Shared fixtures: the tests run the tools against the headless stand-in
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import headlesstools  # noqa: E402
+
+# The tools bind maya.cmds when they're imported so the stand-in goes in first
+headlesstools.install()
+
+
+@pytest.fixture
+def scene():
+    """
+    An empty stand-in scene
+    """
+    return headlesstools.new_scene()
+
+
+@pytest.fixture
+def mc():
+    return sys.modules["maya.cmds"]
+
+
+def mk_transform(mc, name, translate=(0.0, 0.0, 0.0), rotate=(0.0, 0.0, 0.0), parent=None):
+    """
+    Create a transform at a pose
+    """
+    node = mc.createNode("transform", n=name)
+    mc.setAttr("{}.translate".format(node), *translate)
+    mc.setAttr("{}.rotate".format(node), *rotate)
+    if parent is not None:
+        mc.parent(node, parent)
+    return node
+
+
+def get_network(scene, values=False):
+    """
+    Every node (but the registry) with its type, and every connection. With values the
+    nodes also hold their set attribute values
+    """
+    from matrixtools import matrixconstrainttools as mt
+
+    nodes = dict([(name, (node.type, node.attrs) if values else node.type)
+                  for name, node in scene.nodes.items() if name != mt.REGISTRY])
+    return nodes, dict(scene.conns)
+
+
+def get_world(mc, obj):
+    return mc.getAttr("{}.worldMatrix".format(obj))
+
+
+def assert_matrix(a, b, tolerance=1e-6):
+    assert max([abs(x - y) for x, y in zip(a, b)]) <= tolerance, (a, b)
@@ -0,0 +1,74 @@
+from matrixtools import baketools
+from matrixtools import matrixconstrainttools as mt
+
+from tests.conftest import assert_matrix, get_world, mk_transform
+
+FRAMES = list(range(1, 11))
+
+
+def mk_driver(mc):
+    driver = mk_transform(mc, "A")
+    for attr, values in [("translateX", (0.0, 10.0)), ("rotateZ", (0.0, 90.0))]:
+        for frame, value in zip([FRAMES[0], FRAMES[-1]], values):
+            mc.setKeyframe(driver, attribute=attr, t=frame, v=value)
+    return driver
+
+
+def get_worlds(mc, objs):
+    worlds = []
+    for frame in FRAMES:
+        mc.currentTime(frame)
+        worlds.append([get_world(mc, obj) for obj in objs])
+    return worlds
+
+
+def check_bake(mc, objs, baker):
+    before = get_worlds(mc, objs)
+    curves = baker.bake()
+    for frame, expected, baked in zip(FRAMES, before, get_worlds(mc, objs)):
+        for a, b in zip(expected, baked):
+            assert_matrix(a, b)
+    return curves
+
+
+def test_bake_keeps_sibling_input(scene, mc):
+    """
+    An axis animated on top of an offsetParentMatrix drive gets its curve replaced
+    """
+    mk_driver(mc)
+    mk_transform(mc, "B", (1.0, 2.0, 0.0))
+    mt.Constraint(mo=True, opm=True).point(["A"], "B")
+    mc.setKeyframe("B", attribute="translateY", t=FRAMES[0], v=0.0)
+    mc.setKeyframe("B", attribute="translateY", t=FRAMES[-1], v=5.0)
+    curves = check_bake(mc, ["B"], baketools.Baker(None, FRAMES[0], FRAMES[-1]))
+    assert len(curves["B"]) == 9
+    assert mc.getAttr("B.offsetParentMatrix") == [float(i % 5 == 0) for i in range(16)]
+
+
+def test_bake_static_offset_parent_matrix(scene, mc):
+    """
+    A static offsetParentMatrix stays and isn't baked into the channels a second time
+    """
+    mk_driver(mc)
+    mk_transform(mc, "C")
+    offset = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 3.0, 4.0, 5.0, 1.0]
+    mc.setAttr("C.offsetParentMatrix", *offset, type="matrix")
+    mt.Constraint(mo=True).parent(["A"], "C")
+    check_bake(mc, ["C"], baketools.Baker(["C"], FRAMES[0], FRAMES[-1]))
+    assert mc.getAttr("C.offsetParentMatrix") == offset
+
+
+def test_bake_only_constraint_networks(scene, mc):
+    """
+    Without objects only what the constraint networks drive is baked, not every
+    blendColors of the scene
+    """
+    mk_driver(mc)
+    mk_transform(mc, "D")
+    mt.Constraint(mo=False).parent(["A"], "D")
+    mk_transform(mc, "E")
+    mc.createNode("blendColors", n="stray_bc")
+    mc.connectAttr("stray_bc.output", "E.translate")
+    curves = check_bake(mc, ["D", "E"], baketools.Baker(None, FRAMES[0], FRAMES[-1]))
+    assert list(curves) == ["D"]
+    assert mc.connectionInfo("E.translate", sfd=True) == "stray_bc.output"
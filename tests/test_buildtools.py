@@ -0,0 +1,80 @@
+from matrixtools import buildtools as bt
+from matrixtools import matrixconstrainttools as mt
+
+from tests.conftest import assert_matrix, get_network, get_world, mk_transform
+
+
+def build(scene, drivers, reconcile=False, driven="D", mo=True):
+    """
+    Parent constrain D to the drivers through a plan
+    """
+    builder = mt.Constraint(mo=mo)
+    builder.plan = bt.BuildPlan(scene, reconcile=reconcile)
+    builder.parent(drivers, driven)
+    builder.plan.flush()
+    return builder.plan.report
+
+
+def mk_scene(mc, scene):
+    scene.reset()
+    mk_transform(mc, "A", (5.0, 0.0, 0.0))
+    mk_transform(mc, "B", (0.0, 4.0, 0.0), (0.0, 0.0, 45.0))
+    mk_transform(mc, "D", (1.0, 1.0, 1.0))
+
+
+def test_reconcile_drop_driver(scene, mc):
+    """
+    Going from two drivers to one leaves the same scene as building one driver fresh
+    """
+    mk_scene(mc, scene)
+    build(scene, ["A", "B"])
+    report = build(scene, ["A"], reconcile=True)
+    reconciled = get_network(scene)
+    world = get_world(mc, "D")
+
+    mk_scene(mc, scene)
+    build(scene, ["A"])
+    assert reconciled == get_network(scene)
+    assert_matrix(world, get_world(mc, "D"))
+    # The second driver's multMatrix, the blend and its weight
+    assert report["deleted"] == 3
+
+
+def test_reconcile_add_driver(scene, mc):
+    mk_scene(mc, scene)
+    build(scene, ["A"])
+    report = build(scene, ["A", "B"], reconcile=True)
+    reconciled = get_network(scene)
+
+    mk_scene(mc, scene)
+    build(scene, ["A", "B"])
+    assert reconciled == get_network(scene)
+    assert report["deleted"] == 0
+    assert report["reused"] == 3
+
+
+def test_reconcile_unchanged(scene, mc):
+    mk_scene(mc, scene)
+    build(scene, ["A", "B"])
+    report = build(scene, ["A", "B"], reconcile=True)
+    assert report["created"] == report["connected"] == report["deleted"] == 0
+
+
+def test_reconcile_keeps_shared_nodes(scene, mc):
+    """
+    A node another object's network still uses isn't deleted with the one that dropped it
+    """
+    mk_scene(mc, scene)
+    mk_transform(mc, "E", (2.0, 2.0, 0.0))
+    build(scene, ["A"], driven="E", mo=False)
+    world = get_world(mc, "E")
+    # Without an offset D gets the very same decompose network as E
+    build(scene, ["A"], mo=False)
+    assert scene.conns["D.translate"] == "E_decM.outputTranslate"
+
+    report = build(scene, ["B"], reconcile=True, mo=False)
+    assert report["deleted"] == 0
+    assert "E_decM" in scene.nodes and "E_q2e" in scene.nodes
+    assert scene.conns["E_decM.inputMatrix"] == "A.worldMatrix[0]"
+    assert_matrix(world, get_world(mc, "E"))
+    assert_matrix(get_world(mc, "D")[12:15], [0.0, 4.0, 0.0])
@@ -0,0 +1,33 @@
+import pytest
+
+from matrixtools import fkiktools
+
+
+def build_limb(mc, ctrlPos, **options):
+    """
+    Solve a three joint limb of 2 units along X towards a controller, pole on +Y
+    """
+    parent = None
+    for i in range(3):
+        kwargs = {} if parent is None else {"p": parent}
+        parent = mc.createNode("joint", n="jnt{}".format(i), **kwargs)
+        mc.setAttr("{}.translate".format(parent), 1.0 if i else 0.0, 0.0, 0.0)
+    mc.createNode("transform", n="ctrl")
+    mc.createNode("transform", n="pole")
+    mc.setAttr("ctrl.translate", *ctrlPos)
+    mc.setAttr("pole.translate", 1.0, 3.0, 0.0)
+    fkiktools.FKIK(**options).build([("jnt0", None, "ctrl", "pole")])
+
+
+def test_soft_exponent_clamped(scene, mc):
+    """
+    A controller far inside the soft zone start (no softness) doesn't overflow e^x
+    """
+    np = pytest.importorskip("numpy")
+    from matrixtools import evaltools
+
+    build_limb(mc, (0.2, 0.0, 0.0), soft=True)
+    with np.errstate(over="raise", invalid="raise"):
+        result = evaltools.Evaluator(evaltools.from_scene()).evaluate({})
+    for value in result.values():
+        assert np.isfinite(value).all()
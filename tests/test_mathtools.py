@@ -0,0 +1,57 @@
+import math
+
+import pytest
+
+from matrixtools import mathtools
+
+from tests.conftest import assert_matrix
+
+# Rotated, non-uniformly scaled, sheared and mirrored
+SHEARED = [[0.9, 0.3, -0.2, 0.0],
+           [0.8, 2.1, 0.4, 0.0],
+           [-0.5, 0.7, -1.6, 0.0],
+           [3.0, -2.0, 5.0, 1.0]]
+
+
+def flat(rows):
+    return [v for row in rows for v in row]
+
+
+def test_decompose_compose_round_trip():
+    parts = mathtools.decompose(SHEARED)
+    assert_matrix(flat(mathtools.compose(*parts)), flat(SHEARED), 1e-12)
+
+
+def test_decompose_rotation_is_orthonormal():
+    translate, rot, scale, shear = mathtools.decompose(SHEARED)
+    for r in range(3):
+        for c in range(3):
+            assert mathtools.dot(rot[r], rot[c]) == pytest.approx(float(r == c))
+    assert mathtools.determinant(rot) == pytest.approx(1.0)
+    assert translate == [3.0, -2.0, 5.0]
+    # The mirrored axis is carried in the scale
+    assert min(scale) < 0
+
+
+def test_decompose_plain_transform():
+    angle = math.radians(30.0)
+    rows = [[2 * math.cos(angle), 2 * math.sin(angle), 0.0, 0.0],
+            [-math.sin(angle), math.cos(angle), 0.0, 0.0],
+            [0.0, 0.0, 3.0, 0.0],
+            [1.0, 2.0, 3.0, 1.0]]
+    translate, rot, scale, shear = mathtools.decompose(rows)
+    assert_matrix(scale, [2.0, 1.0, 3.0])
+    assert_matrix(shear, [0.0, 0.0, 0.0])
+    assert_matrix(flat(rot), [math.cos(angle), math.sin(angle), 0.0,
+                              -math.sin(angle), math.cos(angle), 0.0, 0.0, 0.0, 1.0])
+
+
+def test_decompose_numpy_matches_floats():
+    np = pytest.importorskip("numpy")
+    stack = np.array([SHEARED, np.eye(4).tolist()])
+    rows = [[stack[:, r, c] for c in range(4)] for r in range(4)]
+    parts = mathtools.decompose(rows)
+    single = mathtools.decompose(SHEARED)
+    for part, expected in zip(parts, single):
+        assert_matrix(np.ravel(np.array(part)[..., 0]).tolist(),
+                      np.ravel(np.array(expected)).tolist(), 1e-12)
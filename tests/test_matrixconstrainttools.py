@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+from matrixtools import buildtools as bt
+from matrixtools import matrixconstrainttools as mt
+
+from tests.conftest import assert_matrix, get_network, get_world, mk_transform
+
+
+def build_chain(mc, scene, plan):
+    """
+    A snaps B to it, then C keeps its offset to B
+    """
+    mk_transform(mc, "A", (5.0, 0.0, 0.0), (0.0, 30.0, 0.0))
+    mk_transform(mc, "B")
+    mk_transform(mc, "C", (1.0, 1.0, 1.0))
+    batch = mt.ConstraintBatch(plan=plan)
+    batch.add(["A"], "B", "parent", mo=False)
+    batch.add(["B"], "C", "parent", mo=True)
+    return batch.build()
+
+
+def test_chained_offset_direct(scene, mc):
+    build_chain(mc, scene, None)
+    assert_matrix(get_world(mc, "C")[12:15], [1.0, 1.0, 1.0])
+
+
+def test_chained_offset_plan(scene, mc):
+    """
+    The offset of C is measured from where the first spec puts B, not where B was
+    """
+    results = build_chain(mc, scene, bt.BuildPlan(scene))
+    assert [result["status"] for result in results] == ["ok", "ok"]
+    assert_matrix(get_world(mc, "B")[12:15], [5.0, 0.0, 0.0])
+    assert_matrix(get_world(mc, "C")[12:15], [1.0, 1.0, 1.0])
+
+
+def test_chained_child_offset_plan(scene, mc):
+    """
+    Objects below a driven object move with it too
+    """
+    mk_transform(mc, "A", (0.0, 3.0, 0.0))
+    mk_transform(mc, "B")
+    mk_transform(mc, "B_child", (2.0, 0.0, 0.0), parent="B")
+    mk_transform(mc, "C", (1.0, 1.0, 1.0))
+    batch = mt.ConstraintBatch(plan=bt.BuildPlan(scene))
+    batch.add(["A"], "B", "point", mo=False)
+    batch.add(["B_child"], "C", "parent", mo=True)
+    batch.build()
+    assert_matrix(get_world(mc, "C")[12:15], [1.0, 1.0, 1.0])
+
+
+# (builder options, constraint type, drivers)
+SPECS = [({"mo": True}, "parent", ["A"]),
+         ({"mo": False}, "point", ["A", "B"]),
+         ({"mo": True}, "orient", ["A", "B"]),
+         ({"mo": True, "blendMtrx": True}, "parent", ["A", "B"]),
+         ({"mo": False, "opm": True}, "parent", ["A", "B"])]
+
+
+def mk_drivers(mc):
+    mk_transform(mc, "A", (5.0, 0.0, 0.0), (0.0, 30.0, 0.0))
+    mk_transform(mc, "B", (0.0, 4.0, 0.0), (0.0, 0.0, 45.0))
+    mk_transform(mc, "D", (1.0, 1.0, 1.0), (10.0, 0.0, 0.0))
+
+
+@pytest.mark.parametrize("options, conType, drivers", SPECS)
+def test_plan_matches_direct(scene, mc, options, conType, drivers):
+    """
+    Building through a plan gives the same nodes, connections and pose as building
+    directly
+    """
+    mk_drivers(mc)
+    getattr(mt.Constraint(**options), conType)(drivers, "D")
+    direct = get_network(scene, True)
+    world = get_world(mc, "D")
+
+    scene.reset()
+    mk_drivers(mc)
+    builder = mt.Constraint(**options)
+    builder.plan = bt.BuildPlan(scene)
+    getattr(builder, conType)(drivers, "D")
+    builder.plan.flush()
+    assert get_network(scene, True) == direct
+    assert_matrix(get_world(mc, "D"), world)
+
+
+def test_chained_plan_matches_direct(scene, mc):
+    build_chain(mc, scene, None)
+    direct = get_network(scene, True)
+    worlds = [get_world(mc, obj) for obj in ["B", "C"]]
+
+    scene.reset()
+    build_chain(mc, scene, bt.BuildPlan(scene))
+    assert get_network(scene, True) == direct
+    for obj, world in zip(["B", "C"], worlds):
+        assert_matrix(get_world(mc, obj), world)
+
+
+def test_registry_round_trip(scene, mc):
+    """
+    A saved registry loads back with its entries and owners, minus deleted nodes
+    """
+    mk_drivers(mc)
+    builder = mt.Constraint(mo=True)
+    builder.parent(["A", "B"], "D")
+    registry = mt.NodeRegistry()
+    assert registry.entries
+    assert registry.owners["D"]
+
+    node = sorted(registry.entries.values())[0]
+    mc.delete(node)
+    loaded = mt.NodeRegistry()
+    assert loaded.entries == dict([(key, value) for key, value in registry.entries.items()
+                                   if value != node])
+    assert loaded.owners["D"] == [owned for owned in registry.owners["D"] if owned != node]
+
+    # Registries saved before owners were recorded are a plain table of entries
+    mc.setAttr("{}{}".format(mt.REGISTRY, mt.REGISTRY_ATTR),
+               json.dumps(loaded.entries), type="string")
+    old = mt.NodeRegistry()
+    assert old.entries == loaded.entries
+    assert old.owners == {}
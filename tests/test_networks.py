@@ -0,0 +1,78 @@
+"""
+Pinned results of the constraint networks, worked out by the stand-in and the evaluator
+through the same mathtools decomposition
+"""
+import pytest
+
+from matrixtools import matrixconstrainttools as mt
+
+from tests.conftest import assert_matrix, mk_transform
+
+# (mo, type, drivers, builder options, driven translate, driven rotate). Channels the
+# constraint doesn't drive are None
+NETWORKS = [
+    (False, "parent", ["A"], {}, [2.0, 1.0, -1.0], [0.0, 40.0, 10.0]),
+    (False, "point", ["A"], {}, [2.0, 1.0, -1.0], None),
+    (False, "orient", ["A"], {}, None, [0.0, 40.0, 10.0]),
+    (False, "parent", ["A", "B"], {}, [1.0, 2.5, 3.0], [14.9837, 35.0, 10.0]),
+    (False, "parent", ["A", "B"], {"blendMtrx": True}, [1.0, 2.5, 3.0],
+     [10.3065, 34.9988, 10.5344]),
+    (False, "point", ["A", "B"], {}, [1.0, 2.5, 3.0], None),
+    (False, "orient", ["A", "B"], {"blendMtrx": True}, None, [10.3065, 34.9988, 10.5344]),
+    (True, "parent", ["A"], {}, [-1.6295, 2.0423, -2.043], [0.0, 0.0, 0.0]),
+    (True, "parent", ["A", "B"], {}, [-2.547, 0.4713, 0.3448], [-23.0605, 4.2675, -21.992]),
+    (True, "parent", ["A", "B"], {"blendMtrx": True}, [-2.547, 0.4713, 0.3448],
+     [-20.9477, 8.2366, -21.2535]),
+    (True, "orient", ["A", "B"], {"blendMtrx": True}, None, [-20.9477, 8.2366, -21.2535])]
+
+
+def build(mc, mo, conType, drivers, options):
+    """
+    Constrain D to a rotated driver and a rotated, non-uniformly scaled one (their
+    average is sheared), then move the drivers
+    """
+    mk_transform(mc, "A", (5.0, 0.0, 0.0), (0.0, 40.0, 10.0))
+    mk_transform(mc, "B", (0.0, 4.0, 7.0), (70.0, 0.0, 45.0))
+    mk_transform(mc, "D", (1.0, 2.0, 3.0), (10.0, 20.0, 30.0))
+    mc.setAttr("B.scale", 1.0, 3.0, 0.5)
+    getattr(mt.Constraint(mo=mo, **options), conType)(drivers, "D")
+    mc.setAttr("A.translate", 2.0, 1.0, -1.0)
+    mc.setAttr("B.rotate", 20.0, 30.0, 10.0)
+
+
+@pytest.mark.parametrize("mo, conType, drivers, options, translate, rotate", NETWORKS)
+def test_stand_in(scene, mc, mo, conType, drivers, options, translate, rotate):
+    build(mc, mo, conType, drivers, options)
+    for attr, expected in [("translate", translate), ("rotate", rotate)]:
+        if expected is not None:
+            assert_matrix(mc.getAttr("D.{}".format(attr))[0], expected, 1e-3)
+
+
+@pytest.mark.parametrize("mo, conType, drivers, options, translate, rotate", NETWORKS)
+def test_evaluator(scene, mc, mo, conType, drivers, options, translate, rotate):
+    pytest.importorskip("numpy")
+    from matrixtools import evaltools
+
+    build(mc, mo, conType, drivers, options)
+    result = evaltools.Evaluator(evaltools.from_scene()).evaluate({})
+    for attr, expected in [("translate", translate), ("rotate", rotate)]:
+        if expected is not None:
+            assert_matrix(list(result["D.{}".format(attr)][0]), expected, 1e-3)
+
+
+@pytest.mark.parametrize("mo, conType, drivers, options, translate, rotate", NETWORKS)
+def test_evaluator_matches_stand_in(scene, mc, mo, conType, drivers, options, translate,
+                                    rotate):
+    """
+    Every plug the network drives evaluates to what the stand-in computes, much closer
+    than the pinned results
+    """
+    np = pytest.importorskip("numpy")
+    from matrixtools import evaltools
+
+    build(mc, mo, conType, drivers, options)
+    result = evaltools.Evaluator(evaltools.from_scene()).evaluate({})
+    assert result
+    for plug, value in result.items():
+        expected = np.ravel(np.asarray(mc.getAttr(plug), dtype=float))
+        assert_matrix(list(np.ravel(value[0])), list(expected), 1e-6)
@@ -0,0 +1,54 @@
+from matrixtools import buildtools as bt
+from matrixtools import matrixconstrainttools as mt
+from matrixtools import optimizetools as ot
+
+from tests.conftest import mk_transform
+
+
+def test_identity_stages_only_settable(scene, mc):
+    """
+    An unconnected identity output or offsetParentMatrix isn't a constant, only the
+    identity offset attribute gets dropped
+    """
+    mk_transform(mc, "A", (5.0, 0.0, 0.0))
+    mk_transform(mc, "D")
+    mc.addAttr("D", ln="offsetA", at="matrix")
+    mc.setAttr("D.offsetA", *ot.IDENTITY, type="matrix")
+    mc.createNode("holdMatrix", n="hold")
+    mc.createNode("multMatrix", n="mult")
+    for i, src in enumerate(["D.offsetA", "hold.outMatrix", "A.worldMatrix[0]",
+                             "D.offsetParentMatrix"]):
+        mc.connectAttr(src, "mult.matrixIn[{}]".format(i))
+
+    report = ot.Optimizer(scene, ["mult"]).optimize()
+    assert report["stages"] == 1
+    assert sorted(scene.get_inputs("mult"), key=lambda conn: conn[1]) == [
+        ("hold.outMatrix", "mult.matrixIn[0]"), ("A.worldMatrix[0]", "mult.matrixIn[1]"),
+        ("D.offsetParentMatrix", "mult.matrixIn[2]")]
+
+
+def get_folded_graph():
+    """
+    A LocalGraph with a multDoubleLinear of two constants driving D.translateX
+    """
+    graph = bt.LocalGraph({"D": "transform", "mdl": "multDoubleLinear"})
+    graph.set_attr("mdl.input1", 2.0)
+    graph.set_attr("mdl.input2", 3.0)
+    graph.connect("mdl.output", "D.translateX")
+    return graph
+
+
+def test_forget_graph_registry(scene, mc):
+    """
+    Folding nodes of another graph updates the registry it's given and leaves the
+    scene's one alone
+    """
+    graph = get_folded_graph()
+    ot.Optimizer(graph, ["mdl"]).optimize()
+    assert graph.get_value("D.translateX") == 6.0
+    assert not mc.objExists(mt.REGISTRY)
+
+    registry = mt.NodeRegistry()
+    registry.add("key", "mdl")
+    ot.Optimizer(get_folded_graph(), ["mdl"], registry=registry).optimize()
+    assert registry.entries == {}
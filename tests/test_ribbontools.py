@@ -0,0 +1,37 @@
+import pytest
+
+from matrixtools import ribbontools as rt
+
+
+@pytest.mark.parametrize("spans, driverJointNum", [(4, 2), (8, 3), (11, 5)])
+def test_weight_table(spans, driverJointNum):
+    """
+    Every CV row is fully weighted between at most two neighbouring drivers, from the
+    first driver at the base to the last one at the tip
+    """
+    table = rt.get_weight_table(spans, driverJointNum)
+    assert len(table) == spans + 3
+    assert table[0][0] == 1.0
+    assert table[-1][-1] == 1.0
+    for row in table:
+        assert len(row) == driverJointNum
+        assert sum(row) == pytest.approx(1.0)
+        weighted = [i for i, wt in enumerate(row) if wt > 0.0]
+        assert weighted[-1] - weighted[0] <= 1
+
+
+def test_skin_weights(scene, mc):
+    """
+    The skinClusters of a built ribbon hold the weight table, one table row per CV row
+    """
+    ribbon = rt.Ribbon("rib", jointNum=5, driverJointNum=3)
+    ribbon.build_ribbon_rig()
+    table = rt.get_weight_table(ribbon.spans, 3)
+    scRib = "{}_sc".format(ribbon.ribbon)
+    scCrv = "{}_sc".format(ribbon.lenCurves[0])
+    for row, weights in enumerate(table):
+        for cv in range(rt.ROW_CVS):
+            assert mc.skinPercent(scRib, "{}.cv[{}][{}]".format(ribbon.ribbon, row, cv),
+                                  q=True) == pytest.approx(list(weights))
+        assert mc.skinPercent(scCrv, "{}.cv[{}]".format(ribbon.lenCurves[0], row),
+                              q=True) == pytest.approx(list(weights))
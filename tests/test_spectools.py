@@ -0,0 +1,48 @@
+from matrixtools import spectools as st
+
+from tests.conftest import get_network
+
+SPEC = {"ribbons": [{"name": "spine", "jointNum": 5, "driverJointNum": 3},
+                    {"name": "tail", "jointNum": 4, "translate": [0, 0, 10]}],
+        "constraints": [{"drivers": ["spine_tip_driver_jnt"],
+                         "driven": "tail_base_driver_jnt", "type": "parent", "mo": True}]}
+
+
+def test_plan_backend(scene, mc):
+    """
+    A planned pipeline flushes into the given backend and builds what a direct one does
+    """
+    result = st.Pipeline(SPEC).build()
+    direct = get_network(scene)
+
+    scene.reset()
+    planned = st.Pipeline(SPEC, plan=True, backend=scene).build()
+    assert [rib["status"] for rib in planned["ribbons"]] == ["ok", "ok"]
+    assert planned["constraints"] == result["constraints"]
+    assert get_network(scene) == direct
+
+
+class FlatPipeline(st.Pipeline):
+    """
+    Weights every CV row fully to the base driver
+    """
+
+    def run_precompute(self):
+        data = st.Pipeline.run_precompute(self)
+        for item in data:
+            count = len(item["weights"][0])
+            item["weights"] = tuple([(1.0,) + (0.0,) * (count - 1)] * len(item["weights"]))
+        return data
+
+
+def test_precomputed_weights(scene, mc):
+    """
+    The ribbons skin with the precomputed weight tables
+    """
+    pipeline = FlatPipeline({"ribbons": SPEC["ribbons"][:1]})
+    pipeline.build()
+    ribbon = pipeline.ribbons[0]
+    for row in range(ribbon.spans + 3):
+        assert mc.skinPercent("{}_sc".format(ribbon.ribbon),
+                              "{}.cv[{}][0]".format(ribbon.ribbon, row),
+                              q=True) == [1.0, 0.0, 0.0]